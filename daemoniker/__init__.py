@@ -49,6 +49,12 @@ __all__ = [
     'SignalHandler1',
     'IGNORE_SIGNAL',
     'send',
+    'reopen_stds',
+    'FlightRecorder',
+    'read_flight_recorder',
+    'startup_complete',
+    'notify',
+    'ServiceWatchdog',
     'SIGINT',
     'SIGTERM',
     'SIGABRT',
@@ -66,6 +72,16 @@ from . import utils
 from ._signals_common import IGNORE_SIGNAL
 from ._signals_common import send
 
+from ._streams_common import reopen_stds
+
+from ._flightrec_common import FlightRecorder
+from ._flightrec_common import read_flight_recorder
+
+from ._startup_common import startup_complete
+
+from ._notify_common import notify
+from ._notify_common import ServiceWatchdog
+
 from .exceptions import SIGINT
 from .exceptions import SIGTERM
 from .exceptions import SIGABRT
@@ -86,6 +102,24 @@ if platform_switch == 'unix':
     from ._daemonize_unix import daemonize
     
     from ._signals_unix import SignalHandler1
+    from ._watchdog_unix import RSSWatchdog
+    __all__.append('RSSWatchdog')
+    
+    from ._inherit_unix import inherited_fds
+    from ._inherit_unix import activate
+    __all__.append('inherited_fds')
+    __all__.append('activate')
+    
+    from ._reaper_unix import set_pdeathsig
+    __all__.append('set_pdeathsig')
+    
+    from ._status_unix import status
+    from ._status_unix import scan
+    __all__.append('status')
+    __all__.append('scan')
+    
+    from ._registry_unix import Registry
+    __all__.append('Registry')
     
 elif platform_switch == 'windows':
     from ._daemonize_windows import Daemonizer
@@ -0,0 +1,461 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import sys
+import time
+import argparse
+import ast
+import signal
+import inspect
+import json
+import runpy
+import importlib
+import importlib.util
+import functools
+
+# Intra-package dependencies
+from . import platform_switch
+from . import daemonize
+from . import startup_complete
+from . import SignalHandler1
+from .exceptions import DaemonikerSignal
+from ._signals_common import send
+from ._signals_common import _signal_numbers
+# The _unix modules are imported by each command, since they can't be
+# imported at all on Windows, where main() just says so.
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+_PROG = 'python -m daemoniker'
+
+# LSB init script status codes
+_STATUS_RUNNING = 0
+_STATUS_DEAD = 1
+_STATUS_STOPPED = 3
+
+
+def _literal(value):
+    ''' Parses option values as Python literals where possible (ex:
+    "0o027", "{'nofile': 1024}", "['CAP_NET_BIND_SERVICE']"), and as
+    plain strings otherwise (ex: paths).
+    '''
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def _signum(value):
+    ''' Converts "HUP", "SIGHUP", or "1" into a signal number.
+    '''
+    if value.isdigit():
+        return int(value)
+    
+    name = value.upper()
+    if not name.startswith('SIG'):
+        name = 'SIG' + name
+    try:
+        return _signal_numbers()[name]
+    except KeyError:
+        raise argparse.ArgumentTypeError('unknown signal: ' + value) from None
+
+
+def _add_daemonize_options(parser):
+    ''' Adds an option for every keyword-only argument to daemonize(),
+    like --stdout-goto or --rlimits.
+    '''
+    group = parser.add_argument_group(
+        'daemonize options',
+        'See daemonize() for details. Values are parsed as Python literals '
+        'where possible, as in --rlimits "{\'nofile\': 1024}".'
+    )
+    for name, param in inspect.signature(daemonize).parameters.items():
+        if param.kind is not param.KEYWORD_ONLY or name.startswith('_'):
+            continue
+            
+        flag = '--' + name.replace('_', '-')
+        if param.default is False:
+            group.add_argument(
+                flag,
+                dest = name,
+                action = 'store_true',
+                default = argparse.SUPPRESS
+            )
+        else:
+            group.add_argument(
+                flag,
+                dest = name,
+                type = _literal,
+                metavar = 'VALUE',
+                default = argparse.SUPPRESS,
+                help = 'default: ' + repr(param.default)
+            )
+
+
+def _start_parser(command):
+    parser = argparse.ArgumentParser(
+        prog = _PROG + ' ' + command,
+        description = 'Daemonizes TARGET, which is either a module to run as '
+                      '__main__ (as in "python -m"), or a "module:callable" '
+                      'to call without arguments. ARGS become its sys.argv.'
+    )
+    parser.add_argument('pid_file')
+    parser.add_argument('target')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    _add_daemonize_options(parser)
+    return parser
+
+
+def _resolve_target(target):
+    ''' Finds the module, or imports the "module:callable", in target.
+    Returns a function that runs it. Raises ImportError (or
+    AttributeError) if it doesn't exist.
+    '''
+    module_name, sep, attr = target.partition(':')
+    if not sep:
+        if importlib.util.find_spec(module_name) is None:
+            raise ImportError('No module named ' + repr(module_name))
+        return functools.partial(
+            runpy.run_module,
+            module_name,
+            run_name = '__main__',
+            alter_sys = True
+        )
+    
+    obj = importlib.import_module(module_name)
+    for part in attr.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _remove_stale(pid_file):
+    ''' Removes pid_file if the daemon it belongs to is no longer
+    running (ex: after a SIGKILL), returning True if it was stale.
+    '''
+    from ._status_unix import _read_pid
+    from ._status_unix import _state
+    
+    if _state(pid_file, _read_pid(pid_file)) != 'stale':
+        return False
+    
+    try:
+        os.remove(pid_file)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def _start(argv, command='start'):
+    options = vars(_start_parser(command).parse_args(argv))
+    pid_file = os.path.abspath(options.pop('pid_file'))
+    target = options.pop('target')
+    target_args = options.pop('args')
+    
+    from ._status_unix import _read_pid
+    if _remove_stale(pid_file):
+        print('Removed stale pid file ' + pid_file, file=sys.stderr)
+    elif _read_pid(pid_file) is not None:
+        print('Already running (pid ' + str(_read_pid(pid_file)) + ').',
+              file=sys.stderr)
+        return 1
+    
+    # Like python -m, targets are found relative to where we were started.
+    sys.path.insert(0, os.getcwd())
+    # Don't declare the daemon ready until we've found the target, so that
+    # the launcher can report it if we can't. Unless the target wants to
+    # declare it ready itself.
+    target_defers = options.get('defer_ready', False)
+    options['defer_ready'] = True
+    try:
+        daemonize(pid_file, **options)
+    except (ValueError, TypeError, OSError) as exc:
+        print('Failed to start: ' + str(exc), file=sys.stderr)
+        return 1
+    
+    # From here on, we're the daemon. Install the default signal handlers,
+    # so that stop results in a graceful exit (and pid file cleanup). The
+    # target is free to replace them.
+    sighandler = SignalHandler1(pid_file)
+    sighandler.start()
+    sys.argv = [target] + target_args
+    run_target = _resolve_target(target)
+    if not target_defers:
+        startup_complete()
+    try:
+        run_target()
+    except DaemonikerSignal:
+        pass
+    return 0
+
+
+def _stop(argv):
+    parser = argparse.ArgumentParser(
+        prog = _PROG + ' stop',
+        description = 'Stops the daemon at PID_FILE with SIGTERM, waiting '
+                      'for it to exit.'
+    )
+    parser.add_argument('pid_file')
+    parser.add_argument('--timeout', type=float, default=10,
+                        help='seconds to wait for the daemon to exit')
+    parser.add_argument('--kill', action='store_true',
+                        help='send SIGKILL if it has not exited by then')
+    parser.add_argument('--process-group', action='store_true',
+                        help='signal the whole process group of the daemon')
+    args = parser.parse_args(argv)
+    return _stop_daemon(
+        args.pid_file,
+        args.timeout,
+        args.kill,
+        args.process_group
+    )
+
+
+def _stop_daemon(pid_file, timeout=10, kill=False, process_group=False):
+    from ._status_unix import _read_pid
+    from ._status_unix import _is_running
+    from ._status_unix import _state
+    
+    pid = _read_pid(pid_file)
+    # Don't signal whoever reused the pid of a dead daemon.
+    if _state(pid_file, pid) != 'running':
+        _remove_stale(pid_file)
+        print('Not running.', file=sys.stderr)
+        return 0
+    
+    send(pid_file, signal.SIGTERM, process_group)
+    deadline = time.monotonic() + timeout
+    while _is_running(pid):
+        if time.monotonic() >= deadline:
+            if not kill:
+                print('Daemon (pid ' + str(pid) + ') did not stop within ' +
+                      str(timeout) + ' seconds.', file=sys.stderr)
+                return 1
+            
+            send(pid_file, signal.SIGKILL, process_group)
+            # No more second chances, so no more deadline.
+            kill = False
+            deadline = float('inf')
+        time.sleep(.05)
+    
+    # Killed daemons can't clean up after themselves.
+    _remove_stale(pid_file)
+    return 0
+
+
+def _restart(argv):
+    pid_file = _start_parser('restart').parse_args(argv).pid_file
+    if _stop_daemon(pid_file):
+        return 1
+    return _start(argv, 'restart')
+
+
+def _status(argv):
+    parser = argparse.ArgumentParser(
+        prog = _PROG + ' status',
+        description = 'Reports on the daemon at PID_FILE. Exits 0 if it is '
+                      'running, 1 if it died without removing PID_FILE, and '
+                      '3 if there is no PID_FILE.'
+    )
+    parser.add_argument('pid_file')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+    
+    from ._status_unix import status
+    result = status(args.pid_file)
+    
+    if args.json:
+        print(json.dumps(result))
+    elif result['pid'] is None:
+        print('Not running.')
+    elif not result['running']:
+        print('Not running (stale pid ' + str(result['pid']) + ').')
+    else:
+        print('pid: ' + str(result['pid']))
+        if result['uptime'] is not None:
+            print('uptime: {:.1f}s'.format(result['uptime']))
+        if result['rss'] is not None:
+            print('rss: {:.1f} MiB'.format(result['rss'] / 2 ** 20))
+        if result['fds'] is not None:
+            print('fds: ' + str(result['fds']))
+        if result['exe'] is not None:
+            print('exe: ' + result['exe'])
+    
+    if result['running']:
+        return _STATUS_RUNNING
+    elif result['state'] == 'missing':
+        return _STATUS_STOPPED
+    else:
+        return _STATUS_DEAD
+
+
+def _format_uptime(seconds):
+    ''' Formats seconds like "3d04:05:06".
+    '''
+    if seconds is None:
+        return '-'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    formatted = '{:02d}:{:02d}:{:02d}'.format(hours, minutes, seconds)
+    if days:
+        formatted = str(days) + 'd' + formatted
+    return formatted
+
+
+def _scan(argv):
+    parser = argparse.ArgumentParser(
+        prog = _PROG + ' scan',
+        description = 'Reports on every daemon with a pid file in DIRECTORY '
+                      '(or, with --registry, recorded in the registry at '
+                      'DIRECTORY). Exits 0 if they are all running, and 1 '
+                      'otherwise.'
+    )
+    parser.add_argument('directory')
+    parser.add_argument('--pattern', default='*.pid',
+                        help='glob for the pid files (default: *.pid)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of threads to probe them with')
+    parser.add_argument('--json', action='store_true',
+                        help='print one JSON object per pid file')
+    parser.add_argument('--registry', action='store_true',
+                        help='read the daemons from a registry, instead of '
+                             'globbing for pid files')
+    args = parser.parse_args(argv)
+    
+    if args.registry:
+        from ._registry_unix import Registry
+        try:
+            with Registry(args.directory, readonly=True) as registry:
+                results = registry.scan(args.workers)
+        # Nothing has registered yet, just like a directory without any pid
+        # files.
+        except FileNotFoundError:
+            results = []
+        except ValueError as exc:
+            print('Failed to read registry: ' + str(exc), file=sys.stderr)
+            return 1
+        last_column = 'NAME'
+    else:
+        from ._status_unix import scan
+        results = scan(args.directory, args.pattern, args.workers)
+        last_column = 'PID FILE'
+    
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        row = '{:>8}  {:<8}  {:>12}  {:<24}  {}'
+        print(row.format('PID', 'STATE', 'UPTIME', 'EXE', last_column))
+        for result in results:
+            print(row.format(
+                '-' if result['pid'] is None else result['pid'],
+                result['state'],
+                _format_uptime(result['uptime']),
+                result['exe'] or '-',
+                result['name'] if args.registry else
+                os.path.relpath(result['pid_file'], args.directory)
+            ))
+    
+    if all(result['running'] for result in results):
+        return 0
+    else:
+        return 1
+
+
+def _signal(argv):
+    parser = argparse.ArgumentParser(
+        prog = _PROG + ' signal',
+        description = 'Sends SIGNAL (ex: HUP, SIGUSR1, or 15) to the daemon '
+                      'at PID_FILE.'
+    )
+    parser.add_argument('pid_file')
+    parser.add_argument('signal', type=_signum)
+    parser.add_argument('--process-group', action='store_true',
+                        help='signal the whole process group of the daemon')
+    args = parser.parse_args(argv)
+    try:
+        send(args.pid_file, args.signal, args.process_group)
+    except (OSError, ValueError) as exc:
+        print('Failed to signal: ' + str(exc), file=sys.stderr)
+        return 1
+    return 0
+
+
+_COMMANDS = {
+    'start': _start,
+    'stop': _stop,
+    'restart': _restart,
+    'status': _status,
+    'signal': _signal,
+    'scan': _scan,
+}
+
+
+def main(argv=None):
+    ''' Runs the command line interface, returning the exit code.
+    '''
+    parser = argparse.ArgumentParser(
+        prog = _PROG,
+        description = 'Starts and manages daemons through their pid files. '
+                      'Use "COMMAND -h" for help with each command.'
+    )
+    parser.add_argument('command', choices=_COMMANDS)
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    
+    if platform_switch != 'unix':
+        print('The command line interface is only supported on Unix.',
+              file=sys.stderr)
+        return 1
+    
+    return _COMMANDS[args.command](args.args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import logging
+import traceback
+
+# Intra-package dependencies
+from .utils import default_to
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+DEFAULT_CGROUP_ROOT = '/sys/fs/cgroup'
+
+
+def _normalize_cgroup(cgroup, cgroup_limits, cgroup_root):
+    ''' Validates the cgroup options, returning a tuple of (absolute
+    cgroup root, absolute cgroup path, limits dict) suitable for passing
+    to _join_cgroup, or None if cgroup is None.
+
+    cgroup is a path relative to cgroup_root (ex: "daemons/foo").
+    cgroup_limits maps cgroup v2 control files to their values (ex:
+    {'memory.max': 2 ** 30, 'pids.max': 256}).
+    '''
+    if cgroup is None:
+        if cgroup_limits:
+            raise ValueError('cgroup_limits requires a cgroup.')
+        return None
+
+    cgroup_root = os.path.abspath(default_to(cgroup_root, DEFAULT_CGROUP_ROOT))
+    if not os.path.isdir(cgroup_root):
+        raise ValueError('cgroup_root is not a directory: ' + cgroup_root)
+
+    # Don't allow the cgroup to wander outside of the root
+    parts = [part for part in cgroup.split('/') if part]
+    if not parts or any(part in {'.', '..'} for part in parts):
+        raise ValueError('Invalid cgroup: ' + repr(cgroup))
+    cgroup_path = os.path.join(cgroup_root, *parts)
+
+    limits = {}
+    for control, value in default_to(cgroup_limits, {}).items():
+        controller, dot, __ = control.partition('.')
+        if not dot or '/' in control or controller == 'cgroup':
+            raise ValueError('Invalid cgroup control file: ' + repr(control))
+        limits[control] = str(value)
+
+    return cgroup_root, cgroup_path, limits
+
+
+def _enable_controllers(cgroup_root, cgroup_path, controllers):
+    ''' Makes sure that every ancestor of cgroup_path (within
+    cgroup_root) delegates the controllers to its children. Control
+    files that don't exist are skipped.
+    '''
+    ancestor = cgroup_root
+    relpath = os.path.relpath(cgroup_path, cgroup_root)
+    for part in relpath.split(os.sep):
+        subtree_control = os.path.join(ancestor, 'cgroup.subtree_control')
+        if os.path.exists(subtree_control):
+            with open(subtree_control, 'r') as f:
+                enabled = set(f.read().split())
+
+            missing = controllers - enabled
+            if missing:
+                with open(subtree_control, 'w') as f:
+                    f.write(' '.join('+' + name for name in sorted(missing)))
+
+        ancestor = os.path.join(ancestor, part)
+
+
+def _join_cgroup(cgroup):
+    ''' Creates the (already-normalized) cgroup if needed, applies its
+    limits, and then moves the current process into it. Does nothing if
+    cgroup is None.
+    '''
+    if cgroup is None:
+        return
+
+    cgroup_root, cgroup_path, limits = cgroup
+    controllers = {control.partition('.')[0] for control in limits}
+
+    try:
+        os.makedirs(cgroup_path, exist_ok=True)
+        _enable_controllers(cgroup_root, cgroup_path, controllers)
+
+        for control, value in limits.items():
+            with open(os.path.join(cgroup_path, control), 'w') as f:
+                f.write(value + '\n')
+
+        with open(os.path.join(cgroup_path, 'cgroup.procs'), 'w') as f:
+            f.write(str(os.getpid()) + '\n')
+
+    except (IOError, OSError) as exc:
+        logger.critical(
+            'Failed to join cgroup w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+        raise SystemExit('Failed to join cgroup.') from exc
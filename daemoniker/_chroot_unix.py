@@ -0,0 +1,162 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import logging
+import importlib
+import traceback
+
+# Intra-package dependencies
+from ._streams_common import _parse_socket_target
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+# Modules that we (or the stdlib) may import lazily, after the chroot.
+_CHROOT_PRELOAD = (
+    'ctypes',
+    # Background compression of rotated streams
+    'concurrent.futures.thread',
+    'encodings.idna',
+    'encodings.ascii',
+    'encodings.latin_1',
+)
+
+
+def _normalize_chroot(chroot):
+    ''' Resolves chroot into the real path of an existing directory,
+    raising FileNotFoundError or NotADirectoryError otherwise. None
+    means no chroot.
+    '''
+    if chroot is None:
+        return None
+    
+    jail = os.path.realpath(chroot)
+    if not os.path.exists(jail):
+        raise FileNotFoundError('No chroot directory at ' + chroot)
+    elif not os.path.isdir(jail):
+        raise NotADirectoryError('chroot must be a directory: ' + chroot)
+    return jail
+
+
+def _jail_path(jail, path, description):
+    ''' Converts the (absolute) path into its equivalent from within
+    jail, resolving any symlinks first (since, after the chroot, they
+    would resolve differently or not at all). Raises ValueError if the
+    path isn't within the jail.
+    '''
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([jail, resolved]) != jail:
+        raise ValueError(
+            description + ' (' + path + ') must be within the chroot (' +
+            jail + ').'
+        )
+    return os.path.normpath(
+        os.path.join('/', os.path.relpath(resolved, jail))
+    )
+
+
+def _jail_stream_target(jail, goto, chdir, description):
+    ''' Converts a std stream destination (a file path, relative to
+    chdir, or a socket target like "syslog:///dev/log") into its
+    equivalent from within jail.
+    '''
+    if goto == os.devnull:
+        if not os.path.exists(jail + os.devnull):
+            raise ValueError(
+                'The chroot (' + jail + ') has no ' + os.devnull + ' for ' +
+                description + '. Create one, or redirect it into the chroot.'
+            )
+        return goto
+    
+    target = _parse_socket_target(goto)
+    if target is None:
+        return _jail_path(jail, os.path.join(chdir, goto), description)
+    
+    scheme, address = target
+    return scheme + '://' + _jail_path(jail, address, description)
+
+
+def _preload(modules):
+    ''' Imports everything in modules (names, as for import_module),
+    along with anything we know we'll import lazily, so that they can
+    still be used from inside the chroot.
+    '''
+    for module in _CHROOT_PRELOAD + tuple(modules or ()):
+        importlib.import_module(module)
+
+
+def _open_pidfile_dir(pid_file):
+    ''' Opens the directory containing pid_file, so that it can still be
+    removed from inside the chroot.
+    '''
+    return os.open(os.path.dirname(pid_file), os.O_RDONLY | os.O_DIRECTORY)
+
+
+def _enter_chroot(jail, chdir):
+    ''' Changes our root directory to jail, and then our working
+    directory to chdir (which is relative to the new root). Does
+    nothing if jail is None.
+    '''
+    if jail is None:
+        return
+    
+    try:
+        os.chroot(jail)
+        os.chdir(chdir)
+        
+    except OSError as exc:
+        logger.critical(
+            'Failed to chroot w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+        if isinstance(exc, PermissionError):
+            raise SystemExit('Permission denied entering chroot.')
+        else:
+            raise SystemExit('Failed to chroot.') from exc
@@ -42,6 +42,14 @@ import shutil
 # Intra-package dependencies
 from .utils import default_to
 
+from ._streams_common import _start_pump
+from ._streams_common import _rebuffer_stds
+from ._streams_common import _direct_redirects
+from ._streams_common import _StreamOptions
+from ._streams_common import _parse_socket_target
+from ._streams_common import LOG_INFO
+from ._streams_common import LOG_ERR
+
 
 # ###############################################
 # Boilerplate
@@ -119,9 +127,23 @@ def _flush_stds():
         # Honestly not sure if we should exit here.
 
         
-def _redirect_stds(stdin_goto, stdout_goto, stderr_goto):
+def _redirect_stds(stdin_goto, stdout_goto, stderr_goto, stream_options=None):
     ''' Set stdin, stdout, sterr. If any of the paths don't exist,
     create them first.
+    
+    Files are always opened for appending. If stream_options (a
+    _StreamOptions) calls for pumping, stdout and stderr will be
+    redirected into pipes instead of directly into their files.
+    Background threads will then move everything written to the pipes
+    into the files (see _StreamPump). stream_options may also add extra
+    open flags, change the buffer size of sys.stdout and sys.stderr, and
+    rate limit or deduplicate stderr (which, if stdout shares its file,
+    also applies to stdout).
+    
+    stdout_goto and stderr_goto may also be logging sockets, like
+    "syslog:///dev/log" or "journald:", with each line sent as a separate
+    record, or collector sockets, like "unix:///run/collector.sock".
+    These are always pumped.
     '''
     # The general strategy here is to:
     # 1. figure out which unique paths we need to open for the redirects
@@ -130,8 +152,28 @@ def _redirect_stds(stdin_goto, stdout_goto, stderr_goto):
     # 4. copy those file descriptors into the FD's used for stdio, etc
     # 5. close the original file descriptors
     
+    if stream_options is None:
+        stream_options = _StreamOptions()
+    
+    # Logging sockets get their own pumps, even when stdout and stderr share
+    # them, so that each can have its own priority.
+    socket_fds = {}
+    for fd, goto, priority in ((1, stdout_goto, LOG_INFO),
+                               (2, stderr_goto, LOG_ERR)):
+        if _parse_socket_target(goto) is not None:
+            socket_fds[fd] = _start_pump(
+                goto,
+                stream_options,
+                priority,
+                is_stderr = fd == 2
+            )
+    
     # Remove repeated values through a set.
     streams = {stdin_goto, stdout_goto, stderr_goto}
+    if 1 in socket_fds:
+        streams.discard(stdout_goto)
+    if 2 in socket_fds:
+        streams.discard(stderr_goto)
     # Transform that into a dictionary of {location: 0, location: 0...}
     # Basically, start from zero permissions
     streams = {stream: 0 for stream in streams}
@@ -141,8 +183,10 @@ def _redirect_stds(stdin_goto, stdout_goto, stderr_goto):
     rw_mask = 0b11
     # Update the streams dict depending on what access each stream requires
     streams[stdin_goto] |= read_mask
-    streams[stdout_goto] |= write_mask
-    streams[stderr_goto] |= write_mask
+    if 1 not in socket_fds:
+        streams[stdout_goto] |= write_mask
+    if 2 not in socket_fds:
+        streams[stderr_goto] |= write_mask
     # Now create a lookup to transform our masks into file access levels
     access_lookup = {
         read_mask: os.O_RDONLY,
@@ -155,6 +199,8 @@ def _redirect_stds(stdin_goto, stdout_goto, stderr_goto):
         rw_mask: 'w+'
     }
     access_mode = {}
+    pumped = stream_options.pumped
+    open_flags = stream_options.open_flags
     
     # Now, use our mask lookup to translate into actual file descriptors
     for stream in streams:
@@ -165,8 +211,21 @@ def _redirect_stds(stdin_goto, stdout_goto, stderr_goto):
         
         # Transform the mask into the actual access level.
         access = access_lookup[streams[stream]]
+        # Anything we write to gets the extra flags (including O_APPEND)
+        if streams[stream] & write_mask:
+            access |= open_flags
+        
+        # Write-only streams can be pumped through a pipe, in which case
+        # we'll want to dup the write end of the pipe instead of the file.
+        if pumped and streams[stream] == write_mask:
+            stream_fd = _start_pump(
+                stream,
+                stream_options,
+                is_stderr = stream == stderr_goto
+            )
         # Open the file with that level of access.
-        stream_fd = os.open(stream, access)
+        else:
+            stream_fd = os.open(stream, access)
         # Also alias the mode in case of pythonw.exe
         access_mode[stream] = access_lookup_2[streams[stream]]
         # And update streams to be that, instead of the access mask.
@@ -176,8 +235,8 @@ def _redirect_stds(stdin_goto, stdout_goto, stderr_goto):
     
     # Okay, duplicate our streams into the FDs for stdin, stdout, stderr.
     stdin_fd = streams[stdin_goto]
-    stdout_fd = streams[stdout_goto]
-    stderr_fd = streams[stderr_goto]
+    stdout_fd = socket_fds.get(1, streams.get(stdout_goto))
+    stderr_fd = socket_fds.get(2, streams.get(stderr_goto))
     
     # Note that we need special casing for pythonw.exe, which has no stds
     if sys.stdout is None:
@@ -203,6 +262,21 @@ def _redirect_stds(stdin_goto, stdout_goto, stderr_goto):
         # Finally, close the extra fds.
         for duped_fd in streams.values():
             os.close(duped_fd)
+        for duped_fd in socket_fds.values():
+            os.close(duped_fd)
+            
+        # Remember where any unpumped, write-only streams went, so that they
+        # can be reopened later.
+        _direct_redirects.clear()
+        for fd, stream in ((1, stdout_goto), (2, stderr_goto)):
+            if fd in socket_fds:
+                continue
+            elif access_mode[stream] == 'w' and not pumped:
+                flags = os.O_WRONLY | os.O_CREAT | open_flags
+                _direct_redirects[fd] = (stream, flags)
+                
+        if stream_options.buffering is not None:
+            _rebuffer_stds(stream_options.buffering)
 
         
 def _write_pid(locked_pidfile):
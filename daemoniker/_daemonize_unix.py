@@ -49,6 +49,7 @@ import logging
 import atexit
 import traceback
 import sys
+import time
 
 # Intra-package dependencies
 from .utils import platform_specificker
@@ -59,6 +60,44 @@ from ._daemonize_common import _redirect_stds
 from ._daemonize_common import _write_pid
 from ._daemonize_common import _acquire_pidfile
 
+from ._cgroups_unix import _normalize_cgroup
+from ._cgroups_unix import _join_cgroup
+
+from ._inherit_unix import _preopen
+from ._inherit_unix import _close_fds
+from ._inherit_unix import _inherited
+from ._inherit_unix import _listen_fds
+
+from ._privdrop_unix import _normalize_privileges
+from ._privdrop_unix import _normalize_capabilities
+from ._privdrop_unix import _chown_pidfile
+from ._privdrop_unix import _drop_privileges
+from ._privdrop_unix import _resolve_groups
+
+from ._chroot_unix import _normalize_chroot
+from ._chroot_unix import _jail_path
+from ._chroot_unix import _jail_stream_target
+from ._chroot_unix import _preload
+from ._chroot_unix import _open_pidfile_dir
+from ._chroot_unix import _enter_chroot
+
+from ._reaper_unix import _check_subreaper
+from ._reaper_unix import _become_subreaper
+
+from ._registry_unix import _open_registry
+
+from ._streams_common import _StreamOptions
+from ._streams_common import OVERFLOW_BLOCK
+from ._streams_common import _check_stream_targets
+from ._streams_common import _register_close_pumps
+
+from ._startup_common import _StartupChannel
+
+from ._notify_common import notify
+
+from ._events_common import _set_event_log
+from ._events_common import _emit
+
 _SUPPORTED_PLATFORM = platform_specificker(
     linux_choice = True,
     win_choice = False,
@@ -95,6 +134,11 @@ __all__ = [
 # Daemonization and helpers
 
 
+# How long to keep retrying the pidfile lock before giving up. Anybody
+# checking on the daemon (ex: status()) briefly holds a shared lock.
+_PIDFILE_LOCK_TIMEOUT = 1
+
+
 class Daemonizer:
     ''' This is really very boring on the Unix side of things.
     
@@ -169,6 +213,41 @@ class Daemonizer:
             return
 
             
+def _lock_pidfile(locked_pidfile):
+    ''' Actually locks the (newly acquired) pidfile. The lock is shared
+    with our children, so it's held for exactly as long as the daemon
+    is alive, which lets anyone else check if it's running without
+    trusting the pid (which may be reused once the daemon exits).
+    
+    Since status checks take the lock for a moment themselves, retries
+    with a short backoff (for up to _PIDFILE_LOCK_TIMEOUT seconds)
+    before concluding that someone else is holding on to it. The
+    pidfile is then theirs, so it's left alone.
+    '''
+    fd = locked_pidfile.fileno()
+    deadline = time.monotonic() + _PIDFILE_LOCK_TIMEOUT
+    delay = .001
+    try:
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise
+                    
+            time.sleep(delay)
+            delay = min(delay * 2, .05)
+            
+    except OSError as exc:
+        locked_pidfile.close()
+        logger.critical(
+            'Unable to lock the PID file w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+        raise SystemExit('Unable to lock PID file.') from exc
+
+
 def _fratricidal_fork(have_mercy=False):
     ''' Fork the current process, and immediately exit the parent.
     
@@ -269,17 +348,417 @@ def _autoclose_files(shielded=None, fallback_limit=1024):
         # How nice of os to include this for us!
         os.closerange(start, stop)
 
-        
+
+def _parse_cpulist(cpulist):
+    ''' Parses a kernel-style cpulist (ex: "0-3,8,10-11") into a set of
+    integer cpu indices.
+    '''
+    cpus = set()
+    for chunk in cpulist.strip().split(','):
+        if not chunk:
+            continue
+        elif '-' in chunk:
+            start, stop = chunk.split('-')
+            cpus.update(range(int(start), int(stop) + 1))
+        else:
+            cpus.add(int(chunk))
+
+    return cpus
+
+
+def _numa_node_cpus(node, sysfs_root='/sys/devices/system/node'):
+    ''' Looks up the set of cpus belonging to the passed NUMA node.
+    '''
+    path = sysfs_root + '/node' + str(int(node)) + '/cpulist'
+    try:
+        with open(path, 'r') as f:
+            return _parse_cpulist(f.read())
+
+    except (IOError, OSError) as exc:
+        raise ValueError('Unknown NUMA node: ' + str(node)) from exc
+
+
+def _normalize_cpu_affinity(cpu_affinity):
+    ''' Converts cpu_affinity into a frozenset of cpu indices, making
+    sure every one of them is actually available to the current
+    process. None passes through unchanged.
+
+    cpu_affinity may be an iterable of integer cpu indices, a cpulist
+    string (ex: "0-3,8"), or a NUMA node (ex: "node1").
+    '''
+    if cpu_affinity is None:
+        return None
+
+    if not hasattr(os, 'sched_setaffinity'):
+        raise OSError('CPU affinity is unsupported on your platform.')
+
+    if isinstance(cpu_affinity, str):
+        if cpu_affinity.startswith('node'):
+            cpus = _numa_node_cpus(cpu_affinity[4:])
+        else:
+            cpus = _parse_cpulist(cpu_affinity)
+    else:
+        cpus = {int(cpu) for cpu in cpu_affinity}
+
+    if not cpus:
+        raise ValueError('cpu_affinity must contain at least one cpu.')
+
+    unavailable = cpus - os.sched_getaffinity(0)
+    if unavailable:
+        raise ValueError(
+            'cpu_affinity contains unavailable cpus: ' +
+            ', '.join(str(cpu) for cpu in sorted(unavailable))
+        )
+
+    return frozenset(cpus)
+
+
+def _set_cpu_affinity(cpus):
+    ''' Pins the current process to the (already-normalized) cpus, or
+    does nothing if cpus is None.
+    '''
+    if cpus is None:
+        return
+
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as exc:
+        logger.critical(
+            'Failed to set cpu affinity w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+        raise SystemExit('Failed to set cpu affinity.') from exc
+
+
+def _normalize_rlimits(rlimits):
+    ''' Converts rlimits into a list of (resource, soft, hard) tuples,
+    making sure that every limit is one the current process could
+    actually apply. None passes through unchanged.
+
+    rlimits is a mapping of resource to limit. Resources may be given
+    as resource module constants, or by name (ex: "RLIMIT_NOFILE" or
+    just "nofile"). Limits may be a (soft, hard) tuple or a single int,
+    which is used for both.
+    '''
+    if rlimits is None:
+        return None
+
+    infinity = resource.RLIM_INFINITY
+    normalized = []
+    for which, limit in rlimits.items():
+        # Normalize the resource name to its constant
+        if isinstance(which, str):
+            name = which.upper()
+            if not name.startswith('RLIMIT_'):
+                name = 'RLIMIT_' + name
+
+            try:
+                which = getattr(resource, name)
+            except AttributeError as exc:
+                raise ValueError('Unknown resource limit: ' + name) from exc
+
+        # Normalize the limit to a soft, hard pair
+        if isinstance(limit, int):
+            soft = hard = limit
+        else:
+            soft, hard = limit
+
+        # Make sure this would actually work
+        if hard != infinity and (soft == infinity or soft > hard):
+            raise ValueError(
+                'Soft resource limit exceeds hard limit for ' + repr(which)
+            )
+
+        __, current_hard = resource.getrlimit(which)
+        raising_hard = (
+            current_hard != infinity and (hard == infinity or
+                                          hard > current_hard)
+        )
+        if raising_hard and os.geteuid() != 0:
+            raise ValueError(
+                'Insufficient privileges to raise hard resource limit for ' +
+                repr(which)
+            )
+
+        normalized.append((which, soft, hard))
+
+    return normalized
+
+
+def _set_rlimits(rlimits):
+    ''' Applies the (already-normalized) resource limits, or does
+    nothing if rlimits is None.
+    '''
+    if rlimits is None:
+        return
+
+    for which, soft, hard in rlimits:
+        try:
+            resource.setrlimit(which, (soft, hard))
+        except (ValueError, OSError) as exc:
+            logger.critical(
+                'Failed to set resource limit w/ traceback: \n' +
+                ''.join(traceback.format_exc())
+            )
+            raise SystemExit('Failed to set resource limit.') from exc
+
+
+# ioprio_set has no libc wrapper, so we need the raw syscall number.
+_IOPRIO_SET_SYSCALLS = {
+    'x86_64': 251,
+    'i386': 289,
+    'i686': 289,
+    'aarch64': 30,
+    'riscv64': 30,
+    'armv7l': 314,
+    'ppc64le': 273,
+    's390x': 282,
+}
+_IOPRIO_CLASSES = {
+    'realtime': 1,
+    'best-effort': 2,
+    'idle': 3,
+}
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_WHO_PROCESS = 1
+
+
+def _normalize_scheduling(nice, sched_policy, ioprio, oom_score_adj):
+    ''' Validates all of the scheduling-related options, returning a
+    tuple of them suitable for passing to _set_scheduling.
+
+    nice is an absolute niceness. sched_policy is one of "other",
+    "batch", or "idle". ioprio is an io priority class ("realtime",
+    "best-effort", or "idle"), optionally paired with a level 0-7 in a
+    tuple. oom_score_adj is an integer between -1000 and 1000.
+    '''
+    privileged = os.geteuid() == 0
+
+    if nice is not None:
+        nice = int(nice)
+        if not -20 <= nice <= 19:
+            raise ValueError('nice must be between -20 and 19.')
+        elif nice < os.getpriority(os.PRIO_PROCESS, 0) and not privileged:
+            raise ValueError('Insufficient privileges to lower nice level.')
+
+    if sched_policy is not None:
+        if not hasattr(os, 'SCHED_BATCH'):
+            raise OSError('sched_policy is unsupported on your platform.')
+
+        try:
+            sched_policy = getattr(os, 'SCHED_' + sched_policy.upper())
+        except AttributeError as exc:
+            raise ValueError(
+                'Unknown scheduling policy: ' + sched_policy
+            ) from exc
+
+        if sched_policy not in {os.SCHED_OTHER, os.SCHED_BATCH,
+                                os.SCHED_IDLE}:
+            raise ValueError('Realtime scheduling policies are unsupported.')
+
+    if ioprio is not None:
+        if not sys.platform.startswith('linux'):
+            raise OSError('ioprio is unsupported on your platform.')
+
+        if isinstance(ioprio, str):
+            ioprio = (ioprio, 0)
+        ioprio_class, level = ioprio
+
+        try:
+            ioprio_class = _IOPRIO_CLASSES[ioprio_class]
+        except KeyError as exc:
+            raise ValueError('Unknown ioprio class: ' + ioprio_class) from exc
+
+        if not 0 <= level <= 7:
+            raise ValueError('ioprio level must be between 0 and 7.')
+        elif ioprio_class == _IOPRIO_CLASSES['realtime'] and not privileged:
+            raise ValueError('Insufficient privileges for realtime ioprio.')
+
+        ioprio = (ioprio_class << _IOPRIO_CLASS_SHIFT) | level
+
+    if oom_score_adj is not None:
+        if not os.path.exists('/proc/self/oom_score_adj'):
+            raise OSError('oom_score_adj is unsupported on your platform.')
+
+        oom_score_adj = int(oom_score_adj)
+        if not -1000 <= oom_score_adj <= 1000:
+            raise ValueError('oom_score_adj must be between -1000 and 1000.')
+
+    return nice, sched_policy, ioprio, oom_score_adj
+
+
+def _ioprio_set(ioprio):
+    ''' Sets the io priority of the current process through the raw
+    ioprio_set syscall.
+    '''
+    import ctypes
+    import platform
+
+    try:
+        syscall_num = _IOPRIO_SET_SYSCALLS[platform.machine()]
+    except KeyError as exc:
+        raise OSError('ioprio is unsupported on your architecture.') from exc
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    result = libc.syscall(syscall_num, _IOPRIO_WHO_PROCESS, 0, ioprio)
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def _set_scheduling(scheduling):
+    ''' Applies the (already-normalized) scheduling options. Any of
+    them may be None, in which case it is left unchanged.
+    '''
+    nice, sched_policy, ioprio, oom_score_adj = scheduling
+
+    try:
+        if sched_policy is not None:
+            setting = 'scheduling policy'
+            os.sched_setscheduler(0, sched_policy, os.sched_param(0))
+
+        if nice is not None:
+            setting = 'nice level'
+            os.setpriority(os.PRIO_PROCESS, 0, nice)
+
+        if ioprio is not None:
+            setting = 'ioprio'
+            _ioprio_set(ioprio)
+
+        if oom_score_adj is not None:
+            setting = 'oom_score_adj'
+            with open('/proc/self/oom_score_adj', 'w') as f:
+                f.write(str(oom_score_adj) + '\n')
+
+    except OSError as exc:
+        logger.critical(
+            'Failed to set ' + setting + ' w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+        if isinstance(exc, PermissionError):
+            raise SystemExit('Permission denied setting ' + setting + '.')
+        else:
+            raise SystemExit('Failed to set ' + setting + '.') from exc
+
+
 def daemonize(pid_file, *args, chdir=None, stdin_goto=None, stdout_goto=None,
               stderr_goto=None, umask=0o027, shielded_fds=None,
               fd_fallback_limit=1024, success_timeout=30,
-              strip_cmd_args=False, explicit_rescript=None, _exit_caller=True):
+              strip_cmd_args=False, explicit_rescript=None, cpu_affinity=None,
+              rlimits=None, nice=None, sched_policy=None, ioprio=None,
+              oom_score_adj=None, cgroup=None, cgroup_limits=None,
+              cgroup_root=None, stream_backlog=None,
+              stream_overflow=OVERFLOW_BLOCK, stream_rotate_bytes=None,
+              stream_rotate_interval=None, stream_rotate_keep=None,
+              stream_open_flags=0, stream_buffering=None,
+              stream_identifier=None, stream_compress=None,
+              stream_compress_workers=1, stderr_rate_limit=None,
+              stderr_rate_burst=None, stderr_dedupe=False, defer_ready=False,
+              event_log=None, user=None, group=None, keep_caps=None,
+              preopen=None, chroot=None, chroot_preload=None,
+              subreaper=False, registry=None, name=None,
+              _exit_caller=True):
     ''' Performs a classic unix double-fork daemonization. Registers all
     appropriate cleanup functions.
     
     fd_check_limit is a fallback value for file descriptor searching
     while closing descriptors.
     
+    cpu_affinity pins the daemon to a set of cpus. It may be an iterable
+    of cpu indices, a cpulist string like "0-3,8", or a NUMA node like
+    "node1". It is validated before forking, and applied in the
+    daemonized grandchild.
+    
+    rlimits is a mapping of resource to (soft, hard) limits (or a single
+    int for both), ex: {'nofile': 65536, 'core': 0}. These are also
+    validated before forking, and applied before closing files.
+    
+    nice, sched_policy ("other", "batch", or "idle"), ioprio (a class
+    like "idle", or a (class, level) tuple), and oom_score_adj set the
+    eponymous scheduling properties of the daemon. They are validated
+    before forking and applied in the daemonized grandchild.
+    
+    cgroup moves the daemon into the named cgroup v2 subtree of
+    cgroup_root (defaults to /sys/fs/cgroup), creating it if needed.
+    cgroup_limits maps control files to values, ex:
+    {'cpu.max': '50000 100000', 'memory.max': 2 ** 30, 'pids.max': 64}
+    
+    stream_backlog, if not None, points stdout and stderr at pipes that
+    are drained into their files by background threads, buffering up
+    to stream_backlog bytes. stream_overflow ("block" or "drop")
+    determines what happens when that buffer is full.
+    
+    stream_rotate_bytes and stream_rotate_interval (in seconds) rotate
+    the stdout and stderr files in-process, keeping stream_rotate_keep
+    rotated files (or all of them, if None). Rotation implies pumping.
+    stream_compress ("gzip" or "zstd") compresses rotated files in up to
+    stream_compress_workers low-priority background threads.
+    
+    stderr_rate_limit (in bytes per second, with bursts of up to
+    stderr_rate_burst bytes) and stderr_dedupe throttle stderr on its
+    way into stderr_goto, by line. Both imply pumping.
+    
+    The std stream files are always opened with O_APPEND. Any extra
+    stream_open_flags (ex: os.O_NOATIME) are added to that.
+    stream_buffering, if not None, replaces sys.stdout and sys.stderr
+    with streams using that buffer size (0 and 1 mean unbuffered and
+    line buffered, respectively, as with open()).
+    
+    stdout_goto and stderr_goto may also name a local logging socket,
+    as "syslog:///dev/log" or "journald:///run/systemd/journal/socket"
+    (or just "syslog:" and "journald:" for those defaults). Each line
+    is then sent as a separate record, at the info (stdout) or err
+    (stderr) priority, and tagged with stream_identifier (defaults to
+    the script name). Logging sockets are always pumped.
+    "unix:///path/to/collector.sock" instead streams output as-is to a
+    SOCK_STREAM collector, buffering it while the collector restarts.
+    
+    The caller waits up to success_timeout seconds for the daemon to
+    finish starting. If it fails (or times out) instead, the caller
+    prints the traceback to stderr and exits 1 (or, if _exit_caller is
+    False, raises ChildProcessError). With defer_ready=True, the daemon
+    is only considered started once it calls startup_complete().
+    
+    event_log, if not None, records lifecycle events (pidfile acquired,
+    forked, signal received, cleaned up, etc) as dicts. It may be either
+    a path, to append them to as lines of JSON, or a callable.
+    
+    user and group (names or ids) drop the daemon's privileges, once it
+    has finished redirecting its streams (so that they may be opened
+    with the original privileges). The group defaults to the user's
+    primary group, supplementary groups are reset to the user's, and the
+    pid_file is chowned so that it can still be cleaned up. keep_caps
+    lists Linux capabilities (ex: "CAP_NET_BIND_SERVICE") to retain.
+    
+    Sockets passed in through socket activation (LISTEN_FDS) are kept
+    open, and are also available from inherited_fds().
+    
+    preopen is a {name: spec} dict of sockets ("tcp://0.0.0.0:80",
+    "udp://:53", "unix:///run/app.sock") to bind and files (path, or
+    (path, mode)) to open in the caller, before forking or dropping
+    privileges. The daemon gets them as a {name: fd} dict from
+    inherited_fds().
+    
+    chroot confines the daemon to a directory, just before its streams
+    are redirected (and before dropping privileges). Everything it needs
+    is resolved ahead of time: chdir (which defaults to the new root) and
+    any std stream and event_log paths must be within the chroot, and
+    are converted into their paths from inside it. The pid_file can live
+    anywhere, and the user and group entries are looked up beforehand.
+    chroot_preload lists modules to import before entering the chroot.
+    
+    subreaper=True makes the daemon the subreaper for its descendants
+    (Linux only), so that the helpers they leave behind are reparented
+    to it instead of to init. Those orphans are then reaped upon
+    SIGCHLD, without blocking; the daemon's own children are not. See
+    _Reaper for how they're told apart.
+    
+    registry is a directory in which to record the daemon, under name
+    (which defaults to the pid_file's name, without its extension),
+    along with its pid, start time, and pid_file, until it exits. See
+    Registry. Raises ValueError if name is already registered to a
+    different, running daemon.
+    
     umask is the eponymous unix umask. The default value:
         1. will allow owner to have any permissions.
         2. will prevent group from having write permission
@@ -316,46 +795,180 @@ def daemonize(pid_file, *args, chdir=None, stdin_goto=None, stdout_goto=None,
     stdout_goto = default_to(stdout_goto, devnull)
     stderr_goto = default_to(stderr_goto, devnull)
     
-    # Convert chdir to go to current dir, and also to an abs path.
-    chdir = default_to(chdir, '.')
+    # Convert chdir to go to current dir (or the chroot, if we're using one),
+    # and also to an abs path.
+    jail = _normalize_chroot(chroot)
+    chdir = default_to(chdir, default_to(jail, '.'))
     chdir = os.path.abspath(chdir)
     
     # And convert shield_fds to a set
     shielded_fds = default_to(shielded_fds, set())
     shielded_fds = set(shielded_fds)
     
+    # Make sure the requested cpus exist before we commit to anything
+    cpu_affinity = _normalize_cpu_affinity(cpu_affinity)
+    rlimits = _normalize_rlimits(rlimits)
+    scheduling = _normalize_scheduling(
+        nice,
+        sched_policy,
+        ioprio,
+        oom_score_adj
+    )
+    cgroup = _normalize_cgroup(cgroup, cgroup_limits, cgroup_root)
+    privileges = _normalize_privileges(user, group)
+    capabilities = _normalize_capabilities(keep_caps, privileges)
+    groups = _resolve_groups(privileges)
+    _check_subreaper(subreaper)
+    stream_options = _StreamOptions(
+        backlog = stream_backlog,
+        overflow = stream_overflow,
+        rotate_bytes = stream_rotate_bytes,
+        rotate_interval = stream_rotate_interval,
+        rotate_keep = stream_rotate_keep,
+        open_flags = stream_open_flags,
+        buffering = stream_buffering,
+        identifier = stream_identifier,
+        compress = stream_compress,
+        compress_workers = stream_compress_workers,
+        stderr_rate_limit = stderr_rate_limit,
+        stderr_rate_burst = stderr_rate_burst,
+        stderr_dedupe = stderr_dedupe
+    )
+    _check_stream_targets(stdin_goto, stdout_goto, stderr_goto)
+    
+    _set_event_log(event_log)
+    
+    # Anything that we need to find from inside the chroot has to be
+    # figured out now, while we can still see it.
+    if jail is not None:
+        jailed_chdir = _jail_path(jail, chdir, 'chdir')
+        stdin_goto, stdout_goto, stderr_goto = (
+            _jail_stream_target(jail, goto, chdir, description)
+            for goto, description in ((stdin_goto, 'stdin_goto'),
+                                      (stdout_goto, 'stdout_goto'),
+                                      (stderr_goto, 'stderr_goto'))
+        )
+        jailed_event_log = event_log
+        if isinstance(event_log, str):
+            jailed_event_log = _jail_path(
+                jail,
+                os.path.abspath(event_log),
+                'event_log'
+            )
+        _preload(chroot_preload)
+    
     ####################################################################
     # Begin actual daemonization
     ####################################################################
     
     # Get a lock on the PIDfile before forking anything.
     locked_pidfile = _acquire_pidfile(pid_file)
+    _lock_pidfile(locked_pidfile)
+    _emit('pidfile_acquired', pid_file=pid_file)
     # Make sure we don't accidentally autoclose it though.
     shielded_fds.add(locked_pidfile.fileno())
     
+    # Anything passed to us by socket activation is ours to keep, but not
+    # to pass on to our children.
+    activated = _listen_fds()
+    for fd in activated.values():
+        os.set_inheritable(fd, False)
+    shielded_fds.update(activated.values())
+    
+    # Now that we know we're the only ones, claim our name in the registry,
+    # and open anything that needs our current privileges (and protect it
+    # from autoclosing as well).
+    index = None
+    try:
+        index, name = _open_registry(registry, name, pid_file)
+        preopened = _preopen(preopen)
+    except:
+        if index is not None:
+            index.close()
+        locked_pidfile.close()
+        os.remove(pid_file)
+        raise
+    shielded_fds.update(preopened.values())
+    # The registry is updated through its fd, so that it keeps working
+    # from inside a chroot, or without privileges.
+    if index is not None:
+        shielded_fds.add(index.fileno())
+    
+    # Same goes for the channel the daemon uses to report startup. And,
+    # once we've chrooted, we'll need a handle on the pid_file's directory
+    # to remove it.
+    pid_dir_fd = None
+    try:
+        if jail is not None:
+            pid_dir_fd = _open_pidfile_dir(pid_file)
+        startup_channel = _StartupChannel()
+    except:
+        if pid_dir_fd is not None:
+            os.close(pid_dir_fd)
+        if index is not None:
+            index.close()
+        _close_fds(preopened)
+        locked_pidfile.close()
+        os.remove(pid_file)
+        raise
+    shielded_fds.add(startup_channel.write_fd)
+    if pid_dir_fd is not None:
+        shielded_fds.add(pid_dir_fd)
+    launcher_pid = os.getpid()
+    
     # Define a memoized cleanup function.
     def cleanup(pid_path=pid_file, pid_lock=locked_pidfile):
+        _emit('stopping')
+        notify(STOPPING=1)
         try:
+            if index is not None:
+                index.unregister(name, os.getpid())
             pid_lock.close()
-            os.remove(pid_path)
+            if pid_dir_fd is None:
+                os.remove(pid_path)
+            else:
+                os.remove(os.path.basename(pid_path), dir_fd=pid_dir_fd)
         except:
             logger.error(
                 'Failed to clean up pidfile w/ traceback: \n' +
                 ''.join(traceback.format_exc())
             )
             raise
+        _emit('cleaned_up')
     
-    # Register this as soon as possible in case something goes wrong.
+    # Register this as soon as possible in case something goes wrong. But
+    # first, make sure the std stream pumps are closed after it, not before.
+    _register_close_pumps()
     atexit.register(cleanup)
     # Note that because fratricidal fork is calling os._exit(), our parents
     # will never call cleanup.
     
-    # Now fork the toplevel parent, killing it (unless _exit_caller was False)
-    keep_parent = not bool(_exit_caller)
-    is_parent = _fratricidal_fork(have_mercy=keep_parent)
+    # Now fork the toplevel parent, which waits to hear from the daemon
+    # before leaving (unless _exit_caller was False).
+    is_parent = _fratricidal_fork(have_mercy=True)
     
-    # If is_parent, we know, for sure, that _exit_caller was False
     if is_parent:
+        _close_fds(preopened)
+        if pid_dir_fd is not None:
+            os.close(pid_dir_fd)
+        if index is not None:
+            index.close()
+        failure = startup_channel.wait(success_timeout)
+        if _exit_caller:
+            if failure is not None:
+                # Flush, since os._exit won't.
+                print(
+                    'Daemon failed to start:\n' + failure,
+                    file = sys.stderr,
+                    flush = True
+                )
+                os._exit(1)
+            else:
+                os._exit(0)
+                
+        elif failure is not None:
+            raise ChildProcessError('Daemon failed to start:\n' + failure)
+            
         # Reset args to be an equivalent expansion of *[None]s to prevent
         # accidentally trying to modify them in the parent
         args = [None] * len(args)
@@ -364,15 +977,69 @@ def daemonize(pid_file, *args, chdir=None, stdin_goto=None, stdout_goto=None,
         
     # Okay, we're the child.
     else:
-        # We need to detach ourself from the parent environment.
-        _filial_usurpation(chdir, umask)
-        # Okay, re-fork (no zombies!) and continue business as usual
-        _fratricidal_fork()
-        
-        # Do some important housekeeping
-        _write_pid(locked_pidfile)
-        _autoclose_files(shielded_fds, fd_fallback_limit)
-        _redirect_stds(stdin_goto, stdout_goto, stderr_goto)
+        startup_channel.open_child()
+        try:
+            _emit('forked', generation=1, parent=os.getppid())
+            # We need to detach ourself from the parent environment.
+            _filial_usurpation(chdir, umask)
+            _emit('setsid', sid=os.getsid(0))
+            # Okay, re-fork (no zombies!) and continue business as usual
+            _fratricidal_fork()
+            _emit('forked', generation=2, parent=os.getppid())
+            # Keep socket activation valid for anything that checks it
+            # itself, now that we have a new pid.
+            if activated:
+                os.environ['LISTEN_PID'] = str(os.getpid())
+            # Same goes for the watchdog, since we're about to take over as
+            # MAINPID.
+            if os.environ.get('WATCHDOG_PID') == str(launcher_pid):
+                os.environ['WATCHDOG_PID'] = str(os.getpid())
+            reaper = _become_subreaper(subreaper)
+            if reaper is not None:
+                shielded_fds.add(reaper.fileno())
+            _join_cgroup(cgroup)
+            _set_cpu_affinity(cpu_affinity)
+            _set_scheduling(scheduling)
+            
+            # Do some important housekeeping
+            _write_pid(locked_pidfile)
+            _chown_pidfile(locked_pidfile.fileno(), privileges)
+            _emit('pid_written', pid_file=pid_file)
+            if index is not None:
+                index.register(name, os.getpid(), pid_file)
+            _set_rlimits(rlimits)
+            _autoclose_files(shielded_fds, fd_fallback_limit)
+            _emit('fds_closed')
+            if jail is not None:
+                _enter_chroot(jail, jailed_chdir)
+                _set_event_log(jailed_event_log)
+                _emit('chrooted', root=jail)
+            _redirect_stds(
+                stdin_goto,
+                stdout_goto,
+                stderr_goto,
+                stream_options
+            )
+            _emit(
+                'streams_redirected',
+                stdin = stdin_goto,
+                stdout = stdout_goto,
+                stderr = stderr_goto
+            )
+            _drop_privileges(privileges, capabilities, groups)
+            if privileges is not None:
+                _emit('privileges_dropped', uid=os.getuid(), gid=os.getgid())
+            _inherited.update(activated)
+            _inherited.update(preopened)
+            
+        except BaseException:
+            startup_channel.fail_with_exc()
+            raise
+            
+        if defer_ready:
+            startup_channel.defer()
+        else:
+            startup_channel.ready()
     
         # We still need to adapt our return based on _exit_caller
         if not _exit_caller:
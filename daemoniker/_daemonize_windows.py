@@ -320,7 +320,19 @@ def _daemonize1(pid_file, *args, chdir=None, stdin_goto=None, stdout_goto=None,
                 stderr_goto=None, umask=0o027, shielded_fds=None,
                 fd_fallback_limit=1024, success_timeout=30,
                 strip_cmd_args=False, explicit_rescript=None,
-                _exit_caller=True):
+                cpu_affinity=None, rlimits=None, nice=None,
+                sched_policy=None, ioprio=None, oom_score_adj=None,
+                cgroup=None, cgroup_limits=None, cgroup_root=None,
+                stream_backlog=None, stream_overflow='block',
+                stream_rotate_bytes=None, stream_rotate_interval=None,
+                stream_rotate_keep=None, stream_open_flags=0,
+                stream_buffering=None, stream_identifier=None,
+                stream_compress=None, stream_compress_workers=1,
+                stderr_rate_limit=None, stderr_rate_burst=None,
+                stderr_dedupe=False, defer_ready=False, event_log=None,
+                user=None, group=None, keep_caps=None, preopen=None,
+                chroot=None, chroot_preload=None, subreaper=False,
+                registry=None, name=None, _exit_caller=True):
     ''' Create an independent process for invocation, telling it to
     store its "pid" in the pid_file (actually, the pid of its signal
     listener). Payload is an iterable of variables to pass the invoked
@@ -338,8 +350,17 @@ def _daemonize1(pid_file, *args, chdir=None, stdin_goto=None, stdout_goto=None,
         second run.
     all other args identical to unix version of daemonize.
     
-    umask, shielded_fds, fd_fallback_limit are unused for this
-    Windows version.
+    umask, shielded_fds, fd_fallback_limit, cpu_affinity, rlimits, nice,
+    sched_policy, ioprio, oom_score_adj, cgroup, cgroup_limits,
+    cgroup_root, stream_backlog, stream_overflow, stream_rotate_bytes,
+    stream_rotate_interval, stream_rotate_keep, stream_open_flags,
+    stream_buffering, stream_identifier, stream_compress,
+    stream_compress_workers, stderr_rate_limit, stderr_rate_burst,
+    stderr_dedupe, defer_ready, event_log, preopen, chroot_preload,
+    subreaper, registry, and name are unused for this Windows version.
+    user, group, keep_caps, and chroot raise NotImplementedError,
+    instead of leaving the daemon with more privileges (or less
+    confinement) than requested.
     
     success_timeout is the wait for a signal. If nothing happens
     after timeout, we will raise a ChildProcessError.
@@ -353,6 +374,13 @@ def _daemonize1(pid_file, *args, chdir=None, stdin_goto=None, stdout_goto=None,
     # Error trap and calculate invocation
     ####################################################################
     
+    if user is not None or group is not None or keep_caps is not None:
+        raise NotImplementedError(
+            'Dropping privileges is unsupported on Windows.'
+        )
+    elif chroot is not None:
+        raise NotImplementedError('chroot is unsupported on Windows.')
+    
     # Convert any unset std streams to go to dev null
     stdin_goto = default_to(stdin_goto, os.devnull)
     stdin_goto = os.path.abspath(stdin_goto)
@@ -0,0 +1,116 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import json
+import time
+import logging
+import traceback
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+# Where lifecycle events go: None, a path to a JSON-lines file, or a callable
+# that gets each event as a dict.
+_event_log = None
+
+
+def _set_event_log(target):
+    ''' Sets (or, with None, clears) the destination for lifecycle
+    events. Relative paths are resolved immediately, so that changing
+    directories (as daemonization does) doesn't move the log.
+    '''
+    global _event_log
+    
+    if target is None or callable(target):
+        _event_log = target
+    elif isinstance(target, str):
+        _event_log = os.path.abspath(target)
+    else:
+        raise TypeError('event_log must be a path or a callable.')
+
+
+def _emit(event, **fields):
+    ''' Records a lifecycle event, along with the current pid and the
+    time (both wall and monotonic). Never raises.
+    '''
+    target = _event_log
+    if target is None:
+        return
+    
+    record = {
+        'event': event,
+        'pid': os.getpid(),
+        'time': time.time(),
+        'monotonic': time.monotonic(),
+    }
+    record.update(fields)
+    
+    try:
+        if callable(target):
+            target(record)
+        
+        # Open the file every time, so that it can't be closed out from under
+        # us (ex: by _autoclose_files), and so that rotating it just works.
+        # O_APPEND and a single write keep concurrent processes from
+        # interleaving their events.
+        else:
+            line = json.dumps(record, default=str) + '\n'
+            fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+                         0o666)
+            try:
+                os.write(fd, line.encode('utf-8'))
+            finally:
+                os.close(fd)
+                
+    except Exception:
+        logger.error(
+            'Failed to record ' + event + ' event w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
@@ -0,0 +1,244 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import sys
+import mmap
+import time
+import zlib
+import struct
+import logging
+import threading
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    'FlightRecorder',
+    'read_flight_recorder',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+# File header: magic, version, capacity, head offset, next sequence number
+_HEADER = struct.Struct('<4sIQQQ')
+_MAGIC = b'DKFR'
+_VERSION = 1
+# Record header: sync, payload length, crc32, sequence number, wall time
+_RECORD = struct.Struct('<HHIQd')
+_SYNC = 0xD1A6
+_MAX_PAYLOAD = 2 ** 16 - 1
+
+
+class FlightRecorder:
+    ''' A fixed-size ring buffer of records, kept in a memory-mapped
+    file so that it survives a hard crash of the process. Writing a
+    record is just a memory copy; the kernel takes care of getting it
+    to disk.
+
+    If the file already exists with the same capacity, recording
+    continues where it left off, so that the previous run's records
+    remain available until they're overwritten.
+    '''
+
+    def __init__(self, path, capacity=2 ** 20):
+        if capacity < _RECORD.size + 1:
+            raise ValueError('capacity is too small.')
+
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+
+        total = _HEADER.size + capacity
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            resume = os.fstat(fd).st_size == total
+            if not resume:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, total)
+            self._mmap = mmap.mmap(fd, total)
+        finally:
+            # The mapping keeps its own reference to the file.
+            os.close(fd)
+
+        magic, version, old_capacity, head, seq = _HEADER.unpack_from(
+            self._mmap
+        )
+        if resume and (magic, version, old_capacity) == (_MAGIC, _VERSION,
+                                                         capacity):
+            self._head = head
+            self._seq = seq
+        else:
+            self._head = 0
+            self._seq = 0
+            self._mmap[:] = bytes(total)
+            self._write_header()
+
+    @classmethod
+    def for_pidfile(cls, pid_file, capacity=2 ** 20):
+        ''' Creates a FlightRecorder next to the pid_file, at
+        <pid_file>.flight.
+        '''
+        return cls(pid_file + '.flight', capacity)
+
+    def _write_header(self):
+        _HEADER.pack_into(
+            self._mmap,
+            0,
+            _MAGIC,
+            _VERSION,
+            self.capacity,
+            self._head,
+            self._seq
+        )
+
+    def record(self, message):
+        ''' Records a message, which may be str or bytes. Messages that
+        don't fit in the buffer (or are longer than 65535 bytes) are
+        truncated.
+        '''
+        if isinstance(message, str):
+            message = message.encode('utf-8', 'replace')
+
+        limit = min(_MAX_PAYLOAD, self.capacity - _RECORD.size)
+        payload = message[:limit]
+        size = _RECORD.size + len(payload)
+
+        with self._lock:
+            # Wrap around if the record won't fit, zeroing the remainder so
+            # that the reader doesn't see a partial old record there.
+            if self._head + size > self.capacity:
+                start = _HEADER.size + self._head
+                self._mmap[start:_HEADER.size + self.capacity] = bytes(
+                    self.capacity - self._head
+                )
+                self._head = 0
+
+            seq = self._seq
+            crc = zlib.crc32(payload, seq & 0xFFFFFFFF)
+            offset = _HEADER.size + self._head
+            _RECORD.pack_into(
+                self._mmap,
+                offset,
+                _SYNC,
+                len(payload),
+                crc,
+                seq,
+                time.time()
+            )
+            self._mmap[offset + _RECORD.size:offset + size] = payload
+
+            self._head += size
+            self._seq += 1
+            self._write_header()
+
+    def handler(self, level=logging.NOTSET):
+        ''' Returns a logging.Handler that records formatted log records
+        into the flight recorder.
+        '''
+        return _FlightRecorderHandler(self, level)
+
+    def flush(self):
+        ''' Asks the kernel to write the buffer to disk now. This is
+        never necessary to survive a process crash, only a kernel one.
+        '''
+        self._mmap.flush()
+
+    def close(self):
+        with self._lock:
+            self._mmap.close()
+
+
+class _FlightRecorderHandler(logging.Handler):
+    ''' Sends log records to a FlightRecorder.
+    '''
+
+    def __init__(self, recorder, level=logging.NOTSET):
+        super().__init__(level)
+        self.recorder = recorder
+
+    def emit(self, record):
+        try:
+            self.recorder.record(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+def read_flight_recorder(path):
+    ''' Decodes a FlightRecorder file, returning a list of its records
+    as (sequence number, wall time, payload bytes) tuples, oldest
+    first. This does not require the recording process to be alive.
+    '''
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, version, capacity, head, next_seq = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError('Not a flight recorder file: ' + path)
+
+    ring = memoryview(data)[_HEADER.size:_HEADER.size + capacity]
+    records = {}
+    offset = 0
+    # Records may have been partially overwritten, so we can't simply walk
+    # from one to the next; instead, resynchronize after anything invalid.
+    while offset + _RECORD.size <= capacity:
+        sync, length, crc, seq, wall = _RECORD.unpack_from(ring, offset)
+        end = offset + _RECORD.size + length
+        if sync == _SYNC and end <= capacity and seq < next_seq:
+            payload = bytes(ring[offset + _RECORD.size:end])
+            if zlib.crc32(payload, seq & 0xFFFFFFFF) == crc:
+                records[seq] = (seq, wall, payload)
+                offset = end
+                continue
+
+        offset += 1
+
+    return [records[seq] for seq in sorted(records)]
+
+
+if __name__ == '__main__':
+    ''' Decode and print a flight recorder file.
+    '''
+    for seq, wall, payload in read_flight_recorder(sys.argv[1]):
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(wall))
+        print(stamp, '#' + str(seq), payload.decode('utf-8', 'replace'))
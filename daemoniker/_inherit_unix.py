@@ -0,0 +1,293 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import stat
+import socket
+import select
+import logging
+import urllib.parse
+
+# Intra-package dependencies
+from .utils import platform_specificker
+
+_SUPPORTED_PLATFORM = platform_specificker(
+    linux_choice = True,
+    win_choice = False,
+    cygwin_choice = False,
+    osx_choice = True,
+    # Dunno if this is a good idea but might as well try
+    other_choice = True
+)
+
+if _SUPPORTED_PLATFORM:
+    import fcntl
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+# File descriptors handed to the daemon, as {name: fd}
+_inherited = {}
+
+# The first fd passed through socket activation
+SD_LISTEN_FDS_START = 3
+
+_SOCKET_TYPES = {
+    'tcp': socket.SOCK_STREAM,
+    'udp': socket.SOCK_DGRAM,
+    'unix': socket.SOCK_STREAM,
+}
+
+_FILE_MODES = {
+    'r': os.O_RDONLY,
+    'r+': os.O_RDWR,
+    'w': os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+    'w+': os.O_RDWR | os.O_CREAT | os.O_TRUNC,
+    'a': os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+    'a+': os.O_RDWR | os.O_CREAT | os.O_APPEND,
+}
+
+
+def inherited_fds():
+    ''' Returns a {name: fd} dict of all of the file descriptors that
+    were passed to the daemon through socket activation (LISTEN_FDS),
+    or opened for it by daemonize(preopen=...). The daemon owns the
+    fds; wrap them with, for example, socket.socket(fileno=fd) or
+    os.fdopen(fd).
+    '''
+    return dict(_inherited)
+
+
+def _listen_fds(environ=None):
+    ''' Parses the socket activation variables in environ (defaults to
+    os.environ), returning a {name: fd} dict of the fds passed to us,
+    which is empty unless LISTEN_PID is our pid. Like systemd, names
+    default to "unknown"; repeated names get a numeric suffix, as in
+    "http", "http.1".
+    '''
+    environ = os.environ if environ is None else environ
+    try:
+        if int(environ['LISTEN_PID']) != os.getpid():
+            return {}
+        count = int(environ['LISTEN_FDS'])
+    except (KeyError, ValueError):
+        return {}
+    
+    names = environ.get('LISTEN_FDNAMES', '').split(':')
+    fds = {}
+    for ii in range(count):
+        base = names[ii] if ii < len(names) and names[ii] else 'unknown'
+        name = base
+        suffix = 0
+        while name in fds:
+            suffix += 1
+            name = base + '.' + str(suffix)
+        fds[name] = SD_LISTEN_FDS_START + ii
+        
+    return fds
+
+
+def activate(args, listen, lazy=False, env=None):
+    ''' Acts as a socket activator: binds everything in listen (a
+    {name: spec} dict, with specs as for daemonize(preopen=...)), and
+    then executes args (a list, as for subprocess) in a child process,
+    handing it the fds through the LISTEN_FDS protocol. The target may
+    be another daemoniker daemon, or anything else that supports socket
+    activation.
+    
+    With lazy=True, waits until the first connection (or datagram)
+    arrives on any of the sockets before starting the target, so that
+    idle daemons cost nothing. Connections are never accepted here, so
+    the first one waits for the target.
+    
+    env (defaults to os.environ) is the environment for the target.
+    Returns the pid of the child.
+    '''
+    if not _SUPPORTED_PLATFORM:
+        raise OSError('Socket activation is unsupported on your platform.')
+    
+    opened = _preopen(listen)
+    try:
+        if lazy:
+            select.select(list(opened.values()), [], [])
+            
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _exec_activated(args, opened, env)
+            finally:
+                os._exit(127)
+                
+    # The child owns them now (or nobody will).
+    finally:
+        _close_fds(opened)
+        
+    return pid
+
+
+def _exec_activated(args, opened, env):
+    ''' Moves the fds in opened into place for socket activation, and
+    then replaces the current process with args.
+    '''
+    count = len(opened)
+    # First, move everything out of the way, so that none of the fds we're
+    # about to dup2 onto are one we still need.
+    moved = [
+        fcntl.fcntl(fd, fcntl.F_DUPFD_CLOEXEC, SD_LISTEN_FDS_START + count)
+        for fd in opened.values()
+    ]
+    for ii, fd in enumerate(moved):
+        os.dup2(fd, SD_LISTEN_FDS_START + ii, inheritable=True)
+        
+    env = dict(os.environ if env is None else env)
+    env['LISTEN_PID'] = str(os.getpid())
+    env['LISTEN_FDS'] = str(count)
+    env['LISTEN_FDNAMES'] = ':'.join(opened)
+    os.execvpe(args[0], args, env)
+
+
+def _open_socket(scheme, address):
+    ''' Creates, binds, and (for streams) listens on a socket for
+    address, returning its fd.
+    '''
+    sock_type = _SOCKET_TYPES[scheme]
+    
+    if scheme == 'unix':
+        path = address.path
+        if not path:
+            raise ValueError('unix sockets need a path, as in unix:///run/s')
+        # Clear out any stale socket from a previous run, but never anything
+        # else.
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+        family = socket.AF_UNIX
+        sockaddr = path
+        
+    else:
+        if address.port is None:
+            raise ValueError('Missing port for ' + address.geturl())
+        family, __, __, __, sockaddr = socket.getaddrinfo(
+            address.hostname or None,
+            address.port,
+            type = sock_type,
+            flags = socket.AI_PASSIVE
+        )[0]
+    
+    sock = socket.socket(family, sock_type)
+    try:
+        if family != socket.AF_UNIX:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(sockaddr)
+        if sock_type == socket.SOCK_STREAM:
+            sock.listen(socket.SOMAXCONN)
+            
+    except:
+        sock.close()
+        raise
+    
+    return sock.detach()
+
+
+def _open_one(name, spec):
+    ''' Opens a single preopen spec, returning its fd. spec is either a
+    socket address (ex: "tcp://0.0.0.0:80", "udp://[::]:53", or
+    "unix:///run/app.sock"), or a file path, optionally as a
+    (path, mode) tuple, where mode is as for open() ("r", "a", "w+",
+    etc; defaults to "r").
+    '''
+    if isinstance(spec, str):
+        address = urllib.parse.urlsplit(spec)
+        if address.scheme in _SOCKET_TYPES:
+            return _open_socket(address.scheme, address)
+        path = spec
+        mode = 'r'
+        
+    else:
+        path, mode = spec
+        
+    try:
+        flags = _FILE_MODES[mode.replace('b', '')]
+    except KeyError:
+        raise ValueError(
+            'Unknown mode for preopened ' + name + ': ' + repr(mode)
+        ) from None
+    
+    return os.open(path, flags, 0o666)
+
+
+def _preopen(preopen):
+    ''' Opens everything in preopen (a {name: spec} dict; see _open_one),
+    returning a {name: fd} dict. If anything fails, closes everything
+    opened so far and raises.
+    '''
+    opened = {}
+    if not preopen:
+        return opened
+    
+    try:
+        for name, spec in preopen.items():
+            opened[name] = _open_one(name, spec)
+            
+    except:
+        _close_fds(opened)
+        raise
+        
+    return opened
+
+
+def _close_fds(fds):
+    for fd in fds.values():
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    fds.clear()
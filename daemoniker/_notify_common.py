@@ -0,0 +1,178 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import socket
+import logging
+import threading
+import traceback
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+def _notify_address(environ=None):
+    ''' Returns the address in NOTIFY_SOCKET, converted for
+    socket.sendto, or None if there isn't one (or it's one we don't
+    understand). A leading @ denotes the Linux abstract namespace.
+    '''
+    environ = os.environ if environ is None else environ
+    address = environ.get('NOTIFY_SOCKET')
+    if not address or not hasattr(socket, 'AF_UNIX'):
+        return None
+    elif address.startswith('@'):
+        return '\0' + address[1:]
+    elif address.startswith('/'):
+        return address
+    else:
+        return None
+
+
+def notify(**fields):
+    ''' Sends fields to the service manager through NOTIFY_SOCKET, as
+    in notify(READY=1) or notify(STATUS='Reticulating splines'). Field
+    names are upper-cased. Returns True if the notification was sent,
+    and False if there is no service manager listening (or the send
+    failed), so that daemons can call it unconditionally.
+    '''
+    address = _notify_address()
+    if address is None or not fields:
+        return False
+    
+    message = '\n'.join(
+        name.upper() + '=' + str(value) for name, value in fields.items()
+    ).encode('utf-8')
+    
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(message, address)
+            
+    except OSError as exc:
+        logger.warning('Failed to notify service manager: ' + repr(exc))
+        return False
+    
+    return True
+
+
+def _watchdog_interval(environ=None):
+    ''' Returns the number of seconds between watchdog pings that the
+    service manager expects of us (half of WATCHDOG_USEC, like
+    sd_watchdog_enabled recommends), or None if it doesn't want any.
+    '''
+    environ = os.environ if environ is None else environ
+    try:
+        usec = int(environ['WATCHDOG_USEC'])
+        pid = environ.get('WATCHDOG_PID')
+        if pid is not None and int(pid) != os.getpid():
+            return None
+    except (KeyError, ValueError):
+        return None
+    
+    if usec <= 0:
+        return None
+    return usec / 2 / 1000000
+
+
+class ServiceWatchdog:
+    ''' Pings the service manager's watchdog (WATCHDOG=1) from a
+    daughter thread, at the interval it asked for through
+    WATCHDOG_USEC. If check is passed, it is called before every ping,
+    and the ping is skipped unless it returns something truthy, so that
+    a wedged daemon can still be caught by the watchdog.
+    '''
+
+    def __init__(self, check=None):
+        self.check = check
+        self.interval = _watchdog_interval()
+        
+        self._opslock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        ''' Starts pinging. Does nothing if the service manager didn't
+        ask for a watchdog.
+        '''
+        with self._opslock:
+            if self._thread is not None:
+                raise RuntimeError('ServiceWatchdog is already running.')
+            elif self.interval is None:
+                return
+            
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target = self._ping_loop,
+                name = 'ServiceWatchdog',
+                daemon = True
+            )
+            self._thread.start()
+
+    def stop(self):
+        ''' Stops pinging.
+        '''
+        with self._opslock:
+            if self._thread is None:
+                return
+            
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    def _ping_loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                healthy = self.check is None or self.check()
+            except Exception:
+                logger.error(
+                    'ServiceWatchdog check failed w/ traceback: \n' +
+                    ''.join(traceback.format_exc())
+                )
+                healthy = False
+                
+            if healthy:
+                notify(WATCHDOG=1)
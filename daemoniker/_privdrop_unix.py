@@ -49,6 +49,7 @@ import logging
 import atexit
 import traceback
 import shutil
+import functools
 
 # Intra-package dependencies
 from .utils import platform_specificker
@@ -89,62 +90,299 @@ __all__ = [
 # ###############################################
 
         
-def _setuser(user):
-    ''' Normalizes user to a uid and sets the current uid, or does 
-    nothing if user is None.
+# From linux/capability.h
+_CAPABILITIES = {
+    'chown': 0,
+    'dac_override': 1,
+    'dac_read_search': 2,
+    'fowner': 3,
+    'fsetid': 4,
+    'kill': 5,
+    'setgid': 6,
+    'setuid': 7,
+    'setpcap': 8,
+    'linux_immutable': 9,
+    'net_bind_service': 10,
+    'net_broadcast': 11,
+    'net_admin': 12,
+    'net_raw': 13,
+    'ipc_lock': 14,
+    'ipc_owner': 15,
+    'sys_module': 16,
+    'sys_rawio': 17,
+    'sys_chroot': 18,
+    'sys_ptrace': 19,
+    'sys_pacct': 20,
+    'sys_admin': 21,
+    'sys_boot': 22,
+    'sys_nice': 23,
+    'sys_resource': 24,
+    'sys_time': 25,
+    'sys_tty_config': 26,
+    'mknod': 27,
+    'lease': 28,
+    'audit_write': 29,
+    'audit_control': 30,
+    'setfcap': 31,
+    'mac_override': 32,
+    'mac_admin': 33,
+    'syslog': 34,
+    'wake_alarm': 35,
+    'block_suspend': 36,
+    'audit_read': 37,
+    'perfmon': 38,
+    'bpf': 39,
+    'checkpoint_restore': 40,
+}
+_LINUX_CAPABILITY_VERSION_3 = 0x20080522
+# From linux/prctl.h
+_PR_SET_KEEPCAPS = 8
+
+
+@functools.lru_cache(maxsize=None)
+def _lookup_user(user):
+    ''' Resolves user (a name or a uid) into its pwd entry. Cached, so
+    that repeated launches don't repeat (potentially very slow, for ex
+    over LDAP) NSS lookups.
     '''
-    if user is None:
-        return
+    if isinstance(user, str):
+        return pwd.getpwnam(user)
+    else:
+        return pwd.getpwuid(user)
         
-    # Normalize group to gid
-    elif isinstance(user, str):
-        uid = pwd.getpwnam(user).pw_uid
-    # The group is already a gid.
+        
+@functools.lru_cache(maxsize=None)
+def _lookup_group(group):
+    ''' Resolves group (a name or a gid) into a gid. Cached, as above.
+    '''
+    if isinstance(group, str):
+        return grp.getgrnam(group).gr_gid
     else:
-        uid = user
+        # Make sure it exists.
+        return grp.getgrgid(group).gr_gid
         
-    try:
-        os.setuid(uid)
-    except OSError:
-        self.logger.error('Unable to change user.')
-        sys.exit(1)
-    
+        
+@functools.lru_cache(maxsize=None)
+def _lookup_grouplist(username, gid):
+    ''' Looks up the supplementary groups of username, as a tuple so
+    the cached value can't be mutated. Cached, as above.
+    '''
+    return tuple(os.getgrouplist(username, gid))
+        
+        
+def _normalize_privileges(user, group):
+    ''' Resolves user and group into a (uid, gid, username) tuple, or
+    None if both are None. Raises ValueError if either doesn't exist.
     
-def _setgroup(group):
-    ''' Normalizes group to a gid and sets the current gid, or does 
-    nothing if group is None.
+    If only a user is passed, the group defaults to its primary group.
+    If only a group is passed, uid and username are None.
     '''
-    if group is None:
-        return
+    if user is None and group is None:
+        return None
+        
+    if user is not None:
+        try:
+            entry = _lookup_user(user)
+        except KeyError:
+            raise ValueError('Unknown user: ' + repr(user)) from None
+        uid = entry.pw_uid
+        username = entry.pw_name
+        gid = entry.pw_gid
         
-    # Normalize group to gid
-    elif isinstance(group, str):
-        gid = grp.getgrnam(group).gr_gid
-    # The group is already a gid.
     else:
-        gid = group
+        uid = None
+        username = None
+        
+    if group is not None:
+        try:
+            gid = _lookup_group(group)
+        except KeyError:
+            raise ValueError('Unknown group: ' + repr(group)) from None
+    
+    return uid, gid, username
+    
+    
+def _normalize_capabilities(keep_caps, privileges):
+    ''' Converts keep_caps (capability names like "CAP_NET_BIND_SERVICE"
+    or "net_bind_service", or their numbers) into a frozenset of
+    capability numbers, or None if there are none to keep. Raises
+    ValueError for unknown capabilities, or if there's no user to keep
+    them for, and OSError if we aren't on Linux.
+    '''
+    if not keep_caps:
+        return None
+    elif not sys.platform.startswith('linux'):
+        raise OSError('Keeping capabilities is only supported on Linux.')
+    elif privileges is None or privileges[0] is None:
+        raise ValueError('keep_caps requires a user to drop privileges to.')
+    
+    capabilities = set()
+    for cap in keep_caps:
+        if isinstance(cap, str):
+            name = cap.lower()
+            if name.startswith('cap_'):
+                name = name[4:]
+                
+            try:
+                cap = _CAPABILITIES[name]
+            except KeyError:
+                raise ValueError('Unknown capability: ' + repr(cap)) from None
+                
+        elif cap not in _CAPABILITIES.values():
+            raise ValueError('Unknown capability: ' + repr(cap))
+            
+        capabilities.add(cap)
+        
+    return frozenset(capabilities)
+    
+    
+def _prctl(option, arg2, arg3=0):
+    import ctypes
+    
+    libc = ctypes.CDLL(None, use_errno=True)
+    result = libc.prctl(option, ctypes.c_ulong(arg2), ctypes.c_ulong(arg3),
+                        ctypes.c_ulong(0), ctypes.c_ulong(0))
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    
+    
+def _capset(capabilities):
+    ''' Sets the effective and permitted capabilities of the current
+    thread to exactly capabilities, and clears the inheritable ones,
+    through the raw capset syscall (we don't want to depend upon
+    libcap).
+    '''
+    import ctypes
+    
+    class CapHeader(ctypes.Structure):
+        _fields_ = [('version', ctypes.c_uint32), ('pid', ctypes.c_int)]
         
+    class CapData(ctypes.Structure):
+        _fields_ = [
+            ('effective', ctypes.c_uint32),
+            ('permitted', ctypes.c_uint32),
+            ('inheritable', ctypes.c_uint32),
+        ]
+    
+    mask = 0
+    for cap in capabilities:
+        mask |= 1 << cap
+        
+    header = CapHeader(_LINUX_CAPABILITY_VERSION_3, 0)
+    # Version 3 splits the 64-bit masks across two structs.
+    data = (CapData * 2)()
+    for ii in range(2):
+        half = (mask >> (32 * ii)) & 0xFFFFFFFF
+        data[ii].effective = half
+        data[ii].permitted = half
+        data[ii].inheritable = 0
+    
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.capset(ctypes.byref(header), data) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    
+    
+def _chown_pidfile(pid_fd, privileges):
+    ''' Gives the pidfile at pid_fd to the user and group we're about to
+    become, so that it can still be cleaned up.
+    '''
+    if privileges is None:
+        return
+    
+    uid, gid, username = privileges
     try:
+        os.fchown(pid_fd, -1 if uid is None else uid, gid)
+    except OSError as exc:
+        logger.critical(
+            'Failed to chown the PID file w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+        raise SystemExit('Failed to chown PID file.') from exc
+    
+    
+def _resolve_groups(privileges):
+    ''' Looks up the supplementary groups for the (already normalized)
+    privileges ahead of time, for when the group database won't be
+    available when we drop them (ex: from inside a chroot). Returns
+    None if there are no privileges to drop.
+    '''
+    if privileges is None:
+        return None
+    
+    uid, gid, username = privileges
+    if username is None:
+        return [gid]
+    else:
+        return list(_lookup_grouplist(username, gid))
+
+
+def _drop_privileges(privileges, capabilities=None, groups=None):
+    ''' Switches to the (already normalized) privileges, or does nothing
+    if they are None. Supplementary groups are replaced with those of
+    the new user (or with just the new group), so that none of our
+    current ones leak through. Group goes first, since we can't change
+    it after giving up root. groups, if not None, is the already
+    resolved list of supplementary groups (see _resolve_groups).
+    
+    capabilities (normalized) are kept through the switch, but only by
+    us: they aren't passed on to anything we exec.
+    '''
+    if privileges is None:
+        return
+    
+    uid, gid, username = privileges
+    try:
+        if groups is not None:
+            os.setgroups(groups)
+        elif username is not None:
+            os.initgroups(username, gid)
+        else:
+            os.setgroups([gid])
         os.setgid(gid)
-    except OSError:
-        self.logger.error('Unable to change group.')
-        sys.exit(1)
+        
+        if capabilities:
+            # Otherwise, setuid clears all of our permitted capabilities.
+            _prctl(_PR_SET_KEEPCAPS, 1)
+            try:
+                os.setuid(uid)
+            finally:
+                _prctl(_PR_SET_KEEPCAPS, 0)
+            # The effective set is cleared regardless, and everything we
+            # don't want to keep is still permitted.
+            _capset(capabilities)
+            
+        elif uid is not None:
+            os.setuid(uid)
+            
+    except OSError as exc:
+        logger.critical(
+            'Failed to drop privileges w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+        raise SystemExit('Failed to drop privileges.') from exc
 
 
-def daemote(pid_file, user, group):
+def daemote(pid_file, user, group, keep_caps=None):
     ''' Change gid and uid, dropping privileges.
     
-    Either user or group may explicitly pass None to keep it the same.
+    Either user or group may explicitly pass None. A missing group
+    defaults to the user's primary group; a missing user is unchanged.
+    keep_caps is an iterable of Linux capabilities to retain, like
+    "CAP_NET_BIND_SERVICE".
     
     The pid_file will be chown'ed so it can still be cleaned up.
     '''
     if not _SUPPORTED_PLATFORM:
         raise OSError('Daemotion is unsupported on your platform.')
     
-    # No need to do anything special, just chown the pidfile
-    # This will also catch any bad group, user names
-    shutil.chown(pid_file, user, group)
+    privileges = _normalize_privileges(user, group)
+    capabilities = _normalize_capabilities(keep_caps, privileges)
+    if privileges is None:
+        return
     
-    # Now update group and then user
-    _setgroup(group)
-    _setuser(user)
+    uid, gid, username = privileges
+    # This will still catch any bad group, user names
+    shutil.chown(pid_file, uid, gid)
+    _drop_privileges(privileges, capabilities)
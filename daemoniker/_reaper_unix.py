@@ -0,0 +1,249 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import sys
+import signal
+import logging
+import traceback
+
+# Intra-package dependencies
+from ._privdrop_unix import _prctl
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+# From linux/prctl.h
+_PR_SET_PDEATHSIG = 1
+_PR_SET_CHILD_SUBREAPER = 36
+
+
+def _check_subreaper(subreaper):
+    ''' Makes sure that we can become a subreaper, if requested.
+    '''
+    if subreaper and not sys.platform.startswith('linux'):
+        raise OSError('subreaper is only supported on Linux.')
+
+
+def _describe_status(status):
+    ''' Describes a wait status, for logging.
+    '''
+    if os.WIFEXITED(status):
+        return 'exit code ' + str(os.WEXITSTATUS(status))
+    elif os.WIFSIGNALED(status):
+        return 'signal ' + str(os.WTERMSIG(status))
+    else:
+        return 'status ' + str(status)
+
+
+class _Reaper:
+    ''' SIGCHLD handler for subreapers. Reaps the orphans that were
+    reparented to us, without blocking, but leaves our own children to
+    whoever spawned them (ex: os.fork), so that their exit status isn't
+    lost.
+    
+    The kernel doesn't say which of our children were adopted, so we
+    record the ones that we fork ourselves, by comparing our children
+    from before and after every fork (with os.register_at_fork). Any
+    other child is an orphan. Note that subprocess only runs the fork
+    hooks when given a preexec_fn.
+    
+    Without os.register_at_fork (before Python 3.7), we instead keep
+    track of the parent that every descendant had when we first saw
+    it, looking through /proc every time a child exits. Anything
+    orphaned before we've seen it is then taken for our own.
+    '''
+    
+    def __init__(self):
+        self._pid = os.getpid()
+        # Kept open so that we can still find /proc from within a chroot.
+        self._proc_fd = os.open('/proc', os.O_RDONLY | os.O_DIRECTORY)
+        # (pid, start time) -> parent pid, when we first saw it. The start
+        # time keeps a reused pid from inheriting a stale parent.
+        self._parents = {}
+        # (pid, start time) of the children we forked ourselves.
+        self._own = set()
+        self._before_fork = set()
+        self._tracks_forks = hasattr(os, 'register_at_fork')
+        if self._tracks_forks:
+            os.register_at_fork(
+                before = self._note_children,
+                after_in_parent = self._record_forked
+            )
+        
+    def fileno(self):
+        ''' Returns our handle on /proc, which must be kept open.
+        '''
+        return self._proc_fd
+        
+    def _processes(self):
+        ''' Yields (pid, start time, parent pid) for every process in
+        /proc.
+        '''
+        for entry in os.listdir(self._proc_fd):
+            if not entry.isdigit():
+                continue
+                
+            try:
+                fd = os.open(entry + '/stat', os.O_RDONLY,
+                             dir_fd=self._proc_fd)
+            # Already gone.
+            except OSError:
+                continue
+                
+            try:
+                stat = os.read(fd, 4096)
+            except OSError:
+                continue
+            finally:
+                os.close(fd)
+                
+            # The command name may itself contain spaces and parens.
+            fields = stat.rsplit(b')', 1)[-1].split()
+            if len(fields) >= 20:
+                yield int(entry), fields[19], int(fields[1])
+    
+    def _children(self):
+        ''' Returns (pid, start time) for each of our children.
+        '''
+        return {
+            (pid, started) for pid, started, ppid in self._processes()
+            if ppid == self._pid
+        }
+        
+    def _note_children(self):
+        if os.getpid() == self._pid:
+            self._before_fork = self._children()
+            
+    def _record_forked(self):
+        if os.getpid() == self._pid:
+            self._own.update(self._children() - self._before_fork)
+            self._before_fork = set()
+    
+    def adopted(self):
+        ''' Updates our family tree, returning the pids of the children
+        that we have adopted.
+        '''
+        children = {}
+        for pid, started, ppid in self._processes():
+            children.setdefault(ppid, []).append((pid, started))
+        
+        descendants = {}
+        parents = [self._pid]
+        while parents:
+            parent = parents.pop()
+            for key in children.get(parent, ()):
+                descendants[key] = parent
+                parents.append(key[0])
+                
+        # Only keep the descendants that are still around.
+        self._parents = {
+            key: self._parents.get(key, parent)
+            for key, parent in descendants.items()
+        }
+        self._own.intersection_update(descendants)
+        return [
+            key[0] for key, parent in descendants.items()
+            if parent == self._pid and self._is_adopted(key)
+        ]
+        
+    def _is_adopted(self, key):
+        if self._tracks_forks:
+            return key not in self._own
+        else:
+            return self._parents[key] != self._pid
+        
+    def __call__(self, signum=None, frame=None):
+        ''' Reaps every adopted child that has exited.
+        '''
+        for pid in self.adopted():
+            try:
+                reaped, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                continue
+                
+            if reaped:
+                logger.debug(
+                    'Reaped orphan ' + str(pid) + ' with ' +
+                    _describe_status(status)
+                )
+
+
+def _become_subreaper(subreaper):
+    ''' Marks us as the subreaper for all of our descendants, so that
+    orphans are reparented to us instead of to init, and reaps them as
+    they exit (see _Reaper). Returns the _Reaper, whose fileno() must be
+    kept open, or None if subreaper is False.
+    '''
+    if not subreaper:
+        return None
+    
+    try:
+        reaper = _Reaper()
+        _prctl(_PR_SET_CHILD_SUBREAPER, 1)
+        signal.signal(signal.SIGCHLD, reaper)
+        return reaper
+        
+    except OSError as exc:
+        logger.critical(
+            'Failed to become a subreaper w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+        raise SystemExit('Failed to become a subreaper.') from exc
+
+
+def set_pdeathsig(signum=signal.SIGTERM):
+    ''' Asks the kernel to send signum to the current process when its
+    parent dies. Intended for helper processes, for example through
+    subprocess.Popen(..., preexec_fn=set_pdeathsig). Linux only.
+    '''
+    if not sys.platform.startswith('linux'):
+        raise OSError('set_pdeathsig is only supported on Linux.')
+    
+    _prctl(_PR_SET_PDEATHSIG, int(signum))
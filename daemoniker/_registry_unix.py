@@ -0,0 +1,318 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import time
+import zlib
+import fcntl
+import struct
+import logging
+import contextlib
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    'Registry',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+# File header: magic, version, slot count, record size
+_HEADER = struct.Struct('<4sIII')
+_MAGIC = b'DKRG'
+_VERSION = 1
+# Record: slot state, pid, start (wall) time, name, pid file
+_RECORD = struct.Struct('<B3xId128s1024s')
+_EMPTY = 0
+_USED = 1
+# Deleted records keep probe chains intact until they're reused.
+_TOMBSTONE = 2
+
+_INDEX_NAME = 'index'
+
+
+class Registry:
+    ''' A directory of daemons, indexed by name. The index is a single
+    file of fixed-size records in hash slots (with linear probing), so
+    looking up a daemon reads a record or two, instead of globbing and
+    opening every pid file. Changes are made under an exclusive flock
+    of the index, so many daemons may share one registry.
+    
+    slots only applies when creating the registry; it's the maximum
+    number of daemons it can hold at once.
+    '''
+
+    def __init__(self, directory, slots=4096, readonly=False):
+        if slots < 1:
+            raise ValueError('slots must be positive.')
+        
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, _INDEX_NAME)
+        
+        if readonly:
+            self._fd = os.open(self.path, os.O_RDONLY)
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            
+        try:
+            with self._locked(fcntl.LOCK_EX if not readonly
+                              else fcntl.LOCK_SH):
+                header = os.pread(self._fd, _HEADER.size, 0)
+                # Brand new: create it.
+                if not header and not readonly:
+                    os.pwrite(
+                        self._fd,
+                        _HEADER.pack(_MAGIC, _VERSION, slots, _RECORD.size),
+                        0
+                    )
+                    os.ftruncate(self._fd, _HEADER.size + slots * _RECORD.size)
+                    self.slots = slots
+                else:
+                    self.slots = self._check_header(header)
+        except:
+            os.close(self._fd)
+            raise
+
+    def _check_header(self, header):
+        try:
+            magic, version, slots, record_size = _HEADER.unpack(header)
+        except struct.error:
+            raise ValueError('Not a daemoniker registry: ' + self.path) \
+                from None
+            
+        if (magic, version, record_size) != (_MAGIC, _VERSION, _RECORD.size):
+            raise ValueError('Not a daemoniker registry: ' + self.path)
+        return slots
+
+    def fileno(self):
+        return self._fd
+
+    def close(self):
+        ''' Closes the index.
+        '''
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+    @contextlib.contextmanager
+    def _locked(self, operation):
+        fcntl.flock(self._fd, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _encode(name, pid_file=''):
+        ''' Converts name and pid_file into bytes, making sure that they
+        fit in a record.
+        '''
+        name_bytes = name.encode('utf-8')
+        path_bytes = pid_file.encode('utf-8')
+        if not name_bytes or len(name_bytes) > 128:
+            raise ValueError('Registry names must be 1 to 128 bytes long.')
+        elif len(path_bytes) > 1024:
+            raise ValueError('Registered pid files must be at most 1024 '
+                             'bytes long.')
+        return name_bytes, path_bytes
+
+    def _read(self, slot):
+        return _RECORD.unpack(os.pread(
+            self._fd,
+            _RECORD.size,
+            _HEADER.size + slot * _RECORD.size
+        ))
+
+    def _write(self, slot, *record):
+        os.pwrite(
+            self._fd,
+            _RECORD.pack(*record),
+            _HEADER.size + slot * _RECORD.size
+        )
+
+    def _probe(self, name_bytes):
+        ''' Returns (slot of name, first free slot), either of which may
+        be None.
+        '''
+        start = zlib.crc32(name_bytes) % self.slots
+        free = None
+        for offset in range(self.slots):
+            slot = (start + offset) % self.slots
+            state, __, __, name, __ = self._read(slot)
+            if state == _USED and name.rstrip(b'\0') == name_bytes:
+                return slot, free
+            elif state != _USED and free is None:
+                free = slot
+            # Nothing past here was ever part of the chain.
+            if state == _EMPTY:
+                break
+        return None, free
+
+    @staticmethod
+    def _entry(record):
+        __, pid, started, name, pid_file = record
+        return {
+            'name': name.rstrip(b'\0').decode('utf-8'),
+            'pid': pid,
+            'started': started,
+            'pid_file': pid_file.rstrip(b'\0').decode('utf-8'),
+        }
+
+    def register(self, name, pid, pid_file, started=None):
+        ''' Records (or replaces) the entry for name. started defaults
+        to now. Raises OSError if the registry is full.
+        '''
+        name_bytes, path_bytes = self._encode(name, pid_file)
+        if started is None:
+            started = time.time()
+            
+        with self._locked(fcntl.LOCK_EX):
+            slot, free = self._probe(name_bytes)
+            if slot is None:
+                slot = free
+            if slot is None:
+                raise OSError('Daemon registry is full: ' + self.path)
+            self._write(slot, _USED, pid, started, name_bytes, path_bytes)
+
+    def unregister(self, name, pid=None):
+        ''' Removes the entry for name, if there is one (and, if pid is
+        not None, only if it still belongs to pid). Returns True if an
+        entry was removed.
+        '''
+        name_bytes, __ = self._encode(name)
+        with self._locked(fcntl.LOCK_EX):
+            slot, __ = self._probe(name_bytes)
+            if slot is None:
+                return False
+            if pid is not None and self._read(slot)[1] != pid:
+                return False
+            self._write(slot, _TOMBSTONE, 0, 0, b'', b'')
+            return True
+
+    def lookup(self, name):
+        ''' Returns the entry for name, as a dict with its name, pid,
+        started (wall) time, and pid_file, or None if there isn't one.
+        '''
+        name_bytes, __ = self._encode(name)
+        with self._locked(fcntl.LOCK_SH):
+            slot, __ = self._probe(name_bytes)
+            if slot is None:
+                return None
+            return self._entry(self._read(slot))
+
+    def entries(self):
+        ''' Returns a list of every entry (see lookup), sorted by name.
+        '''
+        with self._locked(fcntl.LOCK_SH):
+            data = os.pread(
+                self._fd,
+                self.slots * _RECORD.size,
+                _HEADER.size
+            )
+        entries = [
+            self._entry(record)
+            for record in _RECORD.iter_unpack(data)
+            if record[0] == _USED
+        ]
+        return sorted(entries, key=lambda entry: entry['name'])
+
+    def scan(self, max_workers=None):
+        ''' Returns the status() of every registered daemon, along with
+        its name, probing them concurrently (see scan()).
+        '''
+        import concurrent.futures
+        from ._status_unix import status
+        
+        def probe(entry):
+            result = status(entry['pid_file'])
+            result['name'] = entry['name']
+            return result
+            
+        entries = self.entries()
+        if not entries:
+            return []
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(probe, entries))
+
+
+def _open_registry(directory, name, pid_file):
+    ''' Opens the registry at directory for a daemon being started with
+    pid_file, returning (registry, name), or (None, None) if directory is
+    None. name defaults to the pid_file's name, without its extension.
+    Raises ValueError if name is already taken by a running daemon.
+    '''
+    if directory is None:
+        return None, None
+    
+    if name is None:
+        name = os.path.splitext(os.path.basename(pid_file))[0]
+    
+    from ._status_unix import _read_pid
+    from ._status_unix import _state
+    
+    registry = Registry(directory)
+    try:
+        Registry._encode(name, pid_file)
+        existing = registry.lookup(name)
+        if (existing is not None and
+                existing['pid_file'] != pid_file and
+                _state(existing['pid_file'],
+                       _read_pid(existing['pid_file'])) == 'running'):
+            raise ValueError(
+                'Registry name ' + repr(name) + ' is already in use by ' +
+                existing['pid_file']
+            )
+    except:
+        registry.close()
+        raise
+        
+    return registry, name
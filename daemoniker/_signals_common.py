@@ -73,9 +73,44 @@ def _noop(*args, **kwargs):
     pass
                 
                 
-def send(pid_file, signal):
+def _signal_numbers():
+    ''' Returns a {name: number} dict of the signals on this platform,
+    like signal.Signals (which needs Python 3.5) would.
+    '''
+    if hasattr(signal, 'Signals'):
+        return {sig.name: sig.value for sig in signal.Signals}
+    
+    return {
+        name: value for name, value in vars(signal).items()
+        if name.startswith('SIG') and not name.startswith('SIG_') and
+        isinstance(value, int)
+    }
+    
+    
+def _signal_name(signum):
+    ''' Returns the name of signum (ex: "SIGHUP"), or just the number
+    (as a string) if it doesn't have one.
+    '''
+    if hasattr(signal, 'Signals'):
+        try:
+            return signal.Signals(signum).name
+        except ValueError:
+            return str(signum)
+    
+    # Pick the same name every time, like SIGABRT over its alias SIGIOT.
+    names = sorted(
+        name for name, value in _signal_numbers().items() if value == signum
+    )
+    return names[0] if names else str(signum)
+                
+                
+def send(pid_file, signal, process_group=False):
     ''' Sends the signal in signum to the pid_file. Num can be either
     int or one of the exceptions.
+    
+    process_group=True sends it to the daemon's entire process group
+    instead (which, on Unix, includes any helpers it has spawned that
+    haven't moved into their own).
     '''
     if isinstance(signal, DaemonikerSignal):
         signum = signal.SIGNUM
@@ -87,7 +122,12 @@ def send(pid_file, signal):
     with open(pid_file, 'r') as f:
         pid = int(f.read())
         
-    os.kill(pid, signum)
+    if not process_group:
+        os.kill(pid, signum)
+    elif hasattr(os, 'killpg'):
+        os.killpg(os.getpgid(pid), signum)
+    else:
+        raise OSError('Process groups are unsupported on your platform.')
     
     
 def ping(pid_file):
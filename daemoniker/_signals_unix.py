@@ -38,12 +38,19 @@ import logging
 import atexit
 import traceback
 import shutil
+import time
 
 # Intra-package dependencies
 from .utils import platform_specificker
 from .utils import default_to
 
 from ._signals_common import _SighandlerCore
+from ._signals_common import _normalize_handler
+from ._signals_common import _signal_name
+
+from ._streams_common import _reopen_files
+
+from ._events_common import _emit
 
 from .exceptions import DaemonikerSignal
 from .exceptions import SignalError
@@ -113,14 +120,19 @@ class SignalHandler1(_SighandlerCore):
     ''' Signal handling system using lightweight wrapper around built-in
     signal.signal handling.
     '''
-    def __init__(self, pid_file, sigint=None, sigterm=None, sigabrt=None):
+    def __init__(self, pid_file, sigint=None, sigterm=None, sigabrt=None,
+                 sighup=None):
         ''' Creates a signal handler, using the passed callables. None
         will assign the default handler (raise in main). passing
         IGNORE_SIGNAL constant will result in the signal being noop'd.
+        
+        The exception is sighup, which defaults to reopening the
+        redirected stdout and stderr files instead of raising.
         '''
         self.sigint = sigint
         self.sigterm = sigterm
         self.sigabrt = sigabrt
+        self.sighup = sighup
         
         # Yeah, except this isn't used at all (just here for cross-platform
         # consistency)
@@ -133,9 +145,28 @@ class SignalHandler1(_SighandlerCore):
         self._old_sigint = ZeroDivisionError
         self._old_sigterm = ZeroDivisionError
         self._old_sigabrt = ZeroDivisionError
+        self._old_sighup = ZeroDivisionError
         
         self._running = False
         
+    @property
+    def sighup(self):
+        ''' Gets sighup.
+        '''
+        return self._sighup
+        
+    @sighup.setter
+    def sighup(self, handler):
+        ''' Normalizes and sets sighup.
+        '''
+        self._sighup = _normalize_handler(handler, self._reopen_handler)
+        
+    @sighup.deleter
+    def sighup(self):
+        ''' Returns the sighup handler to the default.
+        '''
+        self.sighup = None
+        
     def start(self):
         ''' Starts signal handling.
         '''
@@ -148,27 +179,32 @@ class SignalHandler1(_SighandlerCore):
         old_sigint = ZeroDivisionError
         old_sigterm = ZeroDivisionError
         old_sigabrt = ZeroDivisionError
+        old_sighup = ZeroDivisionError
         
         try:
             # First we need to make closures around all of our attributes, so
             # they can be updated after we start listening to signals
             def sigint_closure(signum, frame):
-                return self.sigint(signum)
+                return self._dispatch(self.sigint, signum)
             def sigterm_closure(signum, frame):
-                return self.sigterm(signum)
+                return self._dispatch(self.sigterm, signum)
             def sigabrt_closure(signum, frame):
-                return self.sigabrt(signum)
+                return self._dispatch(self.sigabrt, signum)
+            def sighup_closure(signum, frame):
+                return self._dispatch(self.sighup, signum)
                 
             # Now simply register those with signal.signal
             old_sigint = signal.signal(signal.SIGINT, sigint_closure)
             old_sigterm = signal.signal(signal.SIGTERM, sigterm_closure)
             old_sigabrt = signal.signal(signal.SIGABRT, sigabrt_closure)
+            old_sighup = signal.signal(signal.SIGHUP, sighup_closure)
             
         # If that fails, restore previous state and reraise
         except:
             _restore_any_previous_handler(signal.SIGINT, old_sigint)
             _restore_any_previous_handler(signal.SIGTERM, old_sigterm)
             _restore_any_previous_handler(signal.SIGABRT, old_sigabrt)
+            _restore_any_previous_handler(signal.SIGHUP, old_sighup)
             raise
             
         # If that succeeds, set self._running and cache old handlers
@@ -176,6 +212,7 @@ class SignalHandler1(_SighandlerCore):
             self._old_sigint = old_sigint
             self._old_sigterm = old_sigterm
             self._old_sigabrt = old_sigabrt
+            self._old_sighup = old_sighup
             self._running = True
         
     def stop(self):
@@ -199,6 +236,11 @@ class SignalHandler1(_SighandlerCore):
                 self._old_sigabrt,
                 force_clear = True
             )
+            _restore_any_previous_handler(
+                signal.SIGHUP,
+                self._old_sighup,
+                force_clear = True
+            )
             
         # If we get an exception there, just force restoring all defaults and
         # reraise
@@ -206,6 +248,7 @@ class SignalHandler1(_SighandlerCore):
             signal.signal(signal.SIGINT, signal.SIG_DFL)
             signal.signal(signal.SIGTERM, signal.SIG_DFL)
             signal.signal(signal.SIGABRT, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
             raise
             
         finally:
@@ -213,8 +256,49 @@ class SignalHandler1(_SighandlerCore):
             self._old_sigint = ZeroDivisionError
             self._old_sigterm = ZeroDivisionError
             self._old_sigabrt = ZeroDivisionError
+            self._old_sighup = ZeroDivisionError
             self._running = False
         
+    @staticmethod
+    def _dispatch(handler, signum):
+        ''' Runs handler for signum, recording lifecycle events before
+        and after. Handlers that raise (like the default) are recorded
+        as such.
+        '''
+        name = _signal_name(signum)
+        _emit('signal_received', signal=name)
+        start = time.monotonic()
+        outcome = None
+        try:
+            return handler(signum)
+        
+        except BaseException as exc:
+            outcome = type(exc).__name__
+            raise
+        
+        finally:
+            _emit(
+                'handler_ran',
+                signal = name,
+                duration = time.monotonic() - start,
+                raised = outcome
+            )
+        
+    @staticmethod
+    def _reopen_handler(signum, *args):
+        ''' The default SIGHUP handler, which reopens the files that
+        stdout and stderr were redirected into, for log rotation. Unlike
+        reopen_stds, this doesn't flush sys.stdout and sys.stderr, since
+        we may have interrupted a write to them.
+        '''
+        try:
+            _reopen_files()
+        except OSError:
+            logger.error(
+                'Failed to reopen stds w/ traceback: \n' +
+                ''.join(traceback.format_exc())
+            )
+        
     @staticmethod
     def _default_handler(signum, *args):
         ''' The default signal handler for Unix.
@@ -138,10 +138,13 @@ class SignalHandler1(_SighandlerCore):
     daughter process.
     '''
     
-    def __init__(self, pid_file, sigint=None, sigterm=None, sigabrt=None):
+    def __init__(self, pid_file, sigint=None, sigterm=None, sigabrt=None,
+                 sighup=None):
         ''' Creates a signal handler, using the passed callables. None
         will assign the default handler (raise in main). passing
         IGNORE_SIGNAL constant will result in the signal being noop'd.
+        
+        sighup is unused on Windows, which has no SIGHUP.
         '''
         self.sigint = sigint
         self.sigterm = sigterm
@@ -0,0 +1,224 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import sys
+import select
+import logging
+import atexit
+import threading
+import traceback
+import time
+
+# Intra-package dependencies
+from ._events_common import _emit
+from ._notify_common import notify
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+_READY = b'\x00'
+_FAILED = b'\x01'
+
+# The channel of a daemon that deferred its readiness, until it calls
+# startup_complete().
+_pending_channel = None
+
+
+class _StartupChannel:
+    ''' A pipe from the daemon back to the process that launched it,
+    created before forking and inherited by both children. The daemon
+    reports either that it is ready, or the traceback that stopped it
+    from getting there. That lets the launcher exit non-zero (and show
+    the traceback) when startup fails, instead of exiting 0 before the
+    daemon has even gotten going.
+    '''
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.daemon_pid = None
+        self._lock = threading.Lock()
+        self._previous_excepthook = None
+
+    def wait(self, timeout):
+        ''' Called by the launcher, after forking. Waits up to timeout
+        seconds for the daemon to report. Returns None if it started
+        successfully, and an error message (usually a traceback)
+        otherwise.
+        
+        The outcome is also passed along to any service manager. Under
+        a Type=notify unit, the launcher is the main PID, and with the
+        default NotifyAccess=main, anything the daemon sent itself
+        would be dropped.
+        '''
+        failure = self._receive(timeout)
+        if failure is None:
+            fields = {'READY': 1}
+            if self.daemon_pid is not None:
+                fields['MAINPID'] = self.daemon_pid
+            notify(**fields)
+        else:
+            lines = failure.strip().splitlines() or ['']
+            notify(STATUS='Failed to start: ' + lines[-1])
+        return failure
+
+    def _receive(self, timeout):
+        os.close(self.write_fd)
+        deadline = time.monotonic() + timeout
+        received = []
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select(
+                        [self.read_fd], [], [], remaining)[0]:
+                    return ('Daemon did not finish starting within ' +
+                            str(timeout) + ' seconds.')
+
+                data = os.read(self.read_fd, 2 ** 16)
+                if not data:
+                    break
+                received.append(data)
+                if received[0][:1] == _READY:
+                    # The pid is small enough to arrive in one piece.
+                    try:
+                        self.daemon_pid = int(b''.join(received)[1:])
+                    except ValueError:
+                        pass
+                    return None
+
+        finally:
+            os.close(self.read_fd)
+
+        received = b''.join(received)
+        if received[:1] == _FAILED:
+            return received[1:].decode('utf-8', 'replace')
+        else:
+            return 'Daemon exited during startup without reporting an error.'
+
+    def open_child(self):
+        ''' Called in the child, after forking.
+        '''
+        os.close(self.read_fd)
+
+    def _report(self, message):
+        ''' Sends message (once) and closes the pipe.
+        '''
+        with self._lock:
+            if self.write_fd is None:
+                return
+
+            try:
+                view = memoryview(message)
+                while view:
+                    view = view[os.write(self.write_fd, view):]
+            # Nobody's listening anymore, which is fine.
+            except OSError:
+                pass
+            finally:
+                os.close(self.write_fd)
+                self.write_fd = None
+
+    def ready(self):
+        ''' Tells the launcher that startup succeeded.
+        '''
+        self._disarm()
+        _emit('started')
+        # The launcher tells any service manager who's in charge now.
+        self._report(_READY + str(os.getpid()).encode('ascii'))
+
+    def fail(self, message):
+        ''' Tells the launcher that startup failed, with message.
+        '''
+        self._disarm()
+        _emit('startup_failed', error=message)
+        self._report(_FAILED + message.encode('utf-8', 'replace'))
+
+    def fail_with_exc(self):
+        ''' Calls fail() with the traceback of the exception currently
+        being handled.
+        '''
+        self.fail(''.join(traceback.format_exc()))
+
+    def defer(self):
+        ''' Called in the daemon instead of ready(), if readiness is to
+        be declared later on, through startup_complete(). Until then,
+        any uncaught exception (or exit) is reported as a failure.
+        '''
+        global _pending_channel
+        _pending_channel = self
+        self._previous_excepthook = sys.excepthook
+        sys.excepthook = self._excepthook
+        atexit.register(self._exited)
+
+    def _disarm(self):
+        global _pending_channel
+        if _pending_channel is self:
+            _pending_channel = None
+            sys.excepthook = self._previous_excepthook
+            atexit.unregister(self._exited)
+
+    def _excepthook(self, exc_type, exc_value, exc_tb):
+        previous_excepthook = self._previous_excepthook
+        self.fail(''.join(
+            traceback.format_exception(exc_type, exc_value, exc_tb)
+        ))
+        previous_excepthook(exc_type, exc_value, exc_tb)
+
+    def _exited(self):
+        self.fail('Daemon exited before calling startup_complete().')
+
+
+def startup_complete():
+    ''' Declares that a daemon started with defer_ready=True has
+    finished starting up, allowing its launcher to exit successfully.
+    Does nothing otherwise.
+    '''
+    channel = _pending_channel
+    if channel is not None:
+        channel.ready()
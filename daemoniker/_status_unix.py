@@ -0,0 +1,234 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import glob
+import time
+import fcntl
+import logging
+import concurrent.futures
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+def _read_pid(pid_file):
+    ''' Returns the pid recorded in pid_file, or None if there is no
+    pid_file (or it doesn't contain a pid yet).
+    '''
+    try:
+        with open(pid_file, 'r') as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _proc_stat(pid):
+    ''' Returns the fields of /proc/<pid>/stat after the command name
+    (which may itself contain spaces and parens), starting with the
+    state. Returns None if there's no such process (or no procfs).
+    '''
+    try:
+        with open('/proc/' + str(pid) + '/stat', 'r') as f:
+            stat = f.read()
+    except (FileNotFoundError, ProcessLookupError):
+        return None
+    return stat.rsplit(')', 1)[1].split()
+
+
+def _is_running(pid):
+    ''' Returns True if pid is a live process. Zombies don't count.
+    '''
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # It exists, but belongs to somebody else.
+    except PermissionError:
+        pass
+    
+    fields = _proc_stat(pid)
+    return fields is None or fields[0] != 'Z'
+
+
+def _is_locked(pid_file):
+    ''' Returns True if somebody (ie, the daemon) holds the lock on
+    pid_file. Unlike the pid itself, the lock can't outlive the daemon,
+    or be inherited by an unrelated process that reuses its pid.
+    '''
+    try:
+        fd = os.open(pid_file, os.O_RDONLY)
+    except OSError:
+        return False
+    
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+    return False
+
+
+def _uptime(fields):
+    ''' Returns the number of seconds since the process was started,
+    from its stat fields.
+    '''
+    # starttime is the 22nd field overall, in clock ticks since boot.
+    started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    with open('/proc/uptime', 'r') as f:
+        since_boot = float(f.read().split()[0])
+    return max(0, since_boot - started)
+
+
+def _started_after(pid, pid_file):
+    ''' Returns True if pid was started after pid_file was last written,
+    meaning that it can't be the process that wrote it (its pid was
+    reused). Returns False if we can't tell.
+    '''
+    fields = _proc_stat(pid)
+    try:
+        started = time.time() - _uptime(fields)
+        written = os.stat(pid_file).st_mtime
+    except (OSError, TypeError, IndexError, ValueError):
+        return False
+    # Leave a little slack for clock granularity.
+    return started > written + 1
+
+
+def _state(pid_file, pid):
+    ''' Returns the state of the daemon at pid_file: "running",
+    "stale" (it exited without removing pid_file, or its pid has since
+    been reused), "empty" (the pid hasn't been written yet), or
+    "missing" (no pid_file).
+    '''
+    if pid is None:
+        return 'empty' if os.path.exists(pid_file) else 'missing'
+    elif not _is_running(pid):
+        return 'stale'
+    elif _is_locked(pid_file) or not _started_after(pid, pid_file):
+        return 'running'
+    else:
+        return 'stale'
+
+
+def _rss(pid):
+    with open('/proc/' + str(pid) + '/statm', 'r') as f:
+        # statm is "size resident shared text lib data dt", in pages
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _fd_count(pid):
+    return len(os.listdir('/proc/' + str(pid) + '/fd'))
+
+
+def _exe(pid):
+    return os.readlink('/proc/' + str(pid) + '/exe')
+
+
+def _process_status(pid, running):
+    ''' Returns a status dict for pid; see status().
+    '''
+    result = {
+        'pid': pid,
+        'running': running,
+        'uptime': None,
+        'rss': None,
+        'fds': None,
+        'exe': None,
+    }
+    if not result['running']:
+        return result
+    
+    fields = _proc_stat(pid)
+    # Without procfs, all we know is that it's running.
+    if fields is None:
+        return result
+    
+    for key, getter in (('uptime', lambda: _uptime(fields)),
+                        ('rss', lambda: _rss(pid)),
+                        ('fds', lambda: _fd_count(pid)),
+                        ('exe', lambda: _exe(pid))):
+        try:
+            result[key] = getter()
+        # Ex: the process exited in the meantime, or belongs to somebody
+        # else.
+        except (OSError, IndexError, ValueError):
+            pass
+            
+    return result
+
+
+def status(pid_file):
+    ''' Returns a dict describing the daemon at pid_file: its pid (None
+    without a pid_file), its state (see _state) and whether or not it's
+    running, and (where available) its uptime in seconds, its RSS in
+    bytes, its number of open file descriptors, and its executable.
+    '''
+    pid = _read_pid(pid_file)
+    state = _state(pid_file, pid)
+    result = _process_status(pid, state == 'running')
+    result['state'] = state
+    result['pid_file'] = pid_file
+    return result
+
+
+def scan(directory, pattern='*.pid', max_workers=None):
+    ''' Returns the status() of every pid file in directory matching
+    pattern, sorted by path. The pid files are probed concurrently, from
+    a pool of max_workers threads (see ThreadPoolExecutor).
+    '''
+    pid_files = sorted(glob.glob(os.path.join(glob.escape(directory),
+                                              pattern)))
+    if not pid_files:
+        return []
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(status, pid_files))
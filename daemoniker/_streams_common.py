@@ -0,0 +1,1331 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import io
+import socket
+import sys
+import logging
+import atexit
+import threading
+import collections
+import traceback
+import time
+import gzip
+import json
+import re
+import shutil
+import concurrent.futures
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    # 'Inquisitor',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP = 'drop'
+
+# Used for the stream backlog when rotation forces pumping, but no backlog
+# was explicitly requested.
+DEFAULT_BACKLOG = 2 ** 20
+
+# How long deduplication may hold back lines that look like the start of
+# a repeated block, before giving up and letting them through.
+_HOLD_TIMEOUT = 1
+
+COMPRESS_GZIP = 'gzip'
+COMPRESS_ZSTD = 'zstd'
+_COMPRESSED_SUFFIXES = {
+    COMPRESS_GZIP: '.gz',
+    COMPRESS_ZSTD: '.zst',
+}
+
+# Schemes for stdout_goto and stderr_goto that send output to a local
+# socket instead of a file, with their default socket paths (if any). The
+# syslog and journald schemes send each line as a separate record, while
+# the unix scheme streams everything as-is to a collector.
+SYSLOG_SOCKET = '/dev/log'
+JOURNALD_SOCKET = '/run/systemd/journal/socket'
+_SOCKET_SCHEMES = {
+    'syslog': SYSLOG_SOCKET,
+    'journald': JOURNALD_SOCKET,
+    'unix': None,
+}
+
+# Syslog severities for stdout and stderr, and the facility for both.
+LOG_INFO = 6
+LOG_ERR = 3
+LOG_DAEMON = 3
+
+# All of the pumps that are currently running, so that we can close them at
+# exit and reopen their sinks.
+_active_pumps = []
+# All of the file descriptors that were directly redirected to a file, as
+# {fd: (path, flags)}, so that we can reopen them.
+_direct_redirects = {}
+# Whether _close_pumps is currently registered atexit.
+_close_pumps_registered = False
+
+
+class _StreamOptions:
+    ''' Validated options for redirecting stdout and stderr, built in
+    the parent (so that we can fail before daemonizing instead of
+    after) and used by _redirect_stds in the daemon.
+    '''
+
+    def __init__(self, backlog=None, overflow=OVERFLOW_BLOCK,
+                 rotate_bytes=None, rotate_interval=None, rotate_keep=None,
+                 open_flags=0, buffering=None, identifier=None,
+                 compress=None, compress_workers=1, stderr_rate_limit=None,
+                 stderr_rate_burst=None, stderr_dedupe=False):
+        if overflow not in {OVERFLOW_BLOCK, OVERFLOW_DROP}:
+            raise ValueError('Unknown overflow policy: ' + repr(overflow))
+        elif backlog is not None and backlog <= 0:
+            raise ValueError('stream_backlog must be positive.')
+        elif rotate_bytes is not None and rotate_bytes <= 0:
+            raise ValueError('stream_rotate_bytes must be positive.')
+        elif rotate_interval is not None and rotate_interval <= 0:
+            raise ValueError('stream_rotate_interval must be positive.')
+        elif rotate_keep is not None and rotate_keep < 0:
+            raise ValueError('stream_rotate_keep cannot be negative.')
+        elif buffering is not None and buffering < 0:
+            raise ValueError('stream_buffering cannot be negative.')
+        elif identifier is not None and (not identifier or
+                                         '\n' in identifier):
+            raise ValueError('stream_identifier must be a single line.')
+        elif compress is not None and compress not in _COMPRESSED_SUFFIXES:
+            raise ValueError('Unknown compression: ' + repr(compress))
+        elif compress == COMPRESS_ZSTD and zstandard is None:
+            raise ValueError('zstd compression requires zstandard.')
+        elif compress_workers < 1:
+            raise ValueError('stream_compress_workers must be positive.')
+        elif stderr_rate_limit is not None and stderr_rate_limit <= 0:
+            raise ValueError('stderr_rate_limit must be positive.')
+        elif stderr_rate_burst is not None and stderr_rate_burst <= 0:
+            raise ValueError('stderr_rate_burst must be positive.')
+
+        # Always append, so that multiple writers (for example, forked
+        # workers) sharing a file never clobber each other.
+        self.open_flags = os.O_APPEND | int(open_flags)
+        self.buffering = buffering
+
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval
+        self.rotate_keep = rotate_keep
+
+        if compress is not None and not self.rotates:
+            raise ValueError('stream_compress requires stream rotation.')
+
+        self.stderr_rate_limit = stderr_rate_limit
+        self.stderr_rate_burst = stderr_rate_burst
+        self.stderr_dedupe = bool(stderr_dedupe)
+
+        # Rotation and throttling can only happen if we see every write, so
+        # they require pumping.
+        if backlog is None and (self.rotates or self.throttles):
+            backlog = DEFAULT_BACKLOG
+        self.backlog = backlog
+        self.overflow = overflow
+
+        if identifier is None:
+            identifier = os.path.basename(sys.argv[0]) or 'python'
+        self.identifier = identifier
+
+        # Both streams share a compressor, so that they also share its cap
+        # on concurrent compressions.
+        if compress is None:
+            self.compressor = None
+        else:
+            self.compressor = _SegmentCompressor(compress, compress_workers)
+
+    @property
+    def rotates(self):
+        return (self.rotate_bytes is not None or
+                self.rotate_interval is not None)
+
+    @property
+    def throttles(self):
+        return self.stderr_rate_limit is not None or self.stderr_dedupe
+
+    @property
+    def pumped(self):
+        return self.backlog is not None
+
+    def make_sink(self, path, priority=LOG_INFO, is_stderr=False):
+        ''' Creates the sink for a pumped stream into path. Lines sent to
+        a logging socket are tagged with priority. Sinks for stderr are
+        wrapped in any requested throttling.
+        '''
+        target = _parse_socket_target(path)
+        if target is not None:
+            scheme, address = target
+            if scheme == 'unix':
+                sink = _StreamSocketSink(
+                    address,
+                    self.backlog or DEFAULT_BACKLOG
+                )
+            elif scheme == 'journald':
+                sink = _JournaldSink(address, priority, self.identifier)
+            else:
+                sink = _SyslogSink(address, priority, self.identifier)
+
+        elif self.rotates:
+            sink = _RotatingFileSink(
+                path,
+                self.open_flags,
+                self.rotate_bytes,
+                self.rotate_interval,
+                self.rotate_keep,
+                self.compressor
+            )
+        else:
+            sink = _FileSink(path, self.open_flags)
+
+        if is_stderr and self.throttles:
+            sink = _ThrottledSink(
+                sink,
+                self.stderr_rate_limit,
+                self.stderr_rate_burst,
+                self.stderr_dedupe
+            )
+
+        return sink
+
+
+class _FileSink:
+    ''' The final destination of a _StreamPump: a plain file. flags are
+    added to the flags used to open it.
+    '''
+
+    def __init__(self, path, flags=os.O_APPEND):
+        self.path = path
+        self.flags = os.O_WRONLY | os.O_CREAT | flags
+        self._lock = threading.Lock()
+        self._fd = self._open()
+
+    def _open(self):
+        return os.open(self.path, self.flags, 0o666)
+
+    def write(self, data):
+        ''' Writes all of data to the file.
+        '''
+        with self._lock:
+            self._write(data)
+
+    def _write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+
+    def reopen(self):
+        ''' Reopens the file at path, for example because it has been
+        moved by an external log rotator.
+        '''
+        with self._lock:
+            new_fd = self._open()
+            os.close(self._fd)
+            self._fd = new_fd
+
+    def close(self):
+        with self._lock:
+            os.close(self._fd)
+
+
+class _RotatingFileSink(_FileSink):
+    ''' A _FileSink that rotates the file once it has grown past
+    max_bytes, or once it has been open for interval seconds. Rotated
+    files are renamed to <path>.<timestamp>, and all but the newest
+    keep rotated files are removed (or none, if keep is None).
+
+    If a compressor (a _SegmentCompressor) is passed, rotated files are
+    handed off to it, along with any left uncompressed by a previous
+    run.
+
+    If rotating fails (for example, because privileges were dropped
+    after the file was opened), the error is logged, and writes keep
+    going to the current file. Rotation is retried no more often than
+    every retry_interval seconds.
+    '''
+
+    def __init__(self, path, flags=os.O_APPEND, max_bytes=None, interval=None,
+                 keep=None, compressor=None, retry_interval=60):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.keep = keep
+        self.compressor = compressor
+        self.retry_interval = retry_interval
+        self.rotation_errors = 0
+        self._next_attempt = None
+        super().__init__(path, flags)
+
+        # Matches rotated files (compressed or not), but not the compression
+        # index or compressions in progress.
+        self._rotated_pattern = re.compile(
+            re.escape(os.path.basename(path)) +
+            r'\.\d{8}-\d{6}(-\d{3,})?(\.gz|\.zst)?$'
+        )
+
+        if compressor is not None:
+            compressor.attach()
+            for rotated in self.rotated_files():
+                if not rotated.endswith(('.gz', '.zst')):
+                    self._on_rotated(rotated)
+
+    def _open(self):
+        fd = super()._open()
+        self._size = os.fstat(fd).st_size
+        self._opened = time.monotonic()
+        return fd
+
+    def _write(self, data):
+        rotated = None
+        if self._should_rotate(len(data)):
+            try:
+                rotated = self._rotate()
+            except OSError:
+                self.rotation_errors += 1
+                self._next_attempt = time.monotonic() + self.retry_interval
+                logger.error(
+                    'Failed to rotate ' + self.path + ' w/ traceback: \n' +
+                    ''.join(traceback.format_exc())
+                )
+
+        super()._write(data)
+        self._size += len(data)
+
+        # Only once the data is safely in the new file.
+        if rotated is not None:
+            self._on_rotated(rotated)
+
+    def _should_rotate(self, incoming):
+        # Don't rotate empty files.
+        if not self._size:
+            return False
+        # Or retry a failed rotation too soon.
+        elif (self._next_attempt is not None and
+              time.monotonic() < self._next_attempt):
+            return False
+        elif self.max_bytes is not None:
+            if self._size + incoming > self.max_bytes:
+                return True
+
+        if self.interval is not None:
+            return time.monotonic() - self._opened >= self.interval
+        else:
+            return False
+
+    def _rotated_name(self):
+        ''' Picks a name for the next rotated file, which must sort
+        after all previous rotated files.
+        '''
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        rotated = self.path + '.' + stamp
+        counter = 0
+        # Compressed files still claim their names.
+        while any(os.path.exists(rotated + suffix)
+                  for suffix in ('', '.gz', '.zst')):
+            counter += 1
+            rotated = self.path + '.' + stamp + '-{:03d}'.format(counter)
+
+        return rotated
+
+    def rotated_files(self):
+        ''' Lists all of the rotated files for our path, oldest first.
+        '''
+        dirname = os.path.dirname(self.path)
+        # Key on the uncompressed name, so that compression doesn't change
+        # the order, and so that a file caught mid-compression (when both
+        # the original and the compressed file exist) is only listed once.
+        rotated = {}
+        for name in os.listdir(dirname or '.'):
+            if self._rotated_pattern.match(name):
+                uncompressed = re.sub(r'\.(gz|zst)$', '', name)
+                rotated.setdefault(uncompressed, name)
+                
+        return [
+            os.path.join(dirname, rotated[uncompressed])
+            for uncompressed in sorted(rotated)
+        ]
+
+    def _rotate(self):
+        ''' Renames the current file out of the way, opens a new one,
+        and removes any excess rotated files. Returns the rotated path.
+        '''
+        rotated = self._rotated_name()
+        os.rename(self.path, rotated)
+
+        try:
+            new_fd = self._open()
+        # Put it back, so that we keep writing to the right file.
+        except OSError:
+            os.rename(rotated, self.path)
+            raise
+        os.close(self._fd)
+        self._fd = new_fd
+
+        if self.keep is not None:
+            rotated_files = self.rotated_files()
+            excess = max(0, len(rotated_files) - self.keep)
+            for path in rotated_files[:excess]:
+                # This might be getting compressed as we speak, so remove
+                # every version of it.
+                path = re.sub(r'\.(gz|zst)$', '', path)
+                for suffix in ('', '.gz', '.zst'):
+                    _remove_quietly(path + suffix)
+
+        return rotated
+
+    def _on_rotated(self, rotated):
+        ''' Called with the path of each newly-rotated file. If it can't
+        be handed off for compression, it's left uncompressed.
+        '''
+        if self.compressor is None:
+            return
+
+        try:
+            self.compressor.submit(rotated, self.path + '.index')
+        except Exception:
+            self.compressor.errors += 1
+            logger.error(
+                'Failed to compress ' + rotated + ' w/ traceback: \n' +
+                ''.join(traceback.format_exc())
+            )
+
+    def close(self):
+        super().close()
+        if self.compressor is not None:
+            self.compressor.detach()
+
+
+class _SegmentCompressor:
+    ''' Compresses rotated files in the background, using at most
+    max_workers low-priority threads at once. Compressed files replace
+    the originals, with a .gz or .zst suffix. Every compression is
+    recorded as a line of JSON in an index file, ex:
+
+    {"segment": "out.log.20260101-000000", "compressed":
+     "out.log.20260101-000000.gz", "bytes": 1048576, "compressed_bytes":
+     65536, "time": 1767225600.0}
+    '''
+
+    def __init__(self, method=COMPRESS_GZIP, max_workers=1, level=None):
+        if method not in _COMPRESSED_SUFFIXES:
+            raise ValueError('Unknown compression: ' + repr(method))
+
+        if level is None:
+            level = 3 if method == COMPRESS_ZSTD else 6
+
+        self.method = method
+        self.max_workers = max_workers
+        self.level = level
+        self.errors = 0
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._attached = 0
+
+    def attach(self):
+        ''' Registers a user of the compressor, which must later detach.
+        '''
+        with self._lock:
+            self._attached += 1
+
+    def detach(self):
+        ''' Unregisters a user of the compressor, waiting for any pending
+        compressions to finish once the last one is gone.
+        '''
+        with self._lock:
+            self._attached -= 1
+            if self._attached > 0 or self._executor is None:
+                return
+
+            executor = self._executor
+            self._executor = None
+
+        executor.shutdown(wait=True)
+
+    def submit(self, segment, index_path):
+        ''' Schedules segment for compression, recording it in the index
+        at index_path. Returns a Future.
+        '''
+        with self._lock:
+            # Defer creating the threads until they're actually needed, so
+            # that we never create them before forking.
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers = self.max_workers
+                )
+
+            return self._executor.submit(self._compress, segment, index_path)
+
+    def _compress(self, segment, index_path):
+        ''' Does the actual compression. Writes into a temporary file
+        first, so that nothing ever sees a partially-compressed segment.
+        '''
+        _lower_thread_priority()
+        compressed = segment + _COMPRESSED_SUFFIXES[self.method]
+        partial = compressed + '.partial'
+        try:
+            with open(segment, 'rb') as src, open(partial, 'wb') as dest:
+                size = os.fstat(src.fileno()).st_size
+                if self.method == COMPRESS_ZSTD:
+                    compressor = zstandard.ZstdCompressor(
+                        level = self.level
+                    )
+                    compressor.copy_stream(src, dest)
+
+                else:
+                    with gzip.GzipFile(
+                        filename = os.path.basename(segment),
+                        mode = 'wb',
+                        compresslevel = self.level,
+                        fileobj = dest
+                    ) as gz:
+                        shutil.copyfileobj(src, gz, 2 ** 16)
+
+            os.rename(partial, compressed)
+            # If the segment was removed by retention in the meantime, don't
+            # resurrect it.
+            try:
+                os.remove(segment)
+            except FileNotFoundError:
+                _remove_quietly(compressed)
+                return
+
+            _append_index(index_path, {
+                'segment': os.path.basename(segment),
+                'compressed': os.path.basename(compressed),
+                'bytes': size,
+                'compressed_bytes': os.path.getsize(compressed),
+                'time': time.time(),
+            })
+
+        # Same thing here.
+        except FileNotFoundError:
+            _remove_quietly(partial)
+
+        except Exception:
+            self.errors += 1
+            _remove_quietly(partial)
+            logger.error(
+                'Failed to compress ' + segment + ' w/ traceback: \n' +
+                ''.join(traceback.format_exc())
+            )
+
+
+def _lower_thread_priority():
+    ''' Drops the priority of the calling thread as low as possible.
+    On Linux, niceness is per-thread, and a who of 0 means the calling
+    thread, so this leaves the rest of the process untouched. Elsewhere,
+    it would renice the whole process instead, so we don't.
+    '''
+    if not sys.platform.startswith('linux'):
+        logger.debug('Compressing at normal priority outside of Linux.')
+        return
+        
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, 19)
+    except OSError:
+        logger.warning(
+            'Failed to lower compression priority w/ traceback: \n' +
+            ''.join(traceback.format_exc())
+        )
+
+
+def _append_index(index_path, entry):
+    ''' Appends a single JSON entry to the index. With O_APPEND and a
+    single write, concurrent compressions never interleave.
+    '''
+    line = json.dumps(entry, sort_keys=True) + '\n'
+    fd = os.open(index_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o666)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _parse_socket_target(goto):
+    ''' Parses a std stream destination like "syslog:///dev/log" into a
+    (scheme, socket path) tuple. Omitting the path (ex: "journald:")
+    selects the default socket for the scheme. Returns None if goto is
+    just a normal file path.
+    '''
+    scheme, sep, rest = goto.partition(':')
+    if not sep or scheme not in _SOCKET_SCHEMES:
+        return None
+
+    if rest.startswith('//'):
+        rest = rest[2:]
+    return scheme, rest or _SOCKET_SCHEMES[scheme]
+
+
+def _check_stream_targets(stdin_goto, stdout_goto, stderr_goto):
+    ''' Makes sure that any logging socket std stream destinations are
+    usable, raising ValueError or FileNotFoundError if not. Collector
+    sockets (unix://) may come and go, so they only need a path.
+    '''
+    if _parse_socket_target(stdin_goto) is not None:
+        raise ValueError('stdin cannot be redirected to a logging socket.')
+
+    for goto in (stdout_goto, stderr_goto):
+        target = _parse_socket_target(goto)
+        if target is None:
+            continue
+
+        scheme, address = target
+        if scheme == 'unix':
+            if not address or not os.path.isabs(address):
+                raise ValueError(
+                    'Collector sockets need an absolute path, as in '
+                    'unix:///run/collector.sock'
+                )
+
+        elif not os.path.exists(address):
+            raise FileNotFoundError(
+                'No logging socket for ' + goto + ' at ' + address
+            )
+
+
+class _SyslogSink:
+    ''' A _StreamPump sink that sends each line written to it to a local
+    syslog datagram socket (ex: /dev/log), as a separate record with the
+    passed priority and identifier. Incomplete lines are held until they
+    are finished, or until they grow longer than max_line.
+    '''
+    _MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep',
+               'Oct', 'Nov', 'Dec')
+
+    def __init__(self, address, priority=LOG_INFO, identifier='python',
+                 max_line=2 ** 16):
+        self.address = address
+        self.priority = priority
+        self.identifier = identifier
+        self.max_line = max_line
+        self._lock = threading.Lock()
+        self._partial = b''
+        # Don't connect; sending to the address every time means we'll
+        # recover on our own if the logging daemon restarts.
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def _frame(self, line):
+        ''' Wraps a single line into a syslog record, using the local
+        (RFC 3164) format understood by all syslog daemons.
+        '''
+        now = time.localtime()
+        header = '<{}>{} {:2d} {} {}[{}]: '.format(
+            LOG_DAEMON * 8 + self.priority,
+            self._MONTHS[now.tm_mon - 1],
+            now.tm_mday,
+            time.strftime('%H:%M:%S', now),
+            self.identifier,
+            os.getpid()
+        )
+        return header.encode('utf-8') + line
+
+    def write(self, data):
+        ''' Sends every complete line in data.
+        '''
+        with self._lock:
+            *lines, self._partial = (self._partial + data).split(b'\n')
+            while len(self._partial) > self.max_line:
+                lines.append(self._partial[:self.max_line])
+                self._partial = self._partial[self.max_line:]
+            self._send(lines)
+
+    def _send(self, lines):
+        ''' Sends each non-empty line as its own record. If any of them
+        fail, keeps going, and then raises the last error.
+        '''
+        error = None
+        for line in lines:
+            line = line[:self.max_line].rstrip(b'\r')
+            if not line:
+                continue
+
+            try:
+                self._sock.sendto(self._frame(line), self.address)
+            except OSError as exc:
+                error = exc
+
+        if error is not None:
+            raise error
+
+    def reopen(self):
+        ''' Nothing to reopen; we resend to the address every time.
+        '''
+        pass
+
+    def close(self):
+        ''' Sends any incomplete line, and then closes the socket.
+        '''
+        with self._lock:
+            try:
+                self._send([self._partial])
+            finally:
+                self._partial = b''
+                self._sock.close()
+
+
+class _JournaldSink(_SyslogSink):
+    ''' A _SyslogSink that uses the native journald protocol instead,
+    so that the priority and identifier are stored as proper fields.
+    '''
+
+    def _frame(self, line):
+        ''' Wraps a single line into a journal entry. Lines never contain
+        newlines, so we can always use the simple KEY=value form.
+        '''
+        return b''.join((
+            b'PRIORITY=', str(self.priority).encode(), b'\n',
+            b'SYSLOG_FACILITY=', str(LOG_DAEMON).encode(), b'\n',
+            b'SYSLOG_IDENTIFIER=', self.identifier.encode('utf-8'), b'\n',
+            b'MESSAGE=', line, b'\n'
+        ))
+
+
+class _StreamSocketSink:
+    ''' A _StreamPump sink that streams everything written to it to a
+    local collector listening on a SOCK_STREAM unix socket at address.
+
+    If the collector goes away (for example, because it is restarting),
+    data is buffered in memory, up to buffer_limit bytes, dropping the
+    oldest lines first. Reconnection is attempted on the next write, but
+    no more often than every retry_interval seconds.
+    '''
+
+    def __init__(self, address, buffer_limit=2 ** 20, retry_interval=1,
+                 clock=time.monotonic):
+        self.address = address
+        self.buffer_limit = buffer_limit
+        self.retry_interval = retry_interval
+        self.clock = clock
+
+        self.dropped = 0
+        self.connections = 0
+
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._sock = None
+        self._next_attempt = clock()
+
+    def write(self, data):
+        ''' Sends data, after anything still buffered.
+        '''
+        with self._lock:
+            self._buffer += data
+            self._flush()
+            self._trim()
+
+    def _flush(self, force=False):
+        ''' Sends as much of the buffer as we can, (re)connecting first
+        if needed.
+        '''
+        if self._sock is None:
+            if not force and self.clock() < self._next_attempt:
+                return
+
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.address)
+            except OSError:
+                sock.close()
+                self._next_attempt = self.clock() + self.retry_interval
+                return
+
+            self._sock = sock
+            self.connections += 1
+
+        try:
+            while self._buffer:
+                sent = self._sock.send(self._buffer)
+                del self._buffer[:sent]
+
+        except OSError:
+            self._disconnect()
+            self._next_attempt = self.clock() + self.retry_interval
+
+    def _trim(self):
+        ''' Drops the oldest data if we're over the limit, discarding
+        the rest of any line that would be cut in half.
+        '''
+        excess = len(self._buffer) - self.buffer_limit
+        if excess > 0:
+            line_end = self._buffer.find(b'\n', excess - 1)
+            if line_end >= 0:
+                excess = line_end + 1
+            del self._buffer[:excess]
+            self.dropped += excess
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def reopen(self):
+        ''' Reconnects to the collector, for example because it moved.
+        '''
+        with self._lock:
+            self._disconnect()
+            self._flush(force=True)
+
+    def close(self):
+        ''' Makes one last attempt at sending anything buffered, and
+        disconnects.
+        '''
+        with self._lock:
+            try:
+                self._flush(force=True)
+            finally:
+                self._disconnect()
+
+
+class _ThrottledSink:
+    ''' Wraps another sink, limiting what reaches it. Lines are passed
+    through a token bucket that refills at rate bytes per second, up to
+    burst bytes (defaults to one second's worth); lines that don't fit
+    are suppressed. With dedupe, repeats of the last line, or of a block
+    of up to dedupe_lines lines (ex: a traceback), are collapsed into a
+    single "last N lines repeated M times" notice.
+
+    Notices of suppressed lines (and of ongoing repeats) are written at
+    most every report_interval seconds, and when the sink is closed.
+    Since lines may be quiet for a while, _StreamPump calls tick() every
+    tick_interval seconds, so that notices don't wait for the next write.
+    '''
+
+    def __init__(self, sink, rate=None, burst=None, dedupe=False,
+                 report_interval=60, max_line=2 ** 16, dedupe_lines=100,
+                 clock=time.monotonic):
+        self.sink = sink
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self.dedupe = dedupe
+        self.report_interval = report_interval
+        self.max_line = max_line
+        self.dedupe_lines = dedupe_lines
+        self.clock = clock
+        if dedupe:
+            self.tick_interval = min(report_interval, _HOLD_TIMEOUT)
+        else:
+            self.tick_interval = report_interval
+
+        # Totals, for the curious
+        self.suppressed_lines = 0
+        self.suppressed_bytes = 0
+        self.repeated_lines = 0
+
+        self._lock = threading.Lock()
+        self._partial = b''
+        self._tokens = self.burst
+        self._refilled = clock()
+        self._reported = clock()
+        self._pending_lines = 0
+        self._pending_bytes = 0
+        # The most recent dedupe_lines lines, and where each of them was
+        # last seen (counting every line ever remembered).
+        self._history = collections.deque()
+        self._last_seen = {}
+        self._remembered = 0
+        # The block being repeated, and the lines of its current repeat
+        # that we've held back so far.
+        self._block = None
+        self._held = []
+        self._held_since = None
+        self._repeats = 0
+
+    def write(self, data):
+        ''' Writes every complete line in data that makes it through.
+        '''
+        with self._lock:
+            *lines, self._partial = (self._partial + data).split(b'\n')
+            lines = [line + b'\n' for line in lines]
+            if len(self._partial) > self.max_line:
+                lines.append(self._partial)
+                self._partial = b''
+
+            out = []
+            for line in lines:
+                self._filter(line, out)
+
+            if self.clock() - self._reported >= self.report_interval:
+                self._report(out)
+
+            if out:
+                self.sink.write(b''.join(out))
+
+    def tick(self):
+        ''' Writes any notices that are due, and lets through lines
+        that have been held back for too long.
+        '''
+        with self._lock:
+            out = []
+            if (self._held and
+                    self.clock() - self._held_since >= _HOLD_TIMEOUT):
+                self._end_repeat(out)
+            if self.clock() - self._reported >= self.report_interval:
+                self._report(out)
+            if out:
+                self.sink.write(b''.join(out))
+
+    def _filter(self, line, out):
+        if not (self.dedupe and self._is_repeat(line, out)):
+            self._pass(line, out)
+
+    def _pass(self, line, out):
+        ''' Lets line through, if the rate limit allows.
+        '''
+        if self._admit(len(line)):
+            out.append(line)
+        else:
+            self._pending_lines += 1
+            self._pending_bytes += len(line)
+            self.suppressed_lines += 1
+            self.suppressed_bytes += len(line)
+
+    def _is_repeat(self, line, out):
+        ''' Checks if line continues a repeat of the block of lines
+        before it, holding it back if so. Otherwise, ends any repeat
+        in progress (letting its held lines through), and remembers
+        line for later.
+        '''
+        if self._block is not None:
+            if line == self._block[len(self._held)]:
+                self._hold(line)
+                return True
+            self._end_repeat(out)
+
+        seen = self._last_seen.get(line)
+        if seen is not None:
+            # The most recent occurrence gives the shortest block.
+            period = self._remembered - seen
+            self._block = list(self._history)[-period:]
+            self._hold(line)
+            return True
+
+        self._remember(line)
+        return False
+
+    def _hold(self, line):
+        if not self._held:
+            self._held_since = self.clock()
+        self._held.append(line)
+        if len(self._held) == len(self._block):
+            self._repeats += 1
+            self.repeated_lines += len(self._block)
+            self._held = []
+
+    def _end_repeat(self, out):
+        ''' Reports the repeat in progress, and lets through anything
+        held back from an incomplete repeat.
+        '''
+        self._report_repeats(out)
+        held = self._held
+        self._block = None
+        self._held = []
+        for line in held:
+            self._remember(line)
+            self._pass(line, out)
+
+    def _remember(self, line):
+        self._history.append(line)
+        self._last_seen[line] = self._remembered
+        self._remembered += 1
+        if len(self._history) > self.dedupe_lines:
+            forgotten = self._history.popleft()
+            # Unless it has been seen again since.
+            index = self._remembered - len(self._history) - 1
+            if self._last_seen[forgotten] == index:
+                del self._last_seen[forgotten]
+
+    def _admit(self, size):
+        ''' Takes size tokens from the bucket, if it has them. Lines
+        bigger than the whole bucket get through when it is full.
+        '''
+        if self.rate is None:
+            return True
+
+        now = self.clock()
+        self._tokens = min(
+            self.burst,
+            self._tokens + (now - self._refilled) * self.rate
+        )
+        self._refilled = now
+
+        if self._tokens >= min(size, self.burst):
+            self._tokens -= size
+            return True
+        else:
+            return False
+
+    def _report_repeats(self, out):
+        if not self._repeats:
+            return
+        elif len(self._block) == 1:
+            notice = 'last message repeated {} times\n'.format(self._repeats)
+        else:
+            notice = 'last {} lines repeated {} times\n'.format(
+                len(self._block),
+                self._repeats
+            )
+        out.append(notice.encode())
+        self._repeats = 0
+
+    def _report(self, out):
+        ''' Writes notices for anything suppressed since the last one.
+        These bypass the rate limit, since there's at most one per
+        report_interval.
+        '''
+        self._reported = self.clock()
+        self._report_repeats(out)
+        if self._pending_lines:
+            out.append(
+                'suppressed {} lines ({} bytes) over the rate limit\n'.format(
+                    self._pending_lines,
+                    self._pending_bytes
+                ).encode()
+            )
+            self._pending_lines = 0
+            self._pending_bytes = 0
+
+    def reopen(self):
+        self.sink.reopen()
+
+    def close(self):
+        ''' Writes any incomplete line and outstanding notices, and then
+        closes the underlying sink.
+        '''
+        with self._lock:
+            out = []
+            try:
+                if self._partial:
+                    self._filter(self._partial, out)
+                    self._partial = b''
+                if self._block is not None:
+                    self._end_repeat(out)
+                self._report(out)
+                if out:
+                    self.sink.write(b''.join(out))
+            finally:
+                self.sink.close()
+
+
+class _StreamPump:
+    ''' Moves data written to a pipe into a sink, using a pair of
+    daughter threads so that a slow sink never blocks the writers.
+
+    The reader thread drains the pipe into an in-memory backlog of at
+    most backlog_limit bytes. The writer thread empties the backlog
+    into the sink, coalescing everything that accumulated while the
+    previous write was in progress into a single write. When the
+    backlog is full, the overflow policy determines whether incoming
+    data is dropped (OVERFLOW_DROP), or whether the reader stops
+    draining the pipe (OVERFLOW_BLOCK), eventually blocking writers.
+    '''
+
+    def __init__(self, sink, backlog_limit=2 ** 20, overflow=OVERFLOW_BLOCK,
+                 chunk_size=2 ** 16):
+        if overflow not in {OVERFLOW_BLOCK, OVERFLOW_DROP}:
+            raise ValueError('Unknown overflow policy: ' + repr(overflow))
+        elif backlog_limit <= 0:
+            raise ValueError('backlog_limit must be positive.')
+
+        self.sink = sink
+        self.backlog_limit = backlog_limit
+        self.overflow = overflow
+        self.chunk_size = chunk_size
+
+        self.dropped = 0
+        self.write_errors = 0
+        # For sinks that want to hear from us even when there's nothing to
+        # write (see _ThrottledSink.tick).
+        self._tick_interval = getattr(sink, 'tick_interval', None)
+
+        self._backlog = collections.deque()
+        self._backlog_size = 0
+        self._eof = False
+        self._closing = False
+        self._cond = threading.Condition()
+
+        self._read_fd = None
+        self._reader = None
+        self._writer = None
+
+    def start(self):
+        ''' Creates the pipe and starts pumping. Returns the write end
+        of the pipe, which the caller is responsible for closing.
+        '''
+        self._read_fd, write_fd = os.pipe()
+        self._reader = threading.Thread(
+            target = self._read_loop,
+            name = 'StreamPump reader',
+            daemon = True
+        )
+        self._writer = threading.Thread(
+            target = self._write_loop,
+            name = 'StreamPump writer',
+            daemon = True
+        )
+        self._reader.start()
+        self._writer.start()
+        return write_fd
+
+    def close(self, timeout=5):
+        ''' Stops pumping once the pipe has been closed by all writers,
+        or timeout seconds have elapsed, whichever comes first. Anything
+        already in the backlog is written to the sink.
+        '''
+        self._writer.join(timeout)
+
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+
+        self._writer.join()
+        self.sink.close()
+
+    def _read_loop(self):
+        ''' Drains the pipe into the backlog.
+        '''
+        try:
+            while True:
+                data = os.read(self._read_fd, self.chunk_size)
+                if not data:
+                    break
+
+                with self._cond:
+                    if self.overflow == OVERFLOW_DROP:
+                        if self._backlog_size + len(data) > self.backlog_limit:
+                            self.dropped += len(data)
+                            continue
+
+                    else:
+                        # Always accept at least one chunk, so that a
+                        # backlog_limit smaller than chunk_size can't
+                        # deadlock us.
+                        while (self._backlog and not self._closing and
+                               self._backlog_size + len(data) >
+                               self.backlog_limit):
+                            self._cond.wait()
+
+                    self._backlog.append(data)
+                    self._backlog_size += len(data)
+                    self._cond.notify_all()
+
+        finally:
+            os.close(self._read_fd)
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def _write_loop(self):
+        ''' Empties the backlog into the sink.
+        '''
+        while True:
+            with self._cond:
+                if not (self._backlog or self._eof or self._closing):
+                    self._cond.wait(self._tick_interval)
+
+                data = b''.join(self._backlog)
+                self._backlog.clear()
+                self._backlog_size = 0
+                done = self._eof or self._closing
+                self._cond.notify_all()
+
+            try:
+                if data:
+                    self.sink.write(data)
+                if self._tick_interval is not None:
+                    self.sink.tick()
+            # Don't log here: our log could very well be this sink.
+            except Exception:
+                self.write_errors += 1
+
+            if done:
+                break
+
+
+def _start_pump(path, stream_options, priority=LOG_INFO, is_stderr=False):
+    ''' Starts a _StreamPump into the file (or logging socket) at path,
+    returning the write end of its pipe.
+    '''
+    pump = _StreamPump(
+        stream_options.make_sink(path, priority, is_stderr),
+        stream_options.backlog or DEFAULT_BACKLOG,
+        stream_options.overflow
+    )
+    write_fd = pump.start()
+    
+    _register_close_pumps()
+    _active_pumps.append(pump)
+    
+    return write_fd
+
+
+def reopen_stds():
+    ''' Reopens the files that stdout and stderr were redirected to by
+    daemonization, for example after they have been moved by an external
+    log rotator. Does nothing if they weren't redirected.
+    '''
+    if _direct_redirects:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                if stream is not None:
+                    stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    _reopen_files()
+
+
+def _reopen_files():
+    ''' Does the actual reopening for reopen_stds, without flushing
+    sys.stdout and sys.stderr first. That makes it safe to call from a
+    signal handler, which may have interrupted a write to them: anything
+    still in their buffers just ends up in the new files.
+    '''
+    for pump in _active_pumps:
+        pump.sink.reopen()
+
+    # dup2 atomically replaces the old file, so that nothing written in the
+    # meantime goes missing.
+    for fd, (path, flags) in _direct_redirects.items():
+        new_fd = os.open(path, flags, 0o666)
+        try:
+            os.dup2(new_fd, fd)
+        finally:
+            os.close(new_fd)
+
+
+def _rebuffer_stds(buffering):
+    ''' Replaces sys.stdout and sys.stderr with new text streams around
+    fds 1 and 2, using a buffer of the passed size. As with open(), a
+    buffering of 0 writes through immediately, and 1 selects line
+    buffering.
+    '''
+    for name, fd in (('stdout', 1), ('stderr', 2)):
+        old_stream = getattr(sys, name)
+        if old_stream is None:
+            continue
+
+        old_stream.flush()
+        raw = io.FileIO(fd, 'w', closefd=False)
+        if buffering > 1:
+            binary = io.BufferedWriter(raw, buffer_size=buffering)
+        else:
+            binary = raw
+
+        new_stream = io.TextIOWrapper(
+            binary,
+            encoding = getattr(old_stream, 'encoding', None),
+            errors = getattr(old_stream, 'errors', None),
+            line_buffering = buffering == 1,
+            write_through = buffering == 0
+        )
+        setattr(sys, name, new_stream)
+
+
+def _register_close_pumps():
+    ''' Registers _close_pumps atexit, unless it already is. Called when
+    the first pump is started, but daemonization calls it before
+    registering its own cleanup, so that (atexit being LIFO) anything
+    the cleanup writes still makes it through the pumps.
+    '''
+    global _close_pumps_registered
+    if not _close_pumps_registered:
+        atexit.register(_close_pumps)
+        _close_pumps_registered = True
+
+
+def _close_pumps(timeout=5):
+    ''' Flushes stdout and stderr, and then closes all active pumps.
+    Registered atexit by _register_close_pumps.
+    '''
+    global _close_pumps_registered
+    if not _active_pumps:
+        return
+        
+    # Don't import _flush_stds, because _daemonize_common imports us.
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            if stream is not None:
+                stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    # Point stdout and stderr somewhere harmless, so that (absent any
+    # inherited copies of the pipe) the readers will see EOF.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    finally:
+        os.close(devnull)
+
+    atexit.unregister(_close_pumps)
+    _close_pumps_registered = False
+    while _active_pumps:
+        pump = _active_pumps.pop()
+        try:
+            pump.close(timeout)
+        except Exception:
+            logger.error(
+                'Failed to close stream pump w/ traceback: \n' +
+                ''.join(traceback.format_exc())
+            )
@@ -0,0 +1,237 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+# Global dependencies
+import os
+import sys
+import signal
+import logging
+import threading
+import traceback
+import time
+import collections
+
+# Intra-package dependencies
+from .utils import platform_specificker
+
+_SUPPORTED_PLATFORM = platform_specificker(
+    linux_choice = True,
+    win_choice = False,
+    cygwin_choice = False,
+    osx_choice = True,
+    # Dunno if this is a good idea but might as well try
+    other_choice = True
+)
+
+if _SUPPORTED_PLATFORM:
+    import resource
+
+
+# ###############################################
+# Boilerplate
+# ###############################################
+
+
+logger = logging.getLogger(__name__)
+
+# Control * imports.
+__all__ = [
+    'RSSWatchdog',
+]
+
+
+# ###############################################
+# Library
+# ###############################################
+
+
+def _terminate_self():
+    ''' The default RSSWatchdog action: send ourselves a SIGTERM, so
+    that (with the default SignalHandler1 handlers) the main thread
+    exits gracefully and our supervisor can restart us.
+    '''
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+class _StatmSampler:
+    ''' Samples our resident set size from /proc/self/statm. Keeps the
+    file open and preads it, so that each sample costs a single
+    syscall.
+    '''
+
+    def __init__(self):
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+        self._fd = os.open('/proc/self/statm', os.O_RDONLY)
+
+    def __call__(self):
+        # statm is "size resident shared text lib data dt", in pages
+        fields = os.pread(self._fd, 128, 0).split()
+        return int(fields[1]) * self._page_size
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _RusageSampler:
+    ''' Fallback sampler for platforms without procfs. Note that this
+    is actually the peak RSS, not the current RSS.
+    '''
+
+    def __call__(self):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports in kilobytes, but OSX reports in bytes.
+        if sys.platform.startswith('darwin'):
+            return maxrss
+        else:
+            return maxrss * 1024
+
+    def close(self):
+        pass
+
+
+class RSSWatchdog:
+    ''' Samples the resident set size of the current process from a
+    daughter thread, and calls action (once) when it exceeds rss_limit
+    bytes. The default action sends SIGTERM to ourselves, which will
+    cause a graceful exit if SignalHandler1 is running with the default
+    handler.
+    '''
+
+    def __init__(self, rss_limit, interval=10, action=None, history=360):
+        ''' Creates a watchdog. interval is the number of seconds
+        between samples. history is the maximum number of samples to
+        keep for stats().
+        '''
+        if interval <= 0:
+            raise ValueError('interval must be positive.')
+
+        self.rss_limit = rss_limit
+        self.interval = interval
+
+        if action is None:
+            action = _terminate_self
+        self.action = action
+
+        self._samples = collections.deque(maxlen=history)
+        self._peak = 0
+        self._triggered = False
+
+        self._opslock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        ''' Starts sampling.
+        '''
+        if not _SUPPORTED_PLATFORM:
+            raise OSError('RSSWatchdog is unsupported on your platform.')
+
+        with self._opslock:
+            if self._thread is not None:
+                raise RuntimeError('RSSWatchdog is already running.')
+
+            if os.path.exists('/proc/self/statm'):
+                sampler = _StatmSampler()
+            else:
+                sampler = _RusageSampler()
+
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target = self._sample_loop,
+                args = (sampler,),
+                name = 'RSSWatchdog',
+                daemon = True
+            )
+            self._thread.start()
+
+    def stop(self):
+        ''' Stops sampling. Collected samples remain available through
+        stats().
+        '''
+        with self._opslock:
+            if self._thread is None:
+                return
+
+            self._stopped.set()
+            # Don't deadlock if our action called stop() itself.
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        ''' Returns a dict summarizing the sampled RSS series:
+
+        rss: the most recent sample, in bytes (or None)
+        peak: the largest sample seen, in bytes
+        triggered: whether or not the action has been called
+        samples: a list of (time.monotonic(), rss) tuples, oldest first
+        '''
+        samples = list(self._samples)
+        if samples:
+            rss = samples[-1][1]
+        else:
+            rss = None
+
+        return {
+            'rss': rss,
+            'peak': self._peak,
+            'triggered': self._triggered,
+            'samples': samples,
+        }
+
+    def _sample_loop(self, sampler):
+        ''' Samples RSS every interval until stopped.
+        '''
+        try:
+            while not self._stopped.is_set():
+                rss = sampler()
+                self._samples.append((time.monotonic(), rss))
+                self._peak = max(self._peak, rss)
+
+                if rss > self.rss_limit and not self._triggered:
+                    self._triggered = True
+                    logger.warning(
+                        'RSS of ' + str(rss) + ' bytes exceeded limit of ' +
+                        str(self.rss_limit) + ' bytes.'
+                    )
+                    self.action()
+
+                self._stopped.wait(self.interval)
+
+        except Exception:
+            logger.error(
+                'RSSWatchdog failed w/ traceback: \n' +
+                ''.join(traceback.format_exc())
+            )
+
+        finally:
+            sampler.close()
@@ -111,6 +111,7 @@ setup(
     extras_require={
         'dev': [],
         'test': ['psutil'],
+        'zstd': ['zstandard'],
     },
 
     # If there are data files included in your packages that need to be
@@ -118,4 +119,11 @@ setup(
     # have to be included in MANIFEST.in as well.
     package_data={
     },
+
+    # Installs the command line interface as "daemoniker".
+    entry_points={
+        'console_scripts': [
+            'daemoniker=daemoniker.__main__:main',
+        ],
+    },
 )
@@ -0,0 +1,131 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import os
+
+from daemoniker._daemonize_unix import _SUPPORTED_PLATFORM
+
+from daemoniker._cgroups_unix import _normalize_cgroup
+from daemoniker._cgroups_unix import _join_cgroup
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+@unittest.skipIf(not _SUPPORTED_PLATFORM, 'Unsupported platform.')
+class Cgroups_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_normalize(self):
+        ''' Test validating cgroup options.
+        '''
+        self.assertIsNone(_normalize_cgroup(None, None, None))
+        
+        with tempfile.TemporaryDirectory() as root:
+            root = os.path.abspath(root)
+            
+            self.assertEqual(
+                _normalize_cgroup(
+                    '/daemons//foo/',
+                    {'memory.max': 1024, 'cpu.max': '50000 100000'},
+                    root
+                ),
+                (
+                    root,
+                    root + '/daemons/foo',
+                    {'memory.max': '1024', 'cpu.max': '50000 100000'}
+                )
+            )
+            
+            bad_argsets = [
+                (None, {'memory.max': 1024}, root),
+                ('foo', None, root + '/nonexistent'),
+                ('../foo', None, root),
+                ('', None, root),
+                ('foo', {'memory': 1024}, root),
+                ('foo', {'cgroup.procs': 1}, root),
+                ('foo', {'../memory.max': 1}, root),
+            ]
+            for argset in bad_argsets:
+                with self.subTest(argset):
+                    with self.assertRaises(ValueError):
+                        _normalize_cgroup(*argset)
+            
+    def test_join(self):
+        ''' Test creating and joining a cgroup, using a temporary
+        directory as the cgroupfs root.
+        '''
+        with tempfile.TemporaryDirectory() as root:
+            # Pretend that the root is a real cgroupfs root
+            with open(root + '/cgroup.subtree_control', 'w') as f:
+                f.write('cpu\n')
+                
+            cgroup = _normalize_cgroup(
+                'daemons/foo',
+                {'memory.max': 1024, 'pids.max': 'max'},
+                root
+            )
+            _join_cgroup(cgroup)
+            
+            cgroup_path = root + '/daemons/foo'
+            with open(cgroup_path + '/memory.max', 'r') as f:
+                self.assertEqual(f.read(), '1024\n')
+            with open(cgroup_path + '/pids.max', 'r') as f:
+                self.assertEqual(f.read(), 'max\n')
+            with open(cgroup_path + '/cgroup.procs', 'r') as f:
+                self.assertEqual(int(f.read()), os.getpid())
+            with open(root + '/cgroup.subtree_control', 'r') as f:
+                self.assertEqual(f.read(), '+memory +pids')
+                
+            # Joining an existing cgroup should also work.
+            _join_cgroup(cgroup)
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import os
+
+from daemoniker._chroot_unix import _normalize_chroot
+from daemoniker._chroot_unix import _jail_path
+from daemoniker._chroot_unix import _jail_stream_target
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+class Chroot_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_resolve(self):
+        ''' Test resolving paths from inside the chroot.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            os.mkdir(dirname + '/jail')
+            os.mkdir(dirname + '/jail/logs')
+            os.symlink(dirname + '/jail/logs', dirname + '/logs')
+            jail = _normalize_chroot(dirname + '/jail')
+            
+            self.assertIsNone(_normalize_chroot(None))
+            self.assertEqual(jail, os.path.realpath(dirname + '/jail'))
+            with self.assertRaises(FileNotFoundError):
+                _normalize_chroot(dirname + '/missing')
+            with open(dirname + '/file.txt', 'w'):
+                pass
+            with self.assertRaises(NotADirectoryError):
+                _normalize_chroot(dirname + '/file.txt')
+                
+            self.assertEqual(_jail_path(jail, jail, 'chdir'), '/')
+            # Symlinks are resolved before the chroot.
+            self.assertEqual(
+                _jail_path(jail, dirname + '/logs/out.txt', 'stdout_goto'),
+                '/logs/out.txt'
+            )
+            with self.assertRaises(ValueError):
+                _jail_path(jail, dirname + '/file.txt', 'stdout_goto')
+            # Including sneaky ones.
+            with self.assertRaises(ValueError):
+                _jail_path(jail, jail + '/../file.txt', 'stdout_goto')
+                
+            # Relative paths are relative to chdir.
+            self.assertEqual(
+                _jail_stream_target(jail, 'out.txt', jail + '/logs', 'stdout'),
+                '/logs/out.txt'
+            )
+            self.assertEqual(
+                _jail_stream_target(
+                    jail,
+                    'unix://' + jail + '/logs/collector.sock',
+                    '/',
+                    'stdout'
+                ),
+                'unix:///logs/collector.sock'
+            )
+            # Devnull needs to exist inside the jail.
+            with self.assertRaises(ValueError):
+                _jail_stream_target(jail, os.devnull, '/', 'stdin')
+            os.makedirs(jail + os.path.dirname(os.devnull))
+            with open(jail + os.devnull, 'w'):
+                pass
+            self.assertEqual(
+                _jail_stream_target(jail, os.devnull, '/', 'stdin'),
+                os.devnull
+            )
+        
+
+if __name__ == "__main__":
+    unittest.main()
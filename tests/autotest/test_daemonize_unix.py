@@ -32,21 +32,47 @@ daemoniker: Cross-platform daemonization tools.
 
 import unittest
 import logging
+import sys
 import tempfile
 import os
 import time
 import shutil
 import traceback
+import atexit
+import json
+import socket
+import subprocess
+import gzip
+import errno
+import threading
+import fcntl
 
+import daemoniker._daemonize_unix
 from daemoniker._daemonize_unix import Daemonizer
 from daemoniker._daemonize_unix import daemonize
 from daemoniker._daemonize_unix import _SUPPORTED_PLATFORM
 from daemoniker._daemonize_unix import _fratricidal_fork
 from daemoniker._daemonize_unix import _filial_usurpation
 from daemoniker._daemonize_unix import _autoclose_files
+from daemoniker._daemonize_unix import _lock_pidfile
+from daemoniker._daemonize_unix import _parse_cpulist
+from daemoniker._daemonize_unix import _normalize_cpu_affinity
+from daemoniker._daemonize_unix import _set_cpu_affinity
+from daemoniker._daemonize_unix import _normalize_rlimits
+from daemoniker._daemonize_unix import _set_rlimits
+from daemoniker._daemonize_unix import _normalize_scheduling
+from daemoniker._daemonize_unix import _set_scheduling
 
 from daemoniker._daemonize_common import _acquire_pidfile
 
+from daemoniker._startup_common import startup_complete
+
+from daemoniker._inherit_unix import inherited_fds
+
+from daemoniker._registry_unix import Registry
+
+from daemoniker._reaper_unix import set_pdeathsig
+
 
 # ###############################################
 # "Paragon of adequacy" test fixtures
@@ -462,6 +488,39 @@ class Deamonizing_test(unittest.TestCase):
                 childproc_fratfork_2(res_path_parent, res_path_child)
                 os._exit(0)
         
+    def test_lock_pidfile(self):
+        ''' Test that status checks don't keep us from locking the
+        pidfile, but that somebody actually holding it does.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            pid_file = dirname + '/pid.pid'
+            
+            # Somebody checking on us, who lets go in a moment.
+            locked_pidfile = open(pid_file, 'w')
+            try:
+                checker = os.open(pid_file, os.O_RDONLY)
+                fcntl.flock(checker, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                release = threading.Timer(.1, os.close, (checker,))
+                release.start()
+                _lock_pidfile(locked_pidfile)
+                release.join()
+                self.assertTrue(os.path.exists(pid_file))
+            finally:
+                locked_pidfile.close()
+            
+            # Somebody who doesn't.
+            holder = os.open(pid_file, os.O_RDONLY)
+            try:
+                fcntl.flock(holder, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                locked_pidfile = open(pid_file, 'w')
+                with self.assertRaises(SystemExit):
+                    _lock_pidfile(locked_pidfile)
+                self.assertTrue(locked_pidfile.closed)
+                # It's the holder's pidfile, not ours to remove.
+                self.assertTrue(os.path.exists(pid_file))
+            finally:
+                os.close(holder)
+        
     def test_daemonize(self):
         ''' Test daemonization. Platform-specific.
         '''
@@ -515,11 +574,14 @@ class Deamonizing_test(unittest.TestCase):
         # Child process
         else:
             _fixtures.__SKIP_ALL_REMAINING__ = True
-            childproc_daemon(pid_file, token, res_path)
-            # Hm. So we can't do os._exit, because we need the cleanup to
-            # happen to remove the pid file. However, we're deamonized now,
-            # so this shouldn't affect the parent.
-            raise SystemExit()
+            try:
+                childproc_daemon(pid_file, token, res_path)
+            finally:
+                # We need the cleanup to happen to remove the pid file, but
+                # returning to the test runner would put it off until the
+                # rest of the session is over. So run it now, and then leave.
+                atexit._run_exitfuncs()
+                os._exit(0)
                 
     def test_context_manager(self):
         ''' Test the context manager. Should produce same results on
@@ -622,12 +684,608 @@ class Deamonizing_test(unittest.TestCase):
             finally:
                 # Tell unittest that we're done.
                 _fixtures.__SKIP_ALL_REMAINING__ = True
+                # As in test_daemonize, clean up now instead of after the
+                # rest of the session.
+                atexit._run_exitfuncs()
+                os._exit(0)
                 # The thing is, it doesn't really make sense to call this. It's
                 # just going to suppress any other errors that get called, and
                 # it's caught by unittest regardless. We can't do os._exit,
                 # because that prevents cleanup by the daemonized child. So
                 # just do nothing beyond skipping all remaining.
                 # raise SystemExit()
+                
+    @unittest.skipIf(not hasattr(os, 'sched_setaffinity'),
+                     'No cpu affinity support.')
+    def test_cpu_affinity(self):
+        ''' Test normalizing and applying cpu affinity. Platform-
+        specific.
+        '''
+        self.assertEqual(_parse_cpulist('0-3,8,10-11\n'),
+                         {0, 1, 2, 3, 8, 10, 11})
+        self.assertIsNone(_normalize_cpu_affinity(None))
+        
+        original = os.sched_getaffinity(0)
+        first_cpu = min(original)
+        
+        self.assertEqual(_normalize_cpu_affinity([first_cpu]),
+                         frozenset({first_cpu}))
+        self.assertEqual(_normalize_cpu_affinity(str(first_cpu)),
+                         frozenset({first_cpu}))
+        
+        with self.assertRaises(ValueError):
+            _normalize_cpu_affinity([])
+        with self.assertRaises(ValueError):
+            _normalize_cpu_affinity([max(original) + 4096])
+        with self.assertRaises(ValueError):
+            _normalize_cpu_affinity('node4096')
+            
+        try:
+            _set_cpu_affinity(frozenset({first_cpu}))
+            self.assertEqual(os.sched_getaffinity(0), {first_cpu})
+            
+        finally:
+            os.sched_setaffinity(0, original)
+            
+    def test_rlimits(self):
+        ''' Test normalizing and applying resource limits. Platform-
+        specific.
+        '''
+        import resource
+        
+        self.assertIsNone(_normalize_rlimits(None))
+        
+        original = resource.getrlimit(resource.RLIMIT_CORE)
+        soft, hard = original
+        if hard == resource.RLIM_INFINITY:
+            target = 1024
+        else:
+            target = hard // 2
+        
+        normalized = _normalize_rlimits({'core': target})
+        self.assertEqual(
+            normalized,
+            [(resource.RLIMIT_CORE, target, target)]
+        )
+        self.assertEqual(
+            _normalize_rlimits({'RLIMIT_CORE': (0, target)}),
+            _normalize_rlimits({resource.RLIMIT_CORE: (0, target)})
+        )
+        
+        with self.assertRaises(ValueError):
+            _normalize_rlimits({'nonexistent_limit': 1})
+        with self.assertRaises(ValueError):
+            _normalize_rlimits({'core': (target + 1, target)})
+        
+        # Lowering the hard limit is irreversible without privileges, so do
+        # it in a fork.
+        with tempfile.TemporaryDirectory() as dirname:
+            res_path = dirname + '/response.txt'
+            pid = os.fork()
+            
+            # Parent process
+            if pid != 0:
+                os.waitpid(pid, 0)
+                
+                try:
+                    with open(res_path, 'r') as res:
+                        response = res.read()
+                
+                except (IOError, OSError) as exc:
+                    raise AssertionError from exc
+                    
+                self.assertEqual(response, str((target, target)))
+                
+            # Child process
+            else:
+                _fixtures.__SKIP_ALL_REMAINING__ = True
+                try:
+                    _set_rlimits(normalized)
+                    with open(res_path, 'w') as f:
+                        f.write(str(resource.getrlimit(resource.RLIMIT_CORE)))
+                finally:
+                    os._exit(0)
+                    
+    @unittest.skipIf(not sys.platform.startswith('linux'), 'Linux only.')
+    def test_scheduling(self):
+        ''' Test normalizing and applying scheduling options. Linux-
+        specific.
+        '''
+        self.assertEqual(
+            _normalize_scheduling(None, None, None, None),
+            (None, None, None, None)
+        )
+        
+        normalized = _normalize_scheduling(19, 'batch', 'idle', 500)
+        self.assertEqual(normalized, (19, os.SCHED_BATCH, 3 << 13, 500))
+        self.assertEqual(
+            _normalize_scheduling(None, None, ('best-effort', 7), None),
+            (None, None, (2 << 13) | 7, None)
+        )
+        
+        for bad_args in [(20, None, None, None),
+                         (None, 'fifo', None, None),
+                         (None, 'nonexistent', None, None),
+                         (None, None, 'nonexistent', None),
+                         (None, None, ('best-effort', 8), None),
+                         (None, None, None, 1001)]:
+            with self.subTest(bad_args):
+                with self.assertRaises(ValueError):
+                    _normalize_scheduling(*bad_args)
+        
+        # These are mostly irreversible without privileges, so do it in a
+        # fork.
+        with tempfile.TemporaryDirectory() as dirname:
+            res_path = dirname + '/response.txt'
+            pid = os.fork()
+            
+            # Parent process
+            if pid != 0:
+                os.waitpid(pid, 0)
+                
+                try:
+                    with open(res_path, 'r') as res:
+                        response = res.read()
+                
+                except (IOError, OSError) as exc:
+                    raise AssertionError from exc
+                    
+                self.assertEqual(
+                    response,
+                    str((19, os.SCHED_BATCH, 500))
+                )
+                
+            # Child process
+            else:
+                _fixtures.__SKIP_ALL_REMAINING__ = True
+                try:
+                    _set_scheduling(normalized)
+                    with open('/proc/self/oom_score_adj', 'r') as f:
+                        oom_score_adj = int(f.read())
+                    with open(res_path, 'w') as f:
+                        f.write(str((
+                            os.getpriority(os.PRIO_PROCESS, 0),
+                            os.sched_getscheduler(0),
+                            oom_score_adj
+                        )))
+                finally:
+                    os._exit(0)
+
+                    
+    def _launch(self, dirname, daemon_func=None, **kwargs):
+        ''' Daemonizes a fork with kwargs, running daemon_func in the
+        daemon. Returns the exit code and stderr of the launcher.
+        '''
+        err_path = dirname + '/launcher_stderr.txt'
+        pid = os.fork()
+        
+        # Parent process
+        if pid != 0:
+            __, status = os.waitpid(pid, 0)
+            with open(err_path, 'r') as f:
+                if os.WIFSIGNALED(status):
+                    return -os.WTERMSIG(status), f.read()
+                else:
+                    return os.WEXITSTATUS(status), f.read()
+                
+        # Child process
+        else:
+            _fixtures.__SKIP_ALL_REMAINING__ = True
+            try:
+                err_fd = os.open(err_path, os.O_WRONLY | os.O_CREAT)
+                os.dup2(err_fd, 2)
+                # The test runner may have replaced sys.stderr (ex: pytest
+                # capturing it), so point it back at fd 2 explicitly. That
+                # way the daemon's redirection applies to it, too.
+                sys.stderr = open(2, 'w', buffering=1, closefd=False)
+                # Daemons here skip cleanup, so each needs its own pidfile.
+                pid_file = dirname + '/' + str(os.getpid()) + '.pid'
+                daemonize(pid_file, **kwargs)
+                if daemon_func is not None:
+                    daemon_func()
+            finally:
+                os._exit(0)
+                
+    def test_startup_errors(self):
+        ''' Test reporting daemon startup to the launcher.
+        '''
+        def fail_setup():
+            try:
+                raise RuntimeError('Setup failed')
+            except RuntimeError:
+                sys.excepthook(*sys.exc_info())
+                
+        with tempfile.TemporaryDirectory() as dirname:
+            # Normal startup
+            code, stderr = self._launch(dirname)
+            self.assertEqual(code, 0)
+            self.assertEqual(stderr, '')
+            
+            # Failing within daemonize itself
+            code, stderr = self._launch(
+                dirname,
+                stdout_goto = dirname + '/nonexistent/stdout.txt'
+            )
+            self.assertEqual(code, 1)
+            self.assertIn('Daemon failed to start', stderr)
+            self.assertIn('FileNotFoundError', stderr)
+            
+            # Failing in deferred setup code
+            code, stderr = self._launch(dirname, fail_setup, defer_ready=True)
+            self.assertEqual(code, 1)
+            self.assertIn('RuntimeError: Setup failed', stderr)
+            
+            # Failing to set up the channel itself (ex: out of fds) shouldn't
+            # leave the pidfile behind.
+            def out_of_fds():
+                raise OSError(errno.EMFILE, os.strerror(errno.EMFILE))
+                
+            channel = daemoniker._daemonize_unix._StartupChannel
+            daemoniker._daemonize_unix._StartupChannel = out_of_fds
+            try:
+                with self.assertRaises(OSError):
+                    daemonize(dirname + '/failed.pid')
+            finally:
+                daemoniker._daemonize_unix._StartupChannel = channel
+            self.assertFalse(os.path.exists(dirname + '/failed.pid'))
+            
+            # Succeeding in deferred setup code
+            code, stderr = self._launch(
+                dirname,
+                startup_complete,
+                defer_ready = True
+            )
+            self.assertEqual(code, 0)
+            
+            # Never finishing deferred setup code
+            code, stderr = self._launch(
+                dirname,
+                lambda: time.sleep(1),
+                defer_ready = True,
+                success_timeout = .1
+            )
+            self.assertEqual(code, 1)
+            self.assertIn('did not finish starting', stderr)
+
+            
+    def test_event_log(self):
+        ''' Test recording lifecycle events during daemonization.
+        '''
+        # Manually manage the directory, because running the daemon's exit
+        # functions would otherwise remove it.
+        dirname = tempfile.mkdtemp()
+        try:
+            event_path = dirname + '/events.jsonl'
+            # Run cleanup in the daemon, so we get those events too.
+            code, stderr = self._launch(
+                dirname,
+                atexit._run_exitfuncs,
+                event_log = event_path
+            )
+            self.assertEqual(code, 0, stderr)
+            
+            # The daemon may still be cleaning up.
+            for __ in range(50):
+                with open(event_path, 'r') as f:
+                    events = [json.loads(line) for line in f]
+                if events[-1]['event'] == 'cleaned_up':
+                    break
+                time.sleep(.1)
+                
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+                
+        self.assertEqual(
+            [event['event'] for event in events],
+            ['pidfile_acquired', 'forked', 'setsid', 'forked', 'pid_written',
+             'fds_closed', 'streams_redirected', 'started', 'stopping',
+             'cleaned_up']
+        )
+        self.assertEqual(
+            [event['generation'] for event in events
+             if event['event'] == 'forked'],
+            [1, 2]
+        )
+        daemon_pid = events[-1]['pid']
+        self.assertEqual(events[3]['pid'], daemon_pid)
+        self.assertNotEqual(events[0]['pid'], daemon_pid)
+        self.assertEqual(events[4]['pid_file'], events[0]['pid_file'])
+        monotonic = [event['monotonic'] for event in events]
+        self.assertEqual(monotonic, sorted(monotonic))
+
+        
+    def test_preopen(self):
+        ''' Test handing preopened sockets to the daemon.
+        '''
+        def serve():
+            server = socket.socket(fileno=inherited_fds()['server'])
+            server.settimeout(5)
+            conn, __ = server.accept()
+            conn.sendall(str(sorted(inherited_fds())).encode())
+            conn.close()
+            
+        with tempfile.TemporaryDirectory() as dirname:
+            address = dirname + '/server.sock'
+            code, stderr = self._launch(
+                dirname,
+                serve,
+                preopen = {'server': 'unix://' + address}
+            )
+            self.assertEqual(code, 0, stderr)
+            # The launcher shouldn't have kept any of them.
+            self.assertEqual(inherited_fds(), {})
+            
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.settimeout(5)
+            try:
+                client.connect(address)
+                self.assertEqual(client.recv(1024), b"['server']")
+            finally:
+                client.close()
+                
+            # Failing to open should raise in the caller, without leaving the
+            # pidfile behind.
+            with self.assertRaises(FileNotFoundError):
+                daemonize(
+                    dirname + '/failed.pid',
+                    preopen = {'missing': dirname + '/missing.txt'}
+                )
+            self.assertFalse(os.path.exists(dirname + '/failed.pid'))
+            
+    def test_chroot(self):
+        ''' Test confining the daemon to a chroot.
+        '''
+        if os.getuid() != 0:
+            raise unittest.SkipTest('Requires root.')
+            
+        def report():
+            os.write(1, (os.getcwd() + ' ' + str(sorted(os.listdir('/'))) +
+                         '\n').encode())
+            # Cleanup needs to find the pidfile from inside the jail.
+            atexit._run_exitfuncs()
+            
+        # Manually manage the directory, because running the daemon's exit
+        # functions would otherwise remove it.
+        dirname = tempfile.mkdtemp()
+        try:
+            jail = dirname + '/jail'
+            os.makedirs(jail + '/srv')
+            code, stderr = self._launch(
+                dirname,
+                report,
+                chroot = jail,
+                chdir = jail + '/srv',
+                stdin_goto = jail + '/stdin.txt',
+                stdout_goto = jail + '/stdout.txt',
+                stderr_goto = jail + '/stderr.txt',
+                event_log = jail + '/events.jsonl'
+            )
+            self.assertEqual(code, 0, stderr)
+            
+            # The daemon may still be cleaning up.
+            for __ in range(50):
+                with open(jail + '/events.jsonl', 'r') as f:
+                    events = [json.loads(line)['event'] for line in f]
+                if events[-1] == 'cleaned_up':
+                    break
+                time.sleep(.1)
+            
+            self.assertIn('chrooted', events)
+            # The streams are opened from inside the chroot.
+            self.assertLess(
+                events.index('chrooted'),
+                events.index('streams_redirected')
+            )
+            self.assertEqual(events[-1], 'cleaned_up')
+            self.assertEqual(
+                [name for name in os.listdir(dirname) if name.endswith('.pid')],
+                []
+            )
+            with open(jail + '/stdout.txt', 'r') as f:
+                self.assertEqual(
+                    f.read(),
+                    "/srv ['events.jsonl', 'srv', 'stderr.txt', 'stdin.txt', "
+                    "'stdout.txt']\n"
+                )
+                
+            # Anything outside of the chroot should be caught by the caller.
+            with self.assertRaises(ValueError):
+                daemonize(
+                    dirname + '/failed.pid',
+                    chroot = jail,
+                    stdout_goto = dirname + '/stdout.txt'
+                )
+            self.assertFalse(os.path.exists(dirname + '/failed.pid'))
+            
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+            
+    @unittest.skipIf(not sys.platform.startswith('linux'), 'Linux only.')
+    def test_subreaper(self):
+        ''' Test that the daemon's SIGCHLD handler survives autoclosing,
+        and leaves the daemon's own children alone.
+        '''
+        def spawn():
+            helper = subprocess.Popen(
+                [sys.executable, '-c', 'import sys; sys.exit(3)'],
+                preexec_fn = set_pdeathsig
+            )
+            with open(dirname + '/returncode.tmp', 'w') as f:
+                f.write(str(helper.wait()))
+            os.rename(dirname + '/returncode.tmp', dirname + '/returncode.txt')
+                
+        with tempfile.TemporaryDirectory() as dirname:
+            code, stderr = self._launch(dirname, spawn, subreaper=True)
+            self.assertEqual(code, 0, stderr)
+            
+            for __ in range(50):
+                if os.path.exists(dirname + '/returncode.txt'):
+                    break
+                time.sleep(.1)
+            with open(dirname + '/returncode.txt', 'r') as f:
+                self.assertEqual(f.read(), '3')
+            
+    def test_chroot_compression(self):
+        ''' Test compressing rotated streams from inside a chroot.
+        '''
+        if os.getuid() != 0:
+            raise unittest.SkipTest('Requires root.')
+            
+        def spam():
+            for ii in range(3):
+                os.write(1, (str(ii) * 9 + '\n').encode())
+                # Keep the pump from batching the lines together.
+                time.sleep(.05)
+            # This waits for the compressions to finish.
+            atexit._run_exitfuncs()
+            
+        # Make sure the executor still needs to be imported lazily (on
+        # Pythons that do so).
+        import concurrent.futures
+        saved_module = sys.modules.pop('concurrent.futures.thread', None)
+        saved_attr = concurrent.futures.__dict__.pop(
+            'ThreadPoolExecutor', None
+        )
+        # Manually manage the directory, because running the daemon's exit
+        # functions would otherwise remove it.
+        dirname = tempfile.mkdtemp()
+        try:
+            jail = dirname + '/jail'
+            os.makedirs(jail + '/dev')
+            with open(jail + os.devnull, 'w'):
+                pass
+            code, stderr = self._launch(
+                dirname,
+                spam,
+                chroot = jail,
+                stdout_goto = jail + '/stdout.txt',
+                stderr_goto = jail + '/stderr.txt',
+                stream_rotate_bytes = 10,
+                stream_compress = 'gzip',
+                event_log = jail + '/events.jsonl'
+            )
+            self.assertEqual(code, 0, stderr)
+            
+            # The daemon may still be compressing. Sort on the uncompressed
+            # names, which is the order they were rotated in.
+            for __ in range(50):
+                compressed = sorted(
+                    (name for name in os.listdir(jail) if name.endswith('.gz')),
+                    key = lambda name: name[:-3]
+                )
+                if len(compressed) == 2:
+                    break
+                time.sleep(.1)
+                
+            with open(jail + '/stderr.txt', 'r') as f:
+                self.assertEqual(f.read(), '')
+            self.assertEqual(len(compressed), 2)
+            for ii, name in enumerate(compressed):
+                with gzip.open(jail + '/' + name, 'rb') as f:
+                    self.assertEqual(f.read(), (str(ii) * 9 + '\n').encode())
+            with open(jail + '/stdout.txt', 'r') as f:
+                self.assertEqual(f.read(), '222222222\n')
+                    
+        finally:
+            if saved_module is not None:
+                sys.modules['concurrent.futures.thread'] = saved_module
+            if saved_attr is not None:
+                concurrent.futures.ThreadPoolExecutor = saved_attr
+            shutil.rmtree(dirname, ignore_errors=True)
+            
+    def test_cleanup_output(self):
+        ''' Test that output from the daemon's cleanup still makes it
+        through the std stream pumps.
+        '''
+        def lose_pidfile():
+            # The test runner may have hooked logging and unraisable
+            # exceptions (ex: pytest), so send the complaint to stderr
+            # ourselves.
+            handler = logging.StreamHandler(sys.stderr)
+            logging.getLogger('daemoniker').addHandler(handler)
+            if hasattr(sys, '__unraisablehook__'):
+                sys.unraisablehook = sys.__unraisablehook__
+            for name in os.listdir(dirname):
+                if name.endswith('.pid'):
+                    os.remove(dirname + '/' + name)
+            # Cleanup should complain about the missing pidfile.
+            atexit._run_exitfuncs()
+            
+        # Manually manage the directory, because running the daemon's exit
+        # functions would otherwise remove it.
+        dirname = tempfile.mkdtemp()
+        try:
+            err_path = dirname + '/stderr.txt'
+            code, stderr = self._launch(
+                dirname,
+                lose_pidfile,
+                stderr_goto = err_path,
+                stream_backlog = 1024
+            )
+            self.assertEqual(code, 0, stderr)
+            
+            output = ''
+            for __ in range(50):
+                with open(err_path, 'r') as f:
+                    output = f.read()
+                if 'FileNotFoundError' in output:
+                    break
+                time.sleep(.1)
+                
+            self.assertIn('Failed to clean up pidfile', output)
+            self.assertIn('FileNotFoundError', output)
+            
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
+            
+    def test_registry(self):
+        ''' Test recording the daemon in a registry until it exits.
+        '''
+        def wait_and_exit():
+            for __ in range(50):
+                if os.path.exists(dirname + '/go'):
+                    break
+                time.sleep(.1)
+            atexit._run_exitfuncs()
+            
+        # Manually manage the directory, because running the daemon's exit
+        # functions would otherwise remove it.
+        dirname = tempfile.mkdtemp()
+        try:
+            fleet = dirname + '/fleet'
+            code, stderr = self._launch(
+                dirname,
+                wait_and_exit,
+                registry = fleet,
+                name = 'app'
+            )
+            self.assertEqual(code, 0, stderr)
+            
+            with Registry(fleet, readonly=True) as registry:
+                entry = registry.lookup('app')
+                self.assertIsNotNone(entry)
+                with open(entry['pid_file'], 'r') as f:
+                    self.assertEqual(int(f.read()), entry['pid'])
+                    
+                # The name is taken while the daemon is running.
+                with self.assertRaises(ValueError):
+                    daemonize(
+                        dirname + '/failed.pid',
+                        registry = fleet,
+                        name = 'app'
+                    )
+                self.assertFalse(os.path.exists(dirname + '/failed.pid'))
+                
+                open(dirname + '/go', 'w').close()
+                for __ in range(50):
+                    if registry.lookup('app') is None:
+                        break
+                    time.sleep(.1)
+                self.assertIsNone(registry.lookup('app'))
+                self.assertEqual(registry.entries(), [])
+                
+        finally:
+            shutil.rmtree(dirname, ignore_errors=True)
         
 
 if __name__ == "__main__":
@@ -432,6 +432,39 @@ class Deamonizing_test(unittest.TestCase):
                 if worker is not None and worker.returncode is None:
                     worker.terminate()
             
+        
+class Unsupported_test(unittest.TestCase):
+    ''' These are refused before anything platform-specific happens, so
+    they can be checked everywhere.
+    '''
+    
+    def setUp(self):
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_privileges(self):
+        ''' Test that dropping privileges is refused, instead of being
+        silently ignored.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            pid_file = dirname + '/pid.pid'
+            for kwargs in ({'user': 'nobody'}, {'group': 'nogroup'},
+                           {'keep_caps': set()}):
+                with self.subTest(**kwargs):
+                    with self.assertRaises(NotImplementedError):
+                        _daemonize1(pid_file, **kwargs)
+                    self.assertFalse(os.path.exists(pid_file))
+                    
+    def test_chroot(self):
+        ''' Test that chroot is refused, instead of being silently
+        ignored.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            pid_file = dirname + '/pid.pid'
+            with self.assertRaises(NotImplementedError):
+                _daemonize1(pid_file, chroot=dirname)
+            self.assertFalse(os.path.exists(pid_file))
+
 
 if __name__ == "__main__":
     if '__TESTWORKER__' in os.environ:
@@ -0,0 +1,122 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import json
+import time
+import os
+
+from daemoniker._events_common import _set_event_log
+from daemoniker._events_common import _emit
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+class Events_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def tearDown(self):
+        _set_event_log(None)
+            
+    def test_file(self):
+        ''' Test recording events into a file.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            cwd = os.getcwd()
+            os.chdir(dirname)
+            try:
+                _set_event_log('events.jsonl')
+            finally:
+                os.chdir(cwd)
+            
+            before = time.time()
+            _emit('first')
+            _emit('second', extra=42)
+            
+            with open(dirname + '/events.jsonl', 'r') as f:
+                events = [json.loads(line) for line in f]
+                
+        self.assertEqual(
+            [event['event'] for event in events],
+            ['first', 'second']
+        )
+        self.assertEqual(events[1]['extra'], 42)
+        for event in events:
+            self.assertEqual(event['pid'], os.getpid())
+            self.assertGreaterEqual(event['time'], before)
+        self.assertLessEqual(events[0]['monotonic'], events[1]['monotonic'])
+        
+    def test_callback(self):
+        ''' Test recording events through a callback, including a broken
+        one.
+        '''
+        events = []
+        _set_event_log(events.append)
+        _emit('hello', who='world')
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['event'], 'hello')
+        self.assertEqual(events[0]['who'], 'world')
+        
+        def broken(event):
+            raise RuntimeError()
+        
+        _set_event_log(broken)
+        # This should just log.
+        _emit('hello')
+        
+        _set_event_log(None)
+        _emit('nowhere')
+        self.assertEqual(len(events), 1)
+        
+        with self.assertRaises(TypeError):
+            _set_event_log(42)
+        
+
+if __name__ == "__main__":
+    unittest.main()
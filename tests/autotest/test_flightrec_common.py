@@ -0,0 +1,170 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import logging
+import tempfile
+import time
+import os
+
+from daemoniker._flightrec_common import FlightRecorder
+from daemoniker._flightrec_common import read_flight_recorder
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+class FlightRecorder_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_roundtrip(self):
+        ''' Test recording and reading back, without wrapping.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            recorder = FlightRecorder.for_pidfile(dirname + '/pid.pid', 4096)
+            try:
+                before = time.time()
+                recorder.record('hello')
+                recorder.record(b'world')
+            finally:
+                recorder.close()
+                
+            records = read_flight_recorder(dirname + '/pid.pid.flight')
+            self.assertEqual(
+                [(seq, payload) for seq, wall, payload in records],
+                [(0, b'hello'), (1, b'world')]
+            )
+            self.assertGreaterEqual(records[0][1], before)
+            
+    def test_wrap(self):
+        ''' Test that wrapping keeps the newest records, and that a
+        reopened recorder resumes where it left off.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            path = dirname + '/test.flight'
+            recorder = FlightRecorder(path, 256)
+            try:
+                for ii in range(100):
+                    recorder.record('message ' + str(ii))
+            finally:
+                recorder.close()
+                
+            records = read_flight_recorder(path)
+            seqs = [seq for seq, wall, payload in records]
+            self.assertEqual(seqs, list(range(seqs[0], 100)))
+            self.assertGreater(seqs[0], 0)
+            for seq, wall, payload in records:
+                self.assertEqual(payload, b'message ' + str(seq).encode())
+                
+            # Resuming should continue the sequence
+            recorder = FlightRecorder(path, 256)
+            try:
+                recorder.record('resumed')
+            finally:
+                recorder.close()
+                
+            records = read_flight_recorder(path)
+            self.assertEqual(records[-1][0], 100)
+            self.assertEqual(records[-1][2], b'resumed')
+            
+            # But a different capacity should start over
+            recorder = FlightRecorder(path, 512)
+            try:
+                recorder.record('restarted')
+            finally:
+                recorder.close()
+                
+            self.assertEqual(
+                [(seq, payload) for seq, wall, payload in
+                 read_flight_recorder(path)],
+                [(0, b'restarted')]
+            )
+            
+    def test_truncation(self):
+        ''' Test that oversized records are truncated to fit.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            path = dirname + '/test.flight'
+            recorder = FlightRecorder(path, 64)
+            try:
+                recorder.record('x' * 1000)
+            finally:
+                recorder.close()
+                
+            (seq, wall, payload), = read_flight_recorder(path)
+            self.assertEqual(payload, b'x' * (64 - 24))
+            
+            with self.assertRaises(ValueError):
+                FlightRecorder(path, 16)
+            
+            with open(path, 'wb') as f:
+                f.write(b'not a flight recorder' * 4)
+            with self.assertRaises(ValueError):
+                read_flight_recorder(path)
+            
+    def test_handler(self):
+        ''' Test recording log records.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            path = dirname + '/test.flight'
+            recorder = FlightRecorder(path, 4096)
+            test_logger = logging.getLogger('daemoniker.test.flightrec')
+            test_logger.propagate = False
+            handler = recorder.handler()
+            test_logger.addHandler(handler)
+            try:
+                test_logger.warning('something %s', 'happened')
+            finally:
+                test_logger.removeHandler(handler)
+                recorder.close()
+                
+            (seq, wall, payload), = read_flight_recorder(path)
+            self.assertEqual(payload, b'something happened')
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,234 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import threading
+import socket
+import sys
+import os
+
+import daemoniker
+from daemoniker._inherit_unix import _listen_fds
+from daemoniker._inherit_unix import activate
+from daemoniker._inherit_unix import _preopen
+from daemoniker._inherit_unix import _close_fds
+from daemoniker._inherit_unix import inherited_fds
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+
+
+# Daemonizes, and then answers a single connection with the names of the
+# activated sockets, and whether LISTEN_PID was kept up to date.
+_ACTIVATED_DAEMON = '''
+import os
+import sys
+import socket
+from daemoniker import daemonize
+from daemoniker import inherited_fds
+
+daemonize(sys.argv[1])
+fds = inherited_fds()
+server = socket.socket(fileno=fds['echo'])
+conn, _ = server.accept()
+conn.sendall('{}|{}'.format(
+    ','.join(sorted(fds)),
+    os.environ['LISTEN_PID'] == str(os.getpid())
+).encode())
+conn.close()
+'''
+        
+        
+class Inherit_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_preopen(self):
+        ''' Test opening sockets and files.
+        '''
+        self.assertEqual(_preopen(None), {})
+        self.assertEqual(inherited_fds(), {})
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            with open(dirname + '/config.txt', 'w') as f:
+                f.write('config')
+            # Stale sockets should be replaced.
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(dirname + '/app.sock')
+            stale.close()
+                
+            opened = _preopen({
+                'tcp': 'tcp://127.0.0.1:0',
+                'udp': 'udp://127.0.0.1:0',
+                'unix': 'unix://' + dirname + '/app.sock',
+                'config': dirname + '/config.txt',
+                'log': (dirname + '/log.txt', 'a'),
+            })
+            try:
+                self.assertEqual(
+                    set(opened),
+                    {'tcp', 'udp', 'unix', 'config', 'log'}
+                )
+                
+                for name, family, sock_type in [
+                        ('tcp', socket.AF_INET, socket.SOCK_STREAM),
+                        ('udp', socket.AF_INET, socket.SOCK_DGRAM),
+                        ('unix', socket.AF_UNIX, socket.SOCK_STREAM)]:
+                    # Use dup so that closing the socket doesn't close ours.
+                    sock = socket.socket(fileno=os.dup(opened[name]))
+                    try:
+                        self.assertEqual(sock.family, family)
+                        self.assertEqual(sock.type, sock_type)
+                    finally:
+                        sock.close()
+                        
+                # The stream sockets should already be listening.
+                client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                client.connect(dirname + '/app.sock')
+                client.close()
+                
+                self.assertEqual(os.read(opened['config'], 100), b'config')
+                os.write(opened['log'], b'log')
+                with open(dirname + '/log.txt', 'rb') as f:
+                    self.assertEqual(f.read(), b'log')
+                    
+            finally:
+                _close_fds(opened)
+                
+            # Failures shouldn't leak anything we already opened.
+            with self.assertRaises(ValueError):
+                _preopen({
+                    'good': dirname + '/config.txt',
+                    'bad': (dirname + '/config.txt', 'x'),
+                })
+            with self.assertRaises(FileNotFoundError):
+                _preopen({'missing': dirname + '/missing.txt'})
+            with self.assertRaises(ValueError):
+                _preopen({'portless': 'tcp://127.0.0.1'})
+                
+    def test_listen_fds(self):
+        ''' Test parsing the socket activation environment.
+        '''
+        pid = str(os.getpid())
+        self.assertEqual(_listen_fds({}), {})
+        # Not for us.
+        self.assertEqual(
+            _listen_fds({'LISTEN_PID': '1', 'LISTEN_FDS': '1'}),
+            {}
+        )
+        self.assertEqual(
+            _listen_fds({'LISTEN_PID': pid, 'LISTEN_FDS': 'nope'}),
+            {}
+        )
+        self.assertEqual(
+            _listen_fds({'LISTEN_PID': pid, 'LISTEN_FDS': '2'}),
+            {'unknown': 3, 'unknown.1': 4}
+        )
+        self.assertEqual(
+            _listen_fds({
+                'LISTEN_PID': pid,
+                'LISTEN_FDS': '3',
+                'LISTEN_FDNAMES': 'http:http:admin'
+            }),
+            {'http': 3, 'http.1': 4, 'admin': 5}
+        )
+        
+    def test_activate(self):
+        ''' Test activating a daemon, both eagerly and lazily.
+        '''
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(
+            os.path.dirname(os.path.abspath(daemoniker.__file__))
+        )
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            for lazy in (False, True):
+                address = dirname + '/' + str(lazy) + '.sock'
+                args = [
+                    sys.executable, '-c', _ACTIVATED_DAEMON,
+                    dirname + '/' + str(lazy) + '.pid'
+                ]
+                listen = {
+                    'echo': 'unix://' + address,
+                    'spare': 'udp://127.0.0.1:0'
+                }
+                
+                if lazy:
+                    pids = []
+                    activator = threading.Thread(
+                        target = lambda: pids.append(
+                            activate(args, listen, lazy=True, env=env)
+                        ),
+                        daemon = True
+                    )
+                    activator.start()
+                    # Wait for the socket to exist.
+                    while not os.path.exists(address):
+                        activator.join(.01)
+                    # Nothing should run until we connect.
+                    activator.join(.1)
+                    self.assertTrue(activator.is_alive())
+                    
+                else:
+                    pids = [activate(args, listen, env=env)]
+                    
+                client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                client.settimeout(30)
+                try:
+                    client.connect(address)
+                    if lazy:
+                        activator.join(30)
+                    # The launching process exits once the daemon is up.
+                    _, status = os.waitpid(pids[0], 0)
+                    self.assertEqual(status, 0)
+                    self.assertEqual(client.recv(100), b'echo,spare|True')
+                finally:
+                    client.close()
+        
+
+if __name__ == "__main__":
+    unittest.main()
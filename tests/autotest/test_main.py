@@ -0,0 +1,270 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import subprocess
+import json
+import sys
+import os
+import time
+
+import daemoniker
+from daemoniker.__main__ import _literal
+from daemoniker.__main__ import _signum
+from daemoniker.__main__ import _start_parser
+from daemoniker.__main__ import _format_uptime
+from daemoniker._status_unix import _is_locked
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# Waits around for signals, writing them down as it gets them.
+_APP = '''
+import os
+import sys
+import time
+import signal
+from daemoniker import SignalHandler1
+
+def serve():
+    def record(signum):
+        print(signal.Signals(signum).name, flush=True)
+    print('serving', sys.argv[1:], flush=True)
+    SignalHandler1(sys.argv[1], sighup=record).start()
+    while True:
+        time.sleep(.1)
+'''
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+@unittest.skipIf(daemoniker.platform_switch != 'unix', 'Unix only.')
+class Main_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def _cli(self, dirname, *args):
+        ''' Runs python -m daemoniker with args, from dirname. Returns
+        the exit code and stdout.
+        '''
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(
+            os.path.dirname(os.path.abspath(daemoniker.__file__))
+        )
+        result = subprocess.run(
+            [sys.executable, '-m', 'daemoniker'] + list(args),
+            cwd = dirname,
+            env = env,
+            stdout = subprocess.PIPE,
+            stderr = subprocess.PIPE,
+            universal_newlines = True,
+            timeout = 60
+        )
+        return result.returncode, result.stdout
+        
+    def _wait_for(self, path, contents):
+        for __ in range(100):
+            with open(path, 'r') as f:
+                if contents in f.read():
+                    return
+            time.sleep(.05)
+        self.fail(repr(contents) + ' never showed up in ' + path)
+            
+    def test_parsing(self):
+        ''' Test parsing options and arguments.
+        '''
+        self.assertEqual(_literal('0o027'), 0o027)
+        self.assertEqual(_literal("{'nofile': 1024}"), {'nofile': 1024})
+        self.assertEqual(_literal('/var/log/app.log'), '/var/log/app.log')
+        self.assertEqual(_literal('0-3'), '0-3')
+        
+        self.assertEqual(_signum('15'), 15)
+        self.assertEqual(_signum('hup'), 1)
+        self.assertEqual(_signum('SIGHUP'), 1)
+        
+        self.assertEqual(_format_uptime(None), '-')
+        self.assertEqual(_format_uptime(3723.5), '01:02:03')
+        self.assertEqual(_format_uptime(2 * 86400 + 5), '2d00:00:05')
+        
+        args = _start_parser('start').parse_args([
+            '--umask', '0o077',
+            '--subreaper',
+            'app.pid', 'app:serve', '--not-ours', 'arg'
+        ])
+        self.assertEqual(args.umask, 0o077)
+        self.assertIs(args.subreaper, True)
+        self.assertEqual(args.args, ['--not-ours', 'arg'])
+        # Unspecified options fall back to the defaults of daemonize.
+        self.assertFalse(hasattr(args, 'chdir'))
+        
+    def test_scan_registry(self):
+        ''' Test scanning registries that don't exist, or aren't.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            # Nothing has registered yet.
+            code, stdout = self._cli(dirname, 'scan', '--registry', 'fleet')
+            self.assertEqual(code, 0)
+            self.assertEqual(len(stdout.splitlines()), 1)
+            
+            os.mkdir(dirname + '/bogus')
+            with open(dirname + '/bogus/index', 'wb') as f:
+                f.write(b'not a registry')
+            code, stdout = self._cli(dirname, 'scan', '--registry', 'bogus')
+            self.assertEqual(code, 1)
+            self.assertEqual(stdout, '')
+        
+    def test_start_missing_target(self):
+        ''' Test that start fails if it can't find its target.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            with open(dirname + '/app.py', 'w') as f:
+                f.write(_APP)
+            for target in ('nonexistent_mod', 'nonexistent_mod:serve',
+                           'app:nonexistent'):
+                with self.subTest(target=target):
+                    code, stdout = self._cli(dirname, 'start', 'app.pid',
+                                             target)
+                    self.assertEqual(code, 1)
+                    # The failed daemon cleans up after itself.
+                    for __ in range(100):
+                        if not os.path.exists(dirname + '/app.pid'):
+                            break
+                        time.sleep(.05)
+                    else:
+                        self.fail('Failed daemon left its pid file.')
+        
+    def test_lifecycle(self):
+        ''' Test starting, inspecting, signaling, restarting, and
+        stopping a daemon.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            with open(dirname + '/app.py', 'w') as f:
+                f.write(_APP)
+            out_path = dirname + '/out.txt'
+            pid_file = dirname + '/app.pid'
+            start = ['--stdout-goto', out_path, '--registry', 'fleet',
+                     'app.pid', 'app:serve', 'app.pid']
+            
+            self.assertEqual(self._cli(dirname, 'status', 'app.pid')[0], 3)
+            
+            self.assertEqual(self._cli(dirname, 'start', *start)[0], 0)
+            self._wait_for(out_path, "serving ['app.pid']")
+            # Can't start twice.
+            self.assertEqual(self._cli(dirname, 'start', *start)[0], 1)
+            
+            code, stdout = self._cli(dirname, 'status', '--json', 'app.pid')
+            self.assertEqual(code, 0)
+            result = json.loads(stdout)
+            with open(pid_file, 'r') as f:
+                pid = int(f.read())
+            self.assertEqual(result['pid'], pid)
+            self.assertTrue(result['running'])
+            self.assertGreater(result['rss'], 0)
+            # The daemon holds the lock on its pid file.
+            self.assertTrue(_is_locked(pid_file))
+            
+            with open(dirname + '/dead.pid', 'w') as f:
+                f.write(str(2 ** 22 + 1) + '\n')
+            code, stdout = self._cli(dirname, 'scan', dirname)
+            self.assertEqual(code, 1)
+            lines = stdout.splitlines()
+            self.assertEqual(lines[0].split(),
+                             ['PID', 'STATE', 'UPTIME', 'EXE', 'PID', 'FILE'])
+            self.assertEqual(
+                [line.split()[1] for line in lines[1:]],
+                ['running', 'stale']
+            )
+            self.assertEqual(lines[1].split()[-1], 'app.pid')
+            os.remove(dirname + '/dead.pid')
+            self.assertEqual(self._cli(dirname, 'scan', dirname)[0], 0)
+            
+            code, stdout = self._cli(dirname, 'scan', '--registry', 'fleet')
+            self.assertEqual(code, 0)
+            lines = stdout.splitlines()
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(lines[1].split()[0], str(pid))
+            self.assertEqual(lines[1].split()[-1], 'app')
+            
+            self.assertEqual(
+                self._cli(dirname, 'signal', 'app.pid', 'HUP')[0],
+                0
+            )
+            self._wait_for(out_path, 'SIGHUP')
+            
+            self.assertEqual(self._cli(dirname, 'restart', *start)[0], 0)
+            with open(pid_file, 'r') as f:
+                self.assertNotEqual(int(f.read()), pid)
+                
+            self.assertEqual(self._cli(dirname, 'stop', 'app.pid')[0], 0)
+            # A graceful exit cleans up the pid file.
+            self.assertFalse(os.path.exists(pid_file))
+            self.assertEqual(self._cli(dirname, 'status', 'app.pid')[0], 3)
+            # And removes it from the registry.
+            code, stdout = self._cli(dirname, 'scan', '--registry', 'fleet')
+            self.assertEqual(len(stdout.splitlines()), 1)
+            # Stopping twice is fine.
+            self.assertEqual(self._cli(dirname, 'stop', 'app.pid')[0], 0)
+            
+            # A stale pid file shouldn't stop us from starting again.
+            self.assertEqual(self._cli(dirname, 'start', *start)[0], 0)
+            with open(pid_file, 'r') as f:
+                pid = int(f.read())
+            os.kill(pid, 9)
+            for __ in range(100):
+                if self._cli(dirname, 'status', 'app.pid')[0] == 1:
+                    break
+                time.sleep(.05)
+            else:
+                self.fail('Killed daemon still running.')
+            self.assertEqual(self._cli(dirname, 'start', *start)[0], 0)
+            self.assertEqual(
+                self._cli(dirname, 'stop', '--process-group', 'app.pid')[0],
+                0
+            )
+        
+
+if __name__ == "__main__":
+    unittest.main()
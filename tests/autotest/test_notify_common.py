@@ -0,0 +1,216 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import socket
+import os
+
+from daemoniker._notify_common import _notify_address
+from daemoniker._notify_common import _watchdog_interval
+from daemoniker._notify_common import notify
+from daemoniker._notify_common import ServiceWatchdog
+from daemoniker._startup_common import _StartupChannel
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+@unittest.skipIf(not hasattr(socket, 'AF_UNIX'), 'Unsupported platform.')
+class Notify_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+        self._dir = tempfile.TemporaryDirectory()
+        self.manager = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.manager.settimeout(10)
+        self.manager.bind(self._dir.name + '/notify.sock')
+        
+        self._environ = dict(os.environ)
+        os.environ['NOTIFY_SOCKET'] = self._dir.name + '/notify.sock'
+        
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._environ)
+        self.manager.close()
+        self._dir.cleanup()
+        
+    def test_address(self):
+        ''' Test parsing NOTIFY_SOCKET.
+        '''
+        self.assertIsNone(_notify_address({}))
+        self.assertIsNone(_notify_address({'NOTIFY_SOCKET': 'relative'}))
+        self.assertEqual(
+            _notify_address({'NOTIFY_SOCKET': '/run/notify'}),
+            '/run/notify'
+        )
+        self.assertEqual(
+            _notify_address({'NOTIFY_SOCKET': '@abstract'}),
+            '\0abstract'
+        )
+        
+    def test_notify(self):
+        ''' Test sending notifications.
+        '''
+        self.assertTrue(notify(READY=1, status='Serving'))
+        self.assertEqual(self.manager.recv(1024), b'READY=1\nSTATUS=Serving')
+        
+        # Nothing to send, and nobody to send it to.
+        self.assertFalse(notify())
+        del os.environ['NOTIFY_SOCKET']
+        self.assertFalse(notify(READY=1))
+        # Nobody listening shouldn't raise.
+        os.environ['NOTIFY_SOCKET'] = self._dir.name + '/missing.sock'
+        self.assertFalse(notify(READY=1))
+        
+    def _report(self, report):
+        ''' Runs report on a startup channel in a fork, waiting for it
+        from here like a launcher would. Returns the result of the wait,
+        the pid of the fork, and the notification along with the pid
+        that sent it (or None, where the platform can't tell us).
+        '''
+        channel = _StartupChannel()
+        pid = os.fork()
+        if pid == 0:
+            _fixtures.__SKIP_ALL_REMAINING__ = True
+            try:
+                channel.open_child()
+                report(channel)
+            finally:
+                os._exit(0)
+                
+        try:
+            failure = channel.wait(10)
+        finally:
+            os.waitpid(pid, 0)
+            
+        if hasattr(socket, 'SO_PASSCRED'):
+            message, ancdata, __, __ = self.manager.recvmsg(
+                1024, socket.CMSG_SPACE(12)
+            )
+            sender = None
+            for level, kind, data in ancdata:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_CREDENTIALS:
+                    sender = int.from_bytes(data[:4], 'little')
+        else:
+            message = self.manager.recv(1024)
+            sender = None
+        return failure, pid, message, sender
+        
+    def test_startup(self):
+        ''' Test that the launcher passes startup along to the service
+        manager, since it's the launcher that the manager listens to.
+        '''
+        if hasattr(socket, 'SO_PASSCRED'):
+            self.manager.setsockopt(socket.SOL_SOCKET, socket.SO_PASSCRED, 1)
+            
+        failure, pid, message, sender = self._report(
+            lambda channel: channel.ready()
+        )
+        self.assertIsNone(failure)
+        self.assertEqual(message, b'READY=1\nMAINPID=' + str(pid).encode())
+        if sender is not None:
+            self.assertEqual(sender, os.getpid())
+        
+        failure, pid, message, sender = self._report(
+            lambda channel: channel.fail('Traceback:\nValueError: nope\n')
+        )
+        self.assertIn('ValueError: nope', failure)
+        self.assertEqual(message, b'STATUS=Failed to start: ValueError: nope')
+        if sender is not None:
+            self.assertEqual(sender, os.getpid())
+            
+        # Nothing else (ex: from the daemon itself) should have been sent.
+        self.manager.settimeout(.1)
+        with self.assertRaises(socket.timeout):
+            self.manager.recv(1024)
+        
+    def test_watchdog(self):
+        ''' Test pinging the watchdog.
+        '''
+        self.assertIsNone(_watchdog_interval({}))
+        self.assertIsNone(_watchdog_interval({'WATCHDOG_USEC': '0'}))
+        self.assertIsNone(_watchdog_interval(
+            {'WATCHDOG_USEC': '1000000', 'WATCHDOG_PID': '1'}
+        ))
+        self.assertEqual(_watchdog_interval(
+            {'WATCHDOG_USEC': '1000000', 'WATCHDOG_PID': str(os.getpid())}
+        ), .5)
+        
+        # Without a watchdog, this should be a noop.
+        watchdog = ServiceWatchdog()
+        self.assertIsNone(watchdog.interval)
+        watchdog.start()
+        watchdog.stop()
+        
+        os.environ['WATCHDOG_USEC'] = '20000'
+        watchdog = ServiceWatchdog()
+        watchdog.start()
+        try:
+            with self.assertRaises(RuntimeError):
+                watchdog.start()
+            for __ in range(3):
+                self.assertEqual(self.manager.recv(1024), b'WATCHDOG=1')
+        finally:
+            watchdog.stop()
+            
+        # An unhealthy daemon shouldn't ping.
+        healthy = []
+        watchdog = ServiceWatchdog(check=lambda: healthy)
+        watchdog.start()
+        try:
+            self.manager.settimeout(.1)
+            with self.assertRaises(socket.timeout):
+                self.manager.recv(1024)
+            healthy.append(True)
+            self.manager.settimeout(10)
+            self.assertEqual(self.manager.recv(1024), b'WATCHDOG=1')
+        finally:
+            watchdog.stop()
+        
+
+if __name__ == "__main__":
+    unittest.main()
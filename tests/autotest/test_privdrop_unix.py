@@ -0,0 +1,232 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import sys
+import os
+
+from daemoniker._privdrop_unix import _SUPPORTED_PLATFORM
+from daemoniker._privdrop_unix import _normalize_privileges
+from daemoniker._privdrop_unix import _lookup_user
+from daemoniker._privdrop_unix import _chown_pidfile
+from daemoniker._privdrop_unix import _drop_privileges
+from daemoniker._privdrop_unix import _resolve_groups
+from daemoniker._privdrop_unix import _lookup_grouplist
+from daemoniker._privdrop_unix import _normalize_capabilities
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+class Privdrop_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+        if not _SUPPORTED_PLATFORM:
+            raise unittest.SkipTest('Unsupported platform.')
+            
+    def test_normalize(self):
+        ''' Test resolving users and groups.
+        '''
+        self.assertIsNone(_normalize_privileges(None, None))
+        self.assertEqual(_normalize_privileges('root', None), (0, 0, 'root'))
+        self.assertEqual(_normalize_privileges(0, 0), (0, 0, 'root'))
+        self.assertEqual(_normalize_privileges(None, 0), (None, 0, None))
+        
+        # Lookups should be cached.
+        _lookup_user.cache_clear()
+        _normalize_privileges('root', None)
+        _normalize_privileges('root', None)
+        self.assertEqual(_lookup_user.cache_info().hits, 1)
+        
+        with self.assertRaises(ValueError):
+            _normalize_privileges('no such user, hopefully', None)
+        with self.assertRaises(ValueError):
+            _normalize_privileges(None, 'no such group, hopefully')
+            
+        # Supplementary groups can be looked up ahead of time.
+        self.assertIsNone(_resolve_groups(None))
+        self.assertEqual(_resolve_groups((None, 5, None)), [5])
+        _lookup_grouplist.cache_clear()
+        self.assertIn(0, _resolve_groups((0, 0, 'root')))
+        # Cached, too.
+        _resolve_groups((0, 0, 'root')).append(12345)
+        self.assertNotIn(12345, _resolve_groups((0, 0, 'root')))
+        self.assertEqual(_lookup_grouplist.cache_info().hits, 2)
+            
+    def test_drop(self):
+        ''' Test dropping privileges. Requires root, and is irreversible,
+        so do it in a fork.
+        '''
+        if os.getuid() != 0:
+            raise unittest.SkipTest('Requires root.')
+            
+        try:
+            privileges = _normalize_privileges('nobody', None)
+        except ValueError:
+            raise unittest.SkipTest('No nobody user.')
+            
+        uid, gid, username = privileges
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            res_path = dirname + '/response.txt'
+            pid_path = dirname + '/pid.pid'
+            pid = os.fork()
+            
+            # Parent process
+            if pid != 0:
+                os.waitpid(pid, 0)
+                
+                try:
+                    with open(res_path, 'r') as res:
+                        response = res.read()
+                
+                except (IOError, OSError) as exc:
+                    raise AssertionError from exc
+                    
+                stat = os.stat(pid_path)
+                self.assertEqual((stat.st_uid, stat.st_gid), (uid, gid))
+                self.assertEqual(
+                    response,
+                    str((uid, gid, sorted(os.getgrouplist(username, gid))))
+                )
+                
+            # Child process
+            else:
+                _fixtures.__SKIP_ALL_REMAINING__ = True
+                try:
+                    # Make sure we have a supplementary group to lose.
+                    os.setgroups([0, 1])
+                    res = open(res_path, 'w')
+                    with open(pid_path, 'w') as pid_file:
+                        _chown_pidfile(pid_file.fileno(), privileges)
+                    _drop_privileges(privileges)
+                    res.write(str((
+                        os.getuid(),
+                        os.getgid(),
+                        sorted(os.getgroups())
+                    )))
+                    res.close()
+                finally:
+                    os._exit(0)
+
+                    
+    def test_capabilities(self):
+        ''' Test keeping capabilities while dropping privileges. Linux-
+        specific, requires root, and irreversible, so do it in a fork.
+        '''
+        if not sys.platform.startswith('linux'):
+            raise unittest.SkipTest('Linux only.')
+            
+        privileges = (65534, 65534, None)
+        self.assertIsNone(_normalize_capabilities(None, privileges))
+        self.assertEqual(
+            _normalize_capabilities(
+                ['CAP_NET_BIND_SERVICE', 'sys_nice', 23],
+                privileges
+            ),
+            {10, 23}
+        )
+        with self.assertRaises(ValueError):
+            _normalize_capabilities(['CAP_NONEXISTENT'], privileges)
+        with self.assertRaises(ValueError):
+            _normalize_capabilities([9000], privileges)
+        with self.assertRaises(ValueError):
+            _normalize_capabilities(['net_bind_service'], None)
+            
+        if os.getuid() != 0:
+            raise unittest.SkipTest('Requires root.')
+            
+        capabilities = _normalize_capabilities(
+            ['net_bind_service'],
+            privileges
+        )
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            res_path = dirname + '/response.txt'
+            pid = os.fork()
+            
+            # Parent process
+            if pid != 0:
+                os.waitpid(pid, 0)
+                
+                try:
+                    with open(res_path, 'r') as res:
+                        response = res.read()
+                
+                except (IOError, OSError) as exc:
+                    raise AssertionError from exc
+                    
+                # Nothing is passed on through exec.
+                self.assertEqual(
+                    response,
+                    str((65534, [0, 1 << 10, 1 << 10, 0]))
+                )
+                
+            # Child process
+            else:
+                _fixtures.__SKIP_ALL_REMAINING__ = True
+                try:
+                    res = open(res_path, 'w')
+                    _drop_privileges(privileges, capabilities)
+                    with open('/proc/self/status', 'r') as f:
+                        status = dict(
+                            line.split(':\t', 1) for line in f
+                            if line.startswith('Cap')
+                        )
+                    res.write(str((
+                        os.getuid(),
+                        [int(status[key], 16) for key in
+                         ('CapInh', 'CapPrm', 'CapEff', 'CapAmb')]
+                    )))
+                    res.close()
+                finally:
+                    os._exit(0)
+        
+
+if __name__ == "__main__":
+    unittest.main()
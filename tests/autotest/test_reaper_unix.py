@@ -0,0 +1,185 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import signal
+import sys
+import os
+import time
+import subprocess
+
+from daemoniker._reaper_unix import _become_subreaper
+from daemoniker._reaper_unix import _check_subreaper
+from daemoniker._reaper_unix import set_pdeathsig
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+def _state(pid):
+    ''' Returns the state of pid, from /proc, or None if it's gone.
+    '''
+    try:
+        with open('/proc/' + str(pid) + '/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0]
+    except FileNotFoundError:
+        return None
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+@unittest.skipIf(not sys.platform.startswith('linux'), 'Linux only.')
+class Reaper_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_pdeathsig(self):
+        ''' Test that helpers die with their parent.
+        '''
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        
+        if pid != 0:
+            os.close(write_fd)
+            try:
+                # Wait for the helper to be ready before killing its parent.
+                with os.fdopen(read_fd, 'r') as pipe:
+                    helper_pid = int(pipe.readline())
+            finally:
+                os.waitpid(pid, 0)
+                
+            for __ in range(100):
+                if _state(helper_pid) in {None, 'Z'}:
+                    break
+                time.sleep(.05)
+            else:
+                self.fail('Helper survived its parent.')
+        
+        # This is the helper's parent.
+        else:
+            _fixtures.__SKIP_ALL_REMAINING__ = True
+            try:
+                os.close(read_fd)
+                armed_read, armed_write = os.pipe()
+                helper_pid = os.fork()
+                if helper_pid == 0:
+                    set_pdeathsig(signal.SIGKILL)
+                    os.write(write_fd, (str(os.getpid()) + '\n').encode())
+                    os.write(armed_write, b'!')
+                    time.sleep(30)
+                # Don't die before the helper is listening for it.
+                else:
+                    os.read(armed_read, 1)
+            finally:
+                os._exit(0)
+                
+    def test_subreaper(self):
+        ''' Test adopting and reaping orphaned descendants, while
+        leaving our own children alone. This is irreversible, so do it
+        in a fork.
+        '''
+        _check_subreaper(False)
+        _check_subreaper(True)
+        
+        pid = os.fork()
+        if pid != 0:
+            __, status = os.waitpid(pid, 0)
+            self.assertTrue(os.WIFEXITED(status))
+            self.assertEqual(os.WEXITSTATUS(status), 0)
+            
+        # This is the subreaper.
+        else:
+            _fixtures.__SKIP_ALL_REMAINING__ = True
+            code = 1
+            try:
+                _become_subreaper(True)
+                read_fd, write_fd = os.pipe()
+                subreaper_pid = os.getpid()
+                
+                # The middle process orphans its own child right away, before
+                # anything has given the subreaper a look at it.
+                middle_pid = os.fork()
+                if middle_pid == 0:
+                    orphan_pid = os.fork()
+                    if orphan_pid == 0:
+                        # Wait to be orphaned.
+                        while os.getppid() != subreaper_pid:
+                            time.sleep(.01)
+                        os._exit(0)
+                    
+                    os.write(write_fd, (str(orphan_pid) + '\n').encode())
+                    os._exit(3)
+                    
+                os.close(write_fd)
+                with os.fdopen(read_fd, 'r') as pipe:
+                    orphan_pid = int(pipe.readline())
+                    
+                # The orphan should be reaped by the SIGCHLD handler, instead
+                # of lingering as a zombie...
+                for __ in range(100):
+                    if _state(orphan_pid) is None:
+                        break
+                    time.sleep(.05)
+                else:
+                    raise AssertionError('Orphan was not reaped.')
+                
+                # ...but the middle is ours to wait on...
+                __, status = os.waitpid(middle_pid, 0)
+                if not os.WIFEXITED(status) or os.WEXITSTATUS(status) != 3:
+                    raise AssertionError('Reaped our own fork.')
+                    
+                # ...as are the subprocesses that ran the fork hooks.
+                helper = subprocess.Popen(
+                    [sys.executable, '-c', 'import sys; sys.exit(3)'],
+                    preexec_fn = set_pdeathsig
+                )
+                if helper.wait() == 3:
+                    code = 0
+                    
+            finally:
+                os._exit(code)
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import sys
+import os
+
+from daemoniker._registry_unix import Registry
+from daemoniker._registry_unix import _open_registry
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+class Registry_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_registry(self):
+        ''' Test registering, looking up, and removing daemons.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            with Registry(dirname + '/fleet') as registry:
+                self.assertIsNone(registry.lookup('app'))
+                registry.register('app', 1234, '/run/app.pid', started=5.0)
+                self.assertEqual(registry.lookup('app'), {
+                    'name': 'app',
+                    'pid': 1234,
+                    'started': 5.0,
+                    'pid_file': '/run/app.pid',
+                })
+                # Re-registering replaces the entry.
+                registry.register('app', 1235, '/run/app.pid')
+                self.assertEqual(registry.lookup('app')['pid'], 1235)
+                self.assertEqual(len(registry.entries()), 1)
+                
+                # Only the current owner may unregister.
+                self.assertFalse(registry.unregister('app', 1234))
+                self.assertTrue(registry.unregister('app', 1235))
+                self.assertIsNone(registry.lookup('app'))
+                self.assertFalse(registry.unregister('app'))
+                
+                with self.assertRaises(ValueError):
+                    registry.register('', 1, '/run/app.pid')
+                with self.assertRaises(ValueError):
+                    registry.register('x' * 129, 1, '/run/app.pid')
+                    
+            # Reopening (even readonly) sees the same entries, and keeps the
+            # original size.
+            with Registry(dirname + '/fleet', slots=8) as registry:
+                registry.register('other', 1, '/run/other.pid')
+                self.assertEqual(registry.slots, 4096)
+            with Registry(dirname + '/fleet', readonly=True) as registry:
+                self.assertEqual(registry.lookup('other')['pid'], 1)
+                
+            # Readonly registries aren't created.
+            with self.assertRaises(FileNotFoundError):
+                Registry(dirname, readonly=True)
+            with open(dirname + '/index', 'wb') as f:
+                f.write(b'nope' * 8)
+            with self.assertRaises(ValueError):
+                Registry(dirname, readonly=True)
+            with self.assertRaises(ValueError):
+                Registry(dirname)
+                
+    def test_collisions(self):
+        ''' Test probing past collisions and tombstones, and filling up.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            with Registry(dirname, slots=4) as registry:
+                names = ['a', 'b', 'c', 'd']
+                for pid, name in enumerate(names):
+                    registry.register(name, pid, '/run/' + name + '.pid')
+                with self.assertRaises(OSError):
+                    registry.register('e', 5, '/run/e.pid')
+                for pid, name in enumerate(names):
+                    self.assertEqual(registry.lookup(name)['pid'], pid)
+                    
+                # Removing one leaves the rest reachable, and frees a slot.
+                registry.unregister('b')
+                for name in ['a', 'c', 'd']:
+                    self.assertIsNotNone(registry.lookup(name))
+                registry.register('e', 5, '/run/e.pid')
+                self.assertEqual(
+                    [entry['name'] for entry in registry.entries()],
+                    ['a', 'c', 'd', 'e']
+                )
+                
+    def test_open_registry(self):
+        ''' Test claiming a name for a daemon.
+        '''
+        self.assertEqual(_open_registry(None, None, '/run/app.pid'),
+                         (None, None))
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            pid_file = dirname + '/app.pid'
+            registry, name = _open_registry(dirname, None, pid_file)
+            self.assertEqual(name, 'app')
+            
+            # A running daemon keeps its name...
+            with open(pid_file, 'w') as f:
+                f.write(str(os.getpid()) + '\n')
+            registry.register(name, os.getpid(), pid_file)
+            registry.close()
+            with self.assertRaises(ValueError):
+                _open_registry(dirname, 'app', dirname + '/other.pid')
+                
+            # ...but not a dead one.
+            os.remove(pid_file)
+            registry, name = _open_registry(dirname, 'app',
+                                            dirname + '/other.pid')
+            registry.close()
+            
+            
+if __name__ == "__main__":
+    unittest.main()
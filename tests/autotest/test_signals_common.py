@@ -51,6 +51,8 @@ from daemoniker._signals_common import send
 from daemoniker._signals_common import ping
 from daemoniker._signals_common import _noop
 from daemoniker._signals_common import _normalize_handler
+from daemoniker._signals_common import _signal_name
+from daemoniker._signals_common import _signal_numbers
 
 from daemoniker.exceptions import SignalError
 from daemoniker.exceptions import ReceivedSignal
@@ -117,6 +119,26 @@ class Signals_test(unittest.TestCase):
             _noop
         )
         
+    def test_signal_names(self):
+        ''' Test naming signals, with and without signal.Signals (which
+        Python 3.4 doesn't have).
+        '''
+        saved = getattr(signal, 'Signals', None)
+        for has_enum in (True, False):
+            if not has_enum and saved is not None:
+                del signal.Signals
+            try:
+                with self.subTest(has_enum=has_enum):
+                    self.assertEqual(_signal_name(signal.SIGTERM), 'SIGTERM')
+                    self.assertEqual(_signal_name(signal.SIGABRT), 'SIGABRT')
+                    self.assertEqual(_signal_name(12345), '12345')
+                    numbers = _signal_numbers()
+                    self.assertEqual(numbers['SIGINT'], signal.SIGINT)
+                    self.assertNotIn('SIG_DFL', numbers)
+            finally:
+                if saved is not None:
+                    signal.Signals = saved
+        
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
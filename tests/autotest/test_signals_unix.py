@@ -53,6 +53,10 @@ from daemoniker._signals_common import ping
 from daemoniker._signals_unix import SignalHandler1
 from daemoniker._signals_unix import _restore_any_previous_handler
 
+from daemoniker._events_common import _set_event_log
+
+from daemoniker._streams_common import _direct_redirects
+
 from daemoniker.exceptions import SignalError
 from daemoniker.exceptions import ReceivedSignal
 from daemoniker.exceptions import SIGINT
@@ -90,6 +94,86 @@ class Signals_test(unittest.TestCase):
         if _fixtures.__SKIP_ALL_REMAINING__:
             raise unittest.SkipTest('Internal call to skip remaining.')
     
+    def test_sighup(self):
+        ''' Test that SIGHUP defaults to reopening stds, and is
+        restored by stop.
+        '''
+        with tempfile.TemporaryDirectory() as dirpath:
+            pidfile = dirpath + '/pid.pid'
+            sighandler = SignalHandler1(pidfile)
+            self.assertEqual(sighandler.sighup, sighandler._reopen_handler)
+            
+            calls = []
+            sighandler.sighup = calls.append
+            sighandler.start()
+            try:
+                os.kill(os.getpid(), signal.SIGHUP)
+                time.sleep(.1)
+            finally:
+                sighandler.stop()
+                
+            self.assertEqual(calls, [signal.SIGHUP])
+            self.assertEqual(signal.getsignal(signal.SIGHUP), signal.SIG_DFL)
+            
+            del sighandler.sighup
+            self.assertEqual(sighandler.sighup, sighandler._reopen_handler)
+            # This should be harmless without any redirection.
+            sighandler._reopen_handler(signal.SIGHUP)
+            
+            # It also mustn't flush sys.stdout, which may be mid-write.
+            class MidWrite:
+                def flush(self):
+                    raise RuntimeError('reentrant call')
+                    
+            path = dirpath + '/out.txt'
+            fd = os.open(dirpath + '/placeholder.txt', os.O_WRONLY | os.O_CREAT)
+            stdout = sys.stdout
+            sys.stdout = MidWrite()
+            _direct_redirects[fd] = (path, os.O_WRONLY | os.O_CREAT)
+            try:
+                sighandler._reopen_handler(signal.SIGHUP)
+                os.write(fd, b'reopened')
+            finally:
+                del _direct_redirects[fd]
+                sys.stdout = stdout
+                os.close(fd)
+                
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'reopened')
+            
+    def test_events(self):
+        ''' Test recording signal handling as lifecycle events.
+        '''
+        events = []
+        _set_event_log(events.append)
+        try:
+            with tempfile.TemporaryDirectory() as dirpath:
+                sighandler = SignalHandler1(
+                    dirpath + '/pid.pid',
+                    sighup = lambda signum: None
+                )
+                sighandler.start()
+                try:
+                    os.kill(os.getpid(), signal.SIGHUP)
+                    time.sleep(.1)
+                    with self.assertRaises(SIGTERM):
+                        os.kill(os.getpid(), signal.SIGTERM)
+                        time.sleep(.1)
+                finally:
+                    sighandler.stop()
+                    
+        finally:
+            _set_event_log(None)
+            
+        self.assertEqual(
+            [(event['event'], event['signal'], event.get('raised'))
+             for event in events],
+            [('signal_received', 'SIGHUP', None),
+             ('handler_ran', 'SIGHUP', None),
+             ('signal_received', 'SIGTERM', None),
+             ('handler_ran', 'SIGTERM', 'SIGTERM')]
+        )
+        
     def test_default_handler(self):
         ''' Test the default signal handler.
         '''
@@ -118,6 +202,49 @@ class Signals_test(unittest.TestCase):
                     with self.assertRaises(KeyboardInterrupt):
                         send(pidfile, sig)
                         time.sleep(.1)
+                        
+    def test_send_process_group(self):
+        ''' Test sending signals to the whole process group.
+        '''
+        leader = subprocess.Popen(
+            [
+                sys.executable, '-c',
+                'import subprocess, sys, time\n'
+                'helper = subprocess.Popen(\n'
+                '    [sys.executable, "-c", "import time; time.sleep(30)"]\n'
+                ')\n'
+                'print(helper.pid, flush=True)\n'
+                'time.sleep(30)\n'
+            ],
+            stdout = subprocess.PIPE,
+            start_new_session = True
+        )
+        try:
+            helper_pid = int(leader.stdout.readline())
+            with tempfile.TemporaryDirectory() as dirpath:
+                pidfile = dirpath + '/pid.pid'
+                with open(pidfile, 'w') as f:
+                    f.write(str(leader.pid) + '\n')
+                send(pidfile, SIGTERM, process_group=True)
+                
+            self.assertEqual(leader.wait(10), -signal.SIGTERM)
+            # The helper was orphaned, so it may linger as a zombie.
+            for __ in range(100):
+                try:
+                    with open('/proc/' + str(helper_pid) + '/stat') as f:
+                        state = f.read().rsplit(')', 1)[1].split()[0]
+                except FileNotFoundError:
+                    break
+                if state == 'Z':
+                    break
+                time.sleep(.05)
+            else:
+                self.fail('Helper survived its process group being killed.')
+                
+        finally:
+            leader.kill()
+            leader.wait()
+            leader.stdout.close()
         
     def test_receive(self):
         ''' Test receiving signals.
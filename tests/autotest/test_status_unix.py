@@ -0,0 +1,161 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import tempfile
+import subprocess
+import fcntl
+import sys
+import os
+import time
+
+from daemoniker._status_unix import _read_pid
+from daemoniker._status_unix import _is_running
+from daemoniker._status_unix import _is_locked
+from daemoniker._status_unix import status
+from daemoniker._status_unix import scan
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+@unittest.skipIf(not os.path.exists('/proc/self/stat'), 'Requires procfs.')
+class Status_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_status(self):
+        ''' Test reporting the status of a process.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            pid_file = dirname + '/pid.pid'
+            self.assertIsNone(_read_pid(pid_file))
+            self.assertEqual(status(pid_file), {
+                'pid': None,
+                'running': False,
+                'uptime': None,
+                'rss': None,
+                'fds': None,
+                'exe': None,
+                'state': 'missing',
+                'pid_file': pid_file
+            })
+            
+            with open(pid_file, 'w') as f:
+                pass
+            self.assertEqual(status(pid_file)['state'], 'empty')
+            
+            with open(pid_file, 'w') as f:
+                f.write(str(os.getpid()) + '\n')
+            result = status(pid_file)
+            self.assertEqual(result['pid'], os.getpid())
+            self.assertTrue(result['running'])
+            self.assertGreaterEqual(result['uptime'], 0)
+            self.assertGreater(result['rss'], 0)
+            # At least stdin, stdout, and stderr
+            self.assertGreaterEqual(result['fds'], 3)
+            self.assertEqual(result['exe'], os.path.realpath(sys.executable))
+            self.assertEqual(result['state'], 'running')
+            
+            # Our pid, but from long before we started: it's been reused.
+            os.utime(pid_file, (0, 0))
+            result = status(pid_file)
+            self.assertEqual(result['state'], 'stale')
+            self.assertFalse(result['running'])
+            
+            # ...unless the pid file is locked, which is conclusive.
+            fd = os.open(pid_file, os.O_RDONLY)
+            try:
+                self.assertFalse(_is_locked(pid_file))
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self.assertTrue(_is_locked(pid_file))
+                self.assertEqual(status(pid_file)['state'], 'running')
+            finally:
+                os.close(fd)
+            self.assertFalse(_is_locked(pid_file))
+            
+    def test_scan(self):
+        ''' Test scanning a directory of pid files.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            self.assertEqual(scan(dirname), [])
+            
+            for name, pid in (('alive.pid', os.getpid()),
+                              ('dead.pid', 2 ** 22 + 1),
+                              ('other.txt', os.getpid())):
+                with open(dirname + '/' + name, 'w') as f:
+                    f.write(str(pid) + '\n')
+            with open(dirname + '/empty.pid', 'w'):
+                pass
+                
+            results = scan(dirname, max_workers=2)
+            self.assertEqual(
+                [(os.path.basename(result['pid_file']), result['state'])
+                 for result in results],
+                [('alive.pid', 'running'), ('dead.pid', 'stale'),
+                 ('empty.pid', 'empty')]
+            )
+            self.assertEqual(
+                [result['pid_file'] for result in scan(dirname, '*.txt')],
+                [dirname + '/other.txt']
+            )
+            
+    def test_zombies(self):
+        ''' Test that zombies aren't considered to be running.
+        '''
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        try:
+            # Wait for it to exit without reaping it.
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+            self.assertFalse(_is_running(process.pid))
+        finally:
+            process.wait()
+        self.assertFalse(_is_running(process.pid))
+        self.assertTrue(_is_running(os.getpid()))
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,821 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import threading
+import socket
+import gzip
+import json
+import re
+import tempfile
+import time
+import sys
+import io
+import os
+
+from daemoniker._daemonize_common import _redirect_stds
+
+from daemoniker._streams_common import _StreamPump
+from daemoniker._streams_common import _StreamOptions
+from daemoniker._streams_common import _FileSink
+from daemoniker._streams_common import _RotatingFileSink
+from daemoniker._streams_common import _close_pumps
+from daemoniker._streams_common import _rebuffer_stds
+from daemoniker._streams_common import _direct_redirects
+from daemoniker._streams_common import reopen_stds
+from daemoniker._streams_common import _parse_socket_target
+from daemoniker._streams_common import _check_stream_targets
+from daemoniker._streams_common import _SyslogSink
+from daemoniker._streams_common import _JournaldSink
+from daemoniker._streams_common import _SegmentCompressor
+from daemoniker._streams_common import _ThrottledSink
+from daemoniker._streams_common import _StreamSocketSink
+from daemoniker._streams_common import _lower_thread_priority
+from daemoniker._streams_common import OVERFLOW_DROP
+from daemoniker._streams_common import OVERFLOW_BLOCK
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+class SinkFixture:
+    ''' Collects everything written to it, optionally waiting for an
+    event before every write.
+    '''
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.writes = []
+        self.closed = False
+        
+    def write(self, data):
+        if self.gate is not None:
+            self.gate.wait()
+        self.writes.append(data)
+        
+    def close(self):
+        self.closed = True
+
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+class Streams_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_options(self):
+        ''' Test validating stream options.
+        '''
+        self.assertFalse(_StreamOptions().pumped)
+        self.assertTrue(_StreamOptions(1024, OVERFLOW_DROP).pumped)
+        
+        # Rotation implies pumping
+        options = _StreamOptions(rotate_bytes=1024)
+        self.assertTrue(options.pumped)
+        self.assertIsInstance(options.make_sink(os.devnull),
+                              _RotatingFileSink)
+        self.assertNotIsInstance(_StreamOptions(1024).make_sink(os.devnull),
+                                 _RotatingFileSink)
+        
+        self.assertEqual(_StreamOptions().open_flags, os.O_APPEND)
+        self.assertEqual(
+            _StreamOptions(open_flags=os.O_CLOEXEC).open_flags,
+            os.O_APPEND | os.O_CLOEXEC
+        )
+        
+        for kwargs in [{'overflow': 'nonexistent'},
+                       {'buffering': -1},
+                       {'backlog': 0},
+                       {'rotate_bytes': 0},
+                       {'rotate_interval': -1},
+                       {'rotate_keep': -1}]:
+            with self.subTest(kwargs):
+                with self.assertRaises(ValueError):
+                    _StreamOptions(**kwargs)
+            
+    def test_pump_block(self):
+        ''' Test that a blocking pump loses nothing, even with a slow
+        sink and a tiny backlog.
+        '''
+        gate = threading.Event()
+        sink = SinkFixture(gate)
+        pump = _StreamPump(sink, backlog_limit=16, chunk_size=7)
+        write_fd = pump.start()
+        
+        payload = bytes(range(256)) * 64
+        writer = threading.Thread(target=write_all, args=(write_fd, payload))
+        writer.start()
+        
+        # Let the sink go, and then close our end of the pipe.
+        gate.set()
+        writer.join()
+        os.close(write_fd)
+        pump.close()
+        
+        self.assertTrue(sink.closed)
+        self.assertEqual(b''.join(sink.writes), payload)
+        self.assertEqual(pump.dropped, 0)
+        
+    def test_pump_drop(self):
+        ''' Test that a dropping pump never blocks writers, and accounts
+        for everything it dropped.
+        '''
+        gate = threading.Event()
+        sink = SinkFixture(gate)
+        pump = _StreamPump(sink, backlog_limit=1024, overflow=OVERFLOW_DROP)
+        write_fd = pump.start()
+        
+        # The sink is stalled, so this would block forever if the pump
+        # weren't dropping.
+        payload = b'x' * (2 ** 20)
+        write_all(write_fd, payload)
+        os.close(write_fd)
+        
+        gate.set()
+        pump.close()
+        
+        self.assertGreater(pump.dropped, 0)
+        self.assertEqual(
+            len(b''.join(sink.writes)) + pump.dropped,
+            len(payload)
+        )
+        
+    def test_file_sink(self):
+        ''' Test writing to a file sink.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            path = dirname + '/sink.txt'
+            sink = _FileSink(path)
+            try:
+                sink.write(b'hello ')
+                sink.write(b'world')
+            finally:
+                sink.close()
+                
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'hello world')
+        
+    def test_redirect_pumped(self):
+        ''' Test redirecting stds through pumps.
+        '''
+        # Cache all of the stds
+        stdin_fd = os.dup(0)
+        stdout_fd = os.dup(1)
+        stderr_fd = os.dup(2)
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            try:
+                _redirect_stds(
+                    dirname + '/stdin.txt',
+                    dirname + '/stdout.txt',
+                    dirname + '/stderr.txt',
+                    _StreamOptions(backlog=1024)
+                )
+                self.assertEqual(_direct_redirects, {})
+                os.write(1, b'out')
+                os.write(2, b'err')
+                _close_pumps()
+                
+            # Restore our original stdin, stdout, stderr. Do this before dir
+            # cleanup or we'll get cleanup errors.
+            finally:
+                os.dup2(stdin_fd, 0)
+                os.dup2(stdout_fd, 1)
+                os.dup2(stderr_fd, 2)
+                for fd in (stdin_fd, stdout_fd, stderr_fd):
+                    os.close(fd)
+                
+            with open(dirname + '/stdout.txt', 'rb') as f:
+                self.assertEqual(f.read(), b'out')
+            with open(dirname + '/stderr.txt', 'rb') as f:
+                self.assertEqual(f.read(), b'err')
+                
+    def test_append(self):
+        ''' Test that redirection appends to existing files, both
+        directly and through pumps.
+        '''
+        # Cache all of the stds
+        stdin_fd = os.dup(0)
+        stdout_fd = os.dup(1)
+        stderr_fd = os.dup(2)
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            out_path = dirname + '/stdout.txt'
+            with open(out_path, 'wb') as f:
+                f.write(b'existing')
+            
+            try:
+                for options in (None, _StreamOptions(backlog=1024)):
+                    _redirect_stds(os.devnull, out_path, os.devnull, options)
+                    os.write(1, b'+')
+                    _close_pumps()
+                    
+            # Restore our original stdin, stdout, stderr. Do this before dir
+            # cleanup or we'll get cleanup errors.
+            finally:
+                _direct_redirects.clear()
+                os.dup2(stdin_fd, 0)
+                os.dup2(stdout_fd, 1)
+                os.dup2(stderr_fd, 2)
+                for fd in (stdin_fd, stdout_fd, stderr_fd):
+                    os.close(fd)
+                    
+            with open(out_path, 'rb') as f:
+                self.assertEqual(f.read(), b'existing++')
+                
+    def test_rebuffer(self):
+        ''' Test replacing sys.stdout and sys.stderr with differently-
+        buffered streams.
+        '''
+        stdout = sys.stdout
+        stderr = sys.stderr
+        
+        try:
+            _rebuffer_stds(4096)
+            self.assertIsInstance(sys.stdout.buffer, io.BufferedWriter)
+            self.assertFalse(sys.stdout.line_buffering)
+            self.assertEqual(sys.stdout.fileno(), 1)
+            self.assertEqual(sys.stderr.fileno(), 2)
+            
+            _rebuffer_stds(1)
+            self.assertTrue(sys.stderr.line_buffering)
+            
+            _rebuffer_stds(0)
+            self.assertIsInstance(sys.stdout.buffer, io.FileIO)
+            self.assertTrue(sys.stdout.write_through)
+            
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            sys.stdout = stdout
+            sys.stderr = stderr
+        
+    def test_rotation(self):
+        ''' Test size-based rotation and retention.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            path = dirname + '/sink.txt'
+            sink = _RotatingFileSink(path, max_bytes=10, keep=2)
+            try:
+                for ii in range(5):
+                    sink.write(b'0123456789')
+                    
+                # Oversized writes shouldn't rotate empty files.
+                sink.reopen()
+            finally:
+                sink.close()
+                
+            rotated = sink.rotated_files()
+            self.assertEqual(len(rotated), 2)
+            for rotated_path in rotated + [path]:
+                with open(rotated_path, 'rb') as f:
+                    self.assertEqual(f.read(), b'0123456789')
+                    
+            # Time-based rotation
+            sink = _RotatingFileSink(path, interval=.01)
+            try:
+                time.sleep(.02)
+                sink.write(b'foo')
+            finally:
+                sink.close()
+                
+            self.assertEqual(len(sink.rotated_files()), 3)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'foo')
+                
+    def test_rotation_failure(self):
+        ''' Test that output keeps flowing when rotation fails.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            path = dirname + '/sink.txt'
+            sink = _RotatingFileSink(path, max_bytes=10, retry_interval=.5)
+            try:
+                # Renaming into a missing directory fails.
+                sink._rotated_name = lambda: dirname + '/missing/sink.txt.0'
+                sink.write(b'first line\n')
+                sink.write(b'second\n')
+                sink.write(b'third\n')
+                # Shouldn't have retried yet.
+                self.assertEqual(sink.rotation_errors, 1)
+                self.assertEqual(sink.rotated_files(), [])
+                
+                del sink._rotated_name
+                time.sleep(.6)
+                sink.write(b'fourth\n')
+            finally:
+                sink.close()
+                
+            self.assertEqual(sink.rotation_errors, 1)
+            rotated = sink.rotated_files()
+            self.assertEqual(len(rotated), 1)
+            with open(rotated[0], 'rb') as f:
+                self.assertEqual(f.read(), b'first line\nsecond\nthird\n')
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'fourth\n')
+                
+    def test_compression(self):
+        ''' Test compressing rotated files in the background.
+        '''
+        with self.assertRaises(ValueError):
+            _StreamOptions(compress='gzip')
+        with self.assertRaises(ValueError):
+            _StreamOptions(rotate_bytes=10, compress='rar')
+            
+        with tempfile.TemporaryDirectory() as dirname:
+            path = dirname + '/sink.txt'
+            # Leftovers from a previous run should also be compressed.
+            with open(path + '.20000101-000000', 'wb') as f:
+                f.write(b'leftover')
+                
+            compressor = _SegmentCompressor('gzip', max_workers=2)
+            sink = _RotatingFileSink(
+                path,
+                max_bytes = 10,
+                keep = 3,
+                compressor = compressor
+            )
+            try:
+                for ii in range(4):
+                    sink.write(str(ii).encode() * 10)
+            finally:
+                # Closing waits for all compressions to finish.
+                sink.close()
+                
+            self.assertEqual(compressor.errors, 0)
+            rotated = sink.rotated_files()
+            self.assertEqual(len(rotated), 3)
+            self.assertTrue(all(name.endswith('.gz') for name in rotated))
+            self.assertFalse(
+                [name for name in os.listdir(dirname) if 'partial' in name]
+            )
+            # The leftover should have been rotated away, oldest first.
+            for ii, rotated_path in enumerate(rotated):
+                with gzip.open(rotated_path, 'rb') as f:
+                    self.assertEqual(f.read(), str(ii).encode() * 10)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'3333333333')
+                
+            with open(path + '.index', 'r') as f:
+                entries = [json.loads(line) for line in f]
+            # The leftover may or may not have been compressed before it was
+            # removed, but everything that's left must have been.
+            self.assertLessEqual(
+                {os.path.basename(name)[:-3] for name in rotated},
+                {entry['segment'] for entry in entries}
+            )
+            for entry in entries:
+                self.assertEqual(entry['compressed'], entry['segment'] + '.gz')
+                self.assertEqual(entry['bytes'], len(b'leftover') if
+                                 entry['segment'].startswith('sink.txt.2000')
+                                 else 10)
+                
+    @unittest.skipIf(not sys.platform.startswith('linux'), 'Linux only.')
+    def test_compression_priority(self):
+        ''' Test that compression threads drop only their own priority.
+        '''
+        priorities = []
+        
+        def compress():
+            _lower_thread_priority()
+            priorities.append(os.getpriority(os.PRIO_PROCESS, 0))
+            
+        before = os.getpriority(os.PRIO_PROCESS, 0)
+        worker = threading.Thread(target=compress)
+        worker.start()
+        worker.join()
+        
+        self.assertEqual(priorities, [19])
+        self.assertEqual(os.getpriority(os.PRIO_PROCESS, 0), before)
+        
+    def test_compression_failure(self):
+        ''' Test that failing to start a compression loses no data.
+        '''
+        class BrokenCompressor(_SegmentCompressor):
+            def submit(self, segment, index_path):
+                raise RuntimeError('Out of threads')
+                
+        with tempfile.TemporaryDirectory() as dirname:
+            path = dirname + '/sink.txt'
+            compressor = BrokenCompressor('gzip')
+            sink = _RotatingFileSink(path, max_bytes=2, compressor=compressor)
+            try:
+                for ii in range(3):
+                    sink.write(str(ii).encode() * 2)
+            finally:
+                sink.close()
+                
+            self.assertEqual(compressor.errors, 2)
+            rotated = sink.rotated_files()
+            self.assertEqual(len(rotated), 2)
+            contents = []
+            for rotated_path in rotated + [path]:
+                with open(rotated_path, 'rb') as f:
+                    contents.append(f.read())
+            self.assertEqual(contents, [b'00', b'11', b'22'])
+                
+    def test_throttling(self):
+        ''' Test rate limiting and deduplication.
+        '''
+        class ListSink:
+            def __init__(self):
+                self.written = []
+                self.closed = False
+                
+            def write(self, data):
+                self.written.append(data)
+                
+            def close(self):
+                self.closed = True
+                
+        now = [0]
+        clock = lambda: now[0]
+        
+        # Rate limiting
+        inner = ListSink()
+        sink = _ThrottledSink(inner, rate=10, burst=20, clock=clock)
+        sink.write(b'123456789\n' * 3)
+        self.assertEqual(b''.join(inner.written), b'123456789\n' * 2)
+        now[0] += 1
+        sink.write(b'abcdefghi\nabcdefghi\npartial')
+        self.assertEqual(inner.written[-1], b'abcdefghi\n')
+        # Now the suppression notice
+        now[0] += 60
+        sink.write(b'\n')
+        self.assertEqual(
+            inner.written[-1],
+            b'partial\nsuppressed 2 lines (20 bytes) over the rate limit\n'
+        )
+        self.assertEqual(sink.suppressed_lines, 2)
+        sink.close()
+        self.assertTrue(inner.closed)
+        
+        # Deduplication
+        inner = ListSink()
+        sink = _ThrottledSink(inner, dedupe=True, clock=clock)
+        sink.write(b'boom\n' * 5 + b'bang\n')
+        sink.write(b'bang\nbang\n')
+        sink.close()
+        self.assertEqual(
+            b''.join(inner.written),
+            b'boom\nlast message repeated 4 times\nbang\n'
+            b'last message repeated 2 times\n'
+        )
+        
+        # Repeated blocks of lines, like tracebacks
+        traceback_lines = (
+            b'Traceback (most recent call last):\n'
+            b'  File "daemon.py", line 12, in <module>\n'
+            b'ValueError: boom\n'
+        )
+        inner = ListSink()
+        sink = _ThrottledSink(inner, dedupe=True, clock=clock)
+        for __ in range(1000):
+            sink.write(traceback_lines)
+        sink.close()
+        self.assertEqual(
+            b''.join(inner.written),
+            traceback_lines + b'last 3 lines repeated 999 times\n'
+        )
+        self.assertEqual(sink.repeated_lines, 2997)
+        
+        # A repeat that falls through lets the held lines back out.
+        inner = ListSink()
+        sink = _ThrottledSink(inner, dedupe=True, clock=clock)
+        sink.write(b'a\nb\na\nc\n')
+        self.assertEqual(b''.join(inner.written), b'a\nb\na\nc\n')
+        # As does going quiet partway through one.
+        writes = len(inner.written)
+        sink.write(b'a\n')
+        sink.tick()
+        self.assertEqual(len(inner.written), writes)
+        now[0] += 1
+        sink.tick()
+        self.assertEqual(inner.written[-1], b'a\n')
+        sink.close()
+        
+        # Notices shouldn't wait for the next write.
+        inner = ListSink()
+        sink = _ThrottledSink(inner, rate=10, burst=10, clock=clock)
+        sink.write(b'123456789\n' * 3)
+        now[0] += 60
+        sink.tick()
+        self.assertEqual(
+            inner.written[-1],
+            b'suppressed 2 lines (20 bytes) over the rate limit\n'
+        )
+        sink.close()
+        
+        # Options
+        self.assertFalse(_StreamOptions().throttles)
+        options = _StreamOptions(stderr_dedupe=True)
+        self.assertTrue(options.pumped)
+        with tempfile.TemporaryDirectory() as dirname:
+            sink = options.make_sink(dirname + '/out.txt')
+            self.assertIsInstance(sink, _FileSink)
+            sink.close()
+            sink = options.make_sink(dirname + '/err.txt', is_stderr=True)
+            self.assertIsInstance(sink, _ThrottledSink)
+            sink.close()
+            
+        with self.assertRaises(ValueError):
+            _StreamOptions(stderr_rate_limit=0)
+                
+    def test_pump_tick(self):
+        ''' Test that the pump gets throttling notices out while the
+        pipe is quiet.
+        '''
+        inner = SinkFixture()
+        sink = _ThrottledSink(inner, rate=10, burst=10, report_interval=.1)
+        pump = _StreamPump(sink)
+        write_fd = pump.start()
+        try:
+            write_all(write_fd, b'123456789\n' * 3)
+            for __ in range(50):
+                if b'suppressed' in b''.join(inner.writes):
+                    break
+                time.sleep(.05)
+            self.assertEqual(
+                b''.join(inner.writes),
+                b'123456789\n'
+                b'suppressed 2 lines (20 bytes) over the rate limit\n'
+            )
+        finally:
+            os.close(write_fd)
+            pump.close()
+            
+    def test_reopen(self):
+        ''' Test reopening both direct and pumped redirects after
+        moving the files out of the way.
+        '''
+        # Cache all of the stds
+        stdin_fd = os.dup(0)
+        stdout_fd = os.dup(1)
+        stderr_fd = os.dup(2)
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            out_path = dirname + '/stdout.txt'
+            err_path = dirname + '/stderr.txt'
+            
+            try:
+                for options in (None, _StreamOptions(backlog=1024)):
+                    _redirect_stds(os.devnull, out_path, err_path, options)
+                    os.write(1, b'before')
+                    # Make sure the pump caught up before moving things.
+                    time.sleep(.1)
+                    os.rename(out_path, out_path + '.old')
+                    reopen_stds()
+                    os.write(1, b'after')
+                    _close_pumps()
+                    
+                    with open(out_path + '.old', 'rb') as f:
+                        self.assertEqual(f.read(), b'before')
+                    with open(out_path, 'rb') as f:
+                        self.assertEqual(f.read(), b'after')
+                    os.remove(out_path)
+                    
+            # Restore our original stdin, stdout, stderr. Do this before dir
+            # cleanup or we'll get cleanup errors.
+            finally:
+                _direct_redirects.clear()
+                os.dup2(stdin_fd, 0)
+                os.dup2(stdout_fd, 1)
+                os.dup2(stderr_fd, 2)
+                for fd in (stdin_fd, stdout_fd, stderr_fd):
+                    os.close(fd)
+        
+    def test_socket_targets(self):
+        ''' Test parsing and checking logging socket destinations.
+        '''
+        self.assertEqual(
+            _parse_socket_target('syslog:///dev/log'),
+            ('syslog', '/dev/log')
+        )
+        self.assertEqual(
+            _parse_socket_target('journald:'),
+            ('journald', '/run/systemd/journal/socket')
+        )
+        self.assertIsNone(_parse_socket_target('/var/log/syslog'))
+        self.assertIsNone(_parse_socket_target('C:/log.txt'))
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            with self.assertRaises(ValueError):
+                _check_stream_targets('syslog:', os.devnull, os.devnull)
+            with self.assertRaises(FileNotFoundError):
+                _check_stream_targets(
+                    os.devnull,
+                    'syslog://' + dirname + '/missing',
+                    os.devnull
+                )
+                
+        with self.assertRaises(ValueError):
+            _StreamOptions(identifier='two\nlines')
+            
+    def test_socket_sinks(self):
+        ''' Test framing lines for syslog and journald.
+        '''
+        with tempfile.TemporaryDirectory() as dirname:
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            listener.bind(dirname + '/log')
+            listener.settimeout(5)
+            try:
+                options = _StreamOptions(identifier='tester')
+                sink = options.make_sink('syslog://' + dirname + '/log', 3)
+                self.assertIsInstance(sink, _SyslogSink)
+                sink.write(b'hello\nwor')
+                sink.write(b'ld\n\n')
+                sink.write(b'unfinished')
+                sink.close()
+                
+                records = [listener.recv(4096) for __ in range(3)]
+                for record, message in zip(
+                    records, (b'hello', b'world', b'unfinished')):
+                    self.assertRegex(
+                        record,
+                        b'^<27>[A-Z][a-z]{2} [ 0-9]\\d \\d\\d:\\d\\d:\\d\\d '
+                        b'tester\\[' + str(os.getpid()).encode() + b'\\]: ' +
+                        re.escape(message) + b'$'
+                    )
+                    
+                sink = options.make_sink('journald://' + dirname + '/log', 6)
+                self.assertIsInstance(sink, _JournaldSink)
+                sink.write(b'hello journal\n')
+                sink.close()
+                self.assertEqual(
+                    listener.recv(4096),
+                    b'PRIORITY=6\nSYSLOG_FACILITY=3\n'
+                    b'SYSLOG_IDENTIFIER=tester\nMESSAGE=hello journal\n'
+                )
+                
+            finally:
+                listener.close()
+                
+    def test_collector_sink(self):
+        ''' Test streaming to a collector, including while it restarts.
+        '''
+        now = [0]
+        clock = lambda: now[0]
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            address = dirname + '/collector.sock'
+            
+            with self.assertRaises(ValueError):
+                _check_stream_targets(os.devnull, 'unix:', os.devnull)
+            # The collector doesn't need to exist yet.
+            _check_stream_targets(os.devnull, 'unix://' + address, os.devnull)
+            self.assertIsInstance(
+                _StreamOptions().make_sink('unix://' + address),
+                _StreamSocketSink
+            )
+            
+            sink = _StreamSocketSink(
+                address,
+                buffer_limit = 16,
+                clock = clock
+            )
+            try:
+                # Nobody's listening, so this gets buffered, and then trimmed
+                # down to whole lines.
+                sink.write(b'first\nsecond\n')
+                sink.write(b'third\n')
+                self.assertEqual(sink.dropped, 6)
+                self.assertEqual(sink.connections, 0)
+                
+                collector = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                collector.bind(address)
+                collector.listen(1)
+                collector.settimeout(5)
+                try:
+                    # Too soon for a retry
+                    sink.write(b'4\n')
+                    self.assertEqual(sink.connections, 0)
+                    
+                    now[0] += 1
+                    sink.write(b'5\n')
+                    self.assertEqual(sink.connections, 1)
+                    conn, __ = collector.accept()
+                    conn.settimeout(5)
+                    received = b''
+                    while len(received) < 17:
+                        received += conn.recv(1024)
+                    self.assertEqual(received, b'second\nthird\n4\n5\n')
+                    
+                    # Now restart the collector
+                    conn.close()
+                    sink.write(b'lost?\n')
+                    time.sleep(.1)
+                    sink.write(b'6\n')
+                    now[0] += 1
+                    sink.reopen()
+                    conn, __ = collector.accept()
+                    conn.settimeout(5)
+                    sink.close()
+                    received = b''
+                    while True:
+                        data = conn.recv(1024)
+                        if not data:
+                            break
+                        received += data
+                    conn.close()
+                    self.assertTrue(received.endswith(b'6\n'))
+                    
+                finally:
+                    collector.close()
+                    
+            finally:
+                sink.close()
+                
+    def test_redirect_socket(self):
+        ''' Test redirecting stdout and stderr into the same logging
+        socket, with different priorities.
+        '''
+        # Cache all of the stds
+        stdin_fd = os.dup(0)
+        stdout_fd = os.dup(1)
+        stderr_fd = os.dup(2)
+        
+        with tempfile.TemporaryDirectory() as dirname:
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            listener.bind(dirname + '/log')
+            listener.settimeout(5)
+            try:
+                try:
+                    _redirect_stds(
+                        os.devnull,
+                        'journald://' + dirname + '/log',
+                        'journald://' + dirname + '/log',
+                        _StreamOptions(identifier='tester')
+                    )
+                    self.assertEqual(_direct_redirects, {})
+                    os.write(1, b'out\n')
+                    os.write(2, b'err\n')
+                    _close_pumps()
+                    
+                # Restore our original stdin, stdout, stderr.
+                finally:
+                    os.dup2(stdin_fd, 0)
+                    os.dup2(stdout_fd, 1)
+                    os.dup2(stderr_fd, 2)
+                    for fd in (stdin_fd, stdout_fd, stderr_fd):
+                        os.close(fd)
+                
+                records = {listener.recv(4096) for __ in range(2)}
+                
+            finally:
+                listener.close()
+                
+        self.assertEqual(records, {
+            b'PRIORITY=6\nSYSLOG_FACILITY=3\n'
+            b'SYSLOG_IDENTIFIER=tester\nMESSAGE=out\n',
+            b'PRIORITY=3\nSYSLOG_FACILITY=3\n'
+            b'SYSLOG_IDENTIFIER=tester\nMESSAGE=err\n',
+        })
+        
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+'''
+LICENSING
+-------------------------------------------------
+
+daemoniker: Cross-platform daemonization tools.
+    Copyright (C) 2016 Muterra, Inc.
+    
+    Contributors
+    ------------
+    Nick Badger
+        badg@muterra.io | badg@nickbadger.com | nickbadger.com
+
+    This library is free software; you can redistribute it and/or
+    modify it under the terms of the GNU Lesser General Public
+    License as published by the Free Software Foundation; either
+    version 2.1 of the License, or (at your option) any later version.
+
+    This library is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+    Lesser General Public License for more details.
+
+    You should have received a copy of the GNU Lesser General Public
+    License along with this library; if not, write to the
+    Free Software Foundation, Inc.,
+    51 Franklin Street,
+    Fifth Floor,
+    Boston, MA  02110-1301 USA
+
+------------------------------------------------------
+'''
+
+import unittest
+import threading
+import time
+
+from daemoniker._watchdog_unix import _SUPPORTED_PLATFORM
+from daemoniker._watchdog_unix import RSSWatchdog
+
+
+# ###############################################
+# "Paragon of adequacy" test fixtures
+# ###############################################
+
+
+import _fixtures
+
+
+# ###############################################
+# Testing
+# ###############################################
+        
+        
+@unittest.skipIf(not _SUPPORTED_PLATFORM, 'Unsupported platform.')
+class Watchdog_test(unittest.TestCase):
+    def setUp(self):
+        ''' Add a check that a test has not called for an exit, keeping
+        forks from doing a bunch of nonsense.
+        '''
+        if _fixtures.__SKIP_ALL_REMAINING__:
+            raise unittest.SkipTest('Internal call to skip remaining.')
+            
+    def test_trigger(self):
+        ''' Test that exceeding the limit calls the action exactly once.
+        '''
+        triggered = threading.Event()
+        calls = []
+        
+        def action():
+            calls.append(None)
+            triggered.set()
+            
+        watchdog = RSSWatchdog(1, interval=.01, action=action)
+        watchdog.start()
+        try:
+            self.assertTrue(triggered.wait(5))
+            
+            with self.assertRaises(RuntimeError):
+                watchdog.start()
+                
+        finally:
+            watchdog.stop()
+        
+        stats = watchdog.stats()
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(stats['triggered'])
+        self.assertGreater(stats['rss'], 0)
+        self.assertGreaterEqual(stats['peak'], stats['rss'])
+        self.assertGreater(len(stats['samples']), 0)
+        
+        # Stop should be idempotent
+        watchdog.stop()
+        
+    def test_no_trigger(self):
+        ''' Test that staying under the limit never calls the action,
+        and that history is bounded.
+        '''
+        def action():
+            raise AssertionError('Action should not be called.')
+            
+        watchdog = RSSWatchdog(2 ** 62, interval=.001, action=action,
+                               history=3)
+        self.assertEqual(watchdog.stats()['samples'], [])
+        self.assertIsNone(watchdog.stats()['rss'])
+        
+        watchdog.start()
+        try:
+            time.sleep(.1)
+        finally:
+            watchdog.stop()
+            
+        stats = watchdog.stats()
+        self.assertFalse(stats['triggered'])
+        self.assertEqual(len(stats['samples']), 3)
+        
+        with self.assertRaises(ValueError):
+            RSSWatchdog(1, interval=0)
+        
+
+if __name__ == "__main__":
+    unittest.main()